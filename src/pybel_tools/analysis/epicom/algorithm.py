@@ -11,8 +11,10 @@
 import itertools as itt
 import logging
 import os
+from multiprocessing import Pool
 
 import bio2bel_drugbank
+import numpy as np
 from bio2bel_drugbank.constants import DATA_DIR as DRUGBANK_DATA_DIR
 from tqdm import tqdm
 
@@ -23,6 +25,11 @@ from pybel_tools.summary import get_annotation_values
 
 log = logging.getLogger(__name__)
 
+#: The name of the file in a checkpoint directory holding the (graph, subgraph, drug, score) rows
+CHECKPOINT_SCORES_FILE = 'scores.tsv'
+#: The name of the file in a checkpoint directory holding the (graph, subgraph) work units that have been finished
+CHECKPOINT_MANIFEST_FILE = 'completed.tsv'
+
 _dti_cache_path = os.path.join(DRUGBANK_DATA_DIR, 'drug_to_gene_symbols.json')
 
 
@@ -113,15 +120,18 @@ def multi_run_epicom(graphs, path):
         _multi_run_helper_file_wrapper(graphs, path)
 
 
-def run_epicom(graph, directory):
+def run_epicom(graph, directory, dtis=None):
     """
     :param pybel.BELGraph graph: A BEL Graph
     :param str directory: The directory in which the algorithm is run
+    :param Optional[dict[str,list[tuple]]] dtis: A dictionary of drugs mapping to their targets. If none, gets them
+     from DrugBank.
     :rtype: iter[tuple[str,str,str,float]]
     """
     os.makedirs(directory, exist_ok=True)
 
-    dtis = _preprocess_dtis(_get_drug_target_interactions())
+    if dtis is None:
+        dtis = _preprocess_dtis(_get_drug_target_interactions())
 
     drugs = list(dtis)
     subgraphs = get_annotation_values(graph, annotation='Subgraph')
@@ -149,3 +159,207 @@ def run_epicom(graph, directory):
                 sep='\t',
                 file=file
             )
+
+
+#: The drug-target interactions given to each worker process by :func:`_initialize_worker`
+_worker_dtis = None
+
+
+def _initialize_worker(dtis):
+    """Stores the drug-target interactions in the worker process so they don't get pickled with every work unit
+
+    :param dict[str,list[tuple]] dtis: A dictionary of drugs mapping to their targets
+    """
+    global _worker_dtis
+    _worker_dtis = dtis
+
+
+def _score_work_unit(work_unit):
+    """Scores all drugs against the subgraph in a work unit
+
+    :param tuple[str,str,pybel.BELGraph] work_unit: A triple of the graph name, subgraph name, and subgraph
+    :return: The graph name, subgraph name, and a list of pairs of drug names and their non-zero scores
+    :rtype: tuple[str,str,list[tuple[str,float]]]
+    """
+    graph_name, subgraph_name, subgraph = work_unit
+
+    rows = []
+    for drug in sorted(_worker_dtis):
+        score = get_neurommsig_score(subgraph, _worker_dtis[drug])
+
+        if score is None or score == 0.0:
+            continue
+
+        rows.append((drug, score))
+
+    return graph_name, subgraph_name, rows
+
+
+def _read_tsv_rows(path):
+    """Iterates over the rows of a headerless TSV file, or nothing if it doesn't exist yet
+
+    :param str path: The path to the file
+    :rtype: iter[list[str]]
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path) as file:
+        for line in file:
+            line = line.rstrip('\n')
+            if line:
+                yield line.split('\t')
+
+
+def get_completed_work_units(directory):
+    """Gets the (graph, subgraph) work units that have already been finished in a checkpoint directory
+
+    :param str directory: The checkpoint directory
+    :rtype: set[tuple[str,str]]
+    """
+    return {
+        (graph_name, subgraph_name)
+        for graph_name, subgraph_name in _read_tsv_rows(os.path.join(directory, CHECKPOINT_MANIFEST_FILE))
+    }
+
+
+def _remove_orphan_scores(directory, completed):
+    """Removes the score rows of work units that were interrupted before being recorded in the manifest
+
+    :param str directory: The checkpoint directory
+    :param set[tuple[str,str]] completed: The work units recorded in the manifest
+    """
+    scores_path = os.path.join(directory, CHECKPOINT_SCORES_FILE)
+
+    rows = list(_read_tsv_rows(scores_path))
+    kept_rows = [row for row in rows if (row[0], row[1]) in completed]
+
+    if len(kept_rows) == len(rows):
+        return
+
+    log.info('removing %d scores from interrupted work units', len(rows) - len(kept_rows))
+
+    tmp_path = scores_path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        for row in kept_rows:
+            print(*row, sep='\t', file=file)
+
+    os.replace(tmp_path, scores_path)
+
+
+def _iter_work_units(graphs, completed, preprocess=True):
+    """Stratifies each graph into (graph, subgraph) work units, skipping the ones that are already finished
+
+    :param iter[pybel.BELGraph] graphs: BEL graphs
+    :param set[tuple[str,str]] completed: The work units that are already finished
+    :param bool preprocess: If true, preprocess the graph with :func:`neurommsig_graph_preprocessor`.
+    :rtype: iter[tuple[str,str,pybel.BELGraph]]
+    """
+    for graph in graphs:
+        subgraph_names = get_annotation_values(graph, annotation='Subgraph')
+
+        if all((graph.name, subgraph_name) in completed for subgraph_name in subgraph_names):
+            log.info('skipping %s since all of its subgraphs are already finished', graph)
+            continue
+
+        if preprocess:
+            log.info('preprocessing %s', graph)
+            graph = neurommsig_graph_preprocessor(graph)
+
+        log.info('stratifying %s', graph)
+        subgraphs = get_subgraphs_by_annotation(graph, annotation='Subgraph', keep_undefined=False)
+
+        for subgraph_name in sorted(subgraphs):
+            if (graph.name, subgraph_name) in completed:
+                continue
+
+            yield graph.name, subgraph_name, subgraphs[subgraph_name]
+
+
+def run_epicom_checkpointed(graphs, directory, dtis=None, processes=None, preprocess=True):
+    """Runs EpiCom on many graphs with the (graph, subgraph) work units sharded over a process pool.
+
+    Results are appended to ``scores.tsv`` in the given directory and each finished work unit is recorded in
+    ``completed.tsv``. Calling this function again with the same directory skips the finished work units, so an
+    interrupted run can be resumed.
+
+    :param iter[pybel.BELGraph] graphs: BEL graphs
+    :param str directory: The checkpoint directory
+    :param Optional[dict[str,list[tuple]]] dtis: A dictionary of drugs mapping to their targets. If none, gets them
+     from DrugBank.
+    :param Optional[int] processes: The number of worker processes. Defaults to the number of CPUs.
+    :param bool preprocess: If true, preprocess the graphs with :func:`neurommsig_graph_preprocessor`.
+    :return: The number of work units finished during this call
+    :rtype: int
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    if dtis is None:
+        dtis = _preprocess_dtis(_get_drug_target_interactions())
+
+    completed = get_completed_work_units(directory)
+    _remove_orphan_scores(directory, completed)
+
+    log.info('resuming with %d finished work units', len(completed))
+
+    work_units = _iter_work_units(graphs, completed, preprocess=preprocess)
+
+    scores_path = os.path.join(directory, CHECKPOINT_SCORES_FILE)
+    manifest_path = os.path.join(directory, CHECKPOINT_MANIFEST_FILE)
+
+    count = 0
+
+    with Pool(processes=processes, initializer=_initialize_worker, initargs=(dtis,)) as pool, \
+            open(scores_path, 'a') as scores_file, open(manifest_path, 'a') as manifest_file:
+
+        it = pool.imap_unordered(_score_work_unit, work_units)
+
+        for graph_name, subgraph_name, rows in tqdm(it, desc='Scoring subgraphs'):
+            scores_file.write(''.join(
+                '{}\t{}\t{}\t{}\n'.format(graph_name, subgraph_name, drug, score)
+                for drug, score in rows
+            ))
+            scores_file.flush()
+            os.fsync(scores_file.fileno())
+
+            # the work unit only counts as finished once its scores are safely on disk
+            print(graph_name, subgraph_name, sep='\t', file=manifest_file)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+
+            count += 1
+
+    return count
+
+
+def get_epicom_score_matrix(directory, graph_name=None):
+    """Loads the scores from a checkpoint directory made by :func:`run_epicom_checkpointed` as a dense matrix
+
+    :param str directory: The checkpoint directory
+    :param Optional[str] graph_name: If given, only keep the subgraphs from the graph with this name
+    :return: A drugs x subgraphs matrix, the sorted drug names for the rows, and the sorted (graph, subgraph) pairs for
+     the columns. Drug/subgraph pairs that weren't scored or scored zero are filled with zero.
+    :rtype: tuple[numpy.ndarray,list[str],list[tuple[str,str]]]
+    """
+    completed = get_completed_work_units(directory)
+
+    if graph_name is not None:
+        completed = {work_unit for work_unit in completed if work_unit[0] == graph_name}
+
+    scores = {}
+    for row_graph_name, subgraph_name, drug, score in _read_tsv_rows(os.path.join(directory, CHECKPOINT_SCORES_FILE)):
+        if (row_graph_name, subgraph_name) in completed:
+            scores[drug, (row_graph_name, subgraph_name)] = float(score)
+
+    drugs = sorted({drug for drug, _ in scores})
+    subgraphs = sorted(completed)
+
+    drug_to_id = {drug: i for i, drug in enumerate(drugs)}
+    subgraph_to_id = {subgraph: i for i, subgraph in enumerate(subgraphs)}
+
+    matrix = np.zeros((len(drugs), len(subgraphs)))
+
+    for (drug, subgraph), score in scores.items():
+        matrix[drug_to_id[drug], subgraph_to_id[subgraph]] = score
+
+    return matrix, drugs, subgraphs
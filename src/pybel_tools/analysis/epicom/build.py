@@ -2,17 +2,25 @@
 
 """Builds the relational database on all graphs with subgraph annotations"""
 
+import itertools as itt
 import logging
+from multiprocessing import Pool
 
 import time
 
-from .algorithm import epicom_on_graph
+from .algorithm import (
+    _get_drug_target_interactions, _initialize_worker, _iter_work_units, _preprocess_dtis, _score_work_unit,
+    epicom_on_graph,
+)
 from .models import Score
 
 log = logging.getLogger(__name__)
 
 NEUROMMSIG_DEFAULT_URL = 'https://arty.scai.fraunhofer.de/artifactory/bel/annotation/neurommsig/neurommsig-1.0.3.belanno'
 
+#: The number of score rows to insert per transaction in :func:`bulk_insert_scores`
+DEFAULT_BATCH_SIZE = 50000
+
 
 def get_networks_using_annotation(manager, annotation):
     """
@@ -34,16 +42,85 @@ def get_drug_model(manager, name):
     raise NotImplementedError
 
 
-def build_database(manager, annotation_url=None):
+def _iter_batches(iterable, batch_size):
+    """Chunks an iterable into lists of at most the given size
+
+    :param iter iterable: An iterable
+    :param int batch_size: The maximum size of each chunk
+    :rtype: iter[list]
+    """
+    it = iter(iterable)
+
+    while True:
+        batch = list(itt.islice(it, batch_size))
+
+        if not batch:
+            return
+
+        yield batch
+
+
+def bulk_insert_scores(manager, rows, batch_size=None):
+    """Inserts score rows with SQLAlchemy core's executemany in batched transactions instead of one ORM object at a time
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param iter[dict] rows: Dictionaries with keys ``network_id``, ``annotation_id``, ``drug_id``, and ``score``
+    :param Optional[int] batch_size: The number of rows to insert per transaction. Defaults to 50000.
+    :return: The number of rows inserted
+    :rtype: int
+    """
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    insert = Score.__table__.insert()
+
+    count = 0
+
+    for batch in _iter_batches(rows, batch_size):
+        manager.session.execute(insert, batch)
+        manager.session.commit()
+
+        count += len(batch)
+        log.debug('committed %d scores', count)
+
+    return count
+
+
+def _iter_network_scores(networks, dtis, pool=None):
+    """Calculates the EpiCom scores for each network, optionally with the subgraphs distributed over a process pool
+
+    :param iter[pybel.manager.models.Network] networks: Networks from the cache
+    :param dict[str,list[tuple]] dtis: A dictionary of drugs mapping to their targets
+    :param Optional[multiprocessing.pool.Pool] pool: A pool whose workers were initialized with the same DTIs
+    :rtype: iter[tuple[pybel.manager.models.Network,str,str,float]]
+    """
+    for network in networks:
+        graph = network.as_bel()
+
+        if pool is None:
+            for drug_name, subgraph_name, score in epicom_on_graph(graph, dtis):
+                yield network, subgraph_name, drug_name, score
+
+            continue
+
+        work_units = _iter_work_units([graph], completed=set())
+
+        for _, subgraph_name, rows in pool.imap_unordered(_score_work_unit, work_units):
+            for drug_name, score in rows:
+                yield network, subgraph_name, drug_name, score
+
+
+def build_database(manager, annotation_url=None, processes=None, batch_size=None):
     """Builds a database of scores for NeuroMMSig annotated graphs
 
     1. Get all networks that use the Subgraph annotation
     2. run on each
+    3. insert the scores in batches with :func:`bulk_insert_scores`
 
-    :param pybel.manager.Manager
+    :param pybel.manager.Manager manager: A cache manager
     :param Optional[str] annotation_url:
+    :param Optional[int] processes: If given, calculates the scores in this many worker processes while the calling
+     process writes them to the database
+    :param Optional[int] batch_size: The number of rows to insert per transaction. Defaults to 50000.
     """
-
     annotation_url = annotation_url or NEUROMMSIG_DEFAULT_URL
 
     annotation = manager.get_annotation_by_url(annotation_url)
@@ -53,27 +130,53 @@ def build_database(manager, annotation_url=None):
 
     networks = get_networks_using_annotation(manager, annotation)
 
-    dtis = ...
-
-    for network in networks:
-        graph = network.as_bel()
-
-        scores = epicom_on_graph(graph, dtis)
+    dtis = _preprocess_dtis(_get_drug_target_interactions())
+
+    drug_name_to_id = {}
+    subgraph_name_to_id = {}
+
+    def get_drug_id(drug_name):
+        """Looks up the identifier of a drug's model only the first time it's seen
+
+        :param str drug_name: The name of the drug
+        :rtype: int
+        """
+        if drug_name not in drug_name_to_id:
+            drug_name_to_id[drug_name] = get_drug_model(manager, drug_name).id
+        return drug_name_to_id[drug_name]
+
+    def get_subgraph_id(subgraph_name):
+        """Looks up the identifier of a subgraph's annotation entry only the first time it's seen
+
+        :param str subgraph_name: The name of the subgraph
+        :rtype: int
+        """
+        if subgraph_name not in subgraph_name_to_id:
+            subgraph_name_to_id[subgraph_name] = manager.get_annotation_entry(annotation_url, subgraph_name).id
+        return subgraph_name_to_id[subgraph_name]
+
+    def iter_rows(pool=None):
+        """Iterates over the score rows ready for insertion
+
+        :param Optional[multiprocessing.pool.Pool] pool:
+        :rtype: iter[dict]
+        """
+        for network, subgraph_name, drug_name, score in _iter_network_scores(networks, dtis, pool=pool):
+            yield {
+                'network_id': network.id,
+                'annotation_id': get_subgraph_id(subgraph_name),
+                'drug_id': get_drug_id(drug_name),
+                'score': score,
+            }
 
-        for (drug_name, subgraph_name), score in scores.items():
-            drug_model = get_drug_model(manager, drug_name)
-            subgraph_model = manager.get_annotation_entry(annotation_url, subgraph_name)
+    t = time.time()
+    log.info('calculating and committing scores')
 
-            score_model = Score(
-                network=network,
-                annotation=subgraph_model,
-                drug=drug_model,
-                score=score
-            )
+    if processes is None:
+        count = bulk_insert_scores(manager, iter_rows(), batch_size=batch_size)
 
-            manager.session.add(score_model)
+    else:
+        with Pool(processes=processes, initializer=_initialize_worker, initargs=(dtis,)) as pool:
+            count = bulk_insert_scores(manager, iter_rows(pool=pool), batch_size=batch_size)
 
-    t = time.time()
-    log.info('committing scores')
-    manager.session.commit()
-    log.info('committed scores in %.2f seconds', time.time() - t)
+    log.info('committed %d scores in %.2f seconds', count, time.time() - t)
@@ -5,7 +5,7 @@ import sys
 
 import click
 
-from .algorithm import multi_run_epicom, run_epicom
+from .algorithm import multi_run_epicom, run_epicom, run_epicom_checkpointed
 from ..neurommsig import get_ad_graph, get_ep_graph, get_pd_graph
 
 
@@ -51,5 +51,19 @@ def multi(output):
     multi_run_epicom(graphs, output)
 
 
+@main.command()
+@click.option('-d', '--directory', default=os.getcwd(), help='Checkpoint directory. Re-use to resume a run.')
+@click.option('-p', '--processes', type=int, help='Number of worker processes. Defaults to the number of CPUs.')
+def checkpoint(directory, processes):
+    """Run EpiCom on all of NeuroMMSig in parallel with resumable output"""
+    graphs = [
+        get_ad_graph(),
+        get_ep_graph(),
+        get_pd_graph(),
+    ]
+
+    run_epicom_checkpointed(graphs, directory, processes=processes)
+
+
 if __name__ == '__main__':
     main()
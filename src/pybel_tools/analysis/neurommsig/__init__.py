@@ -3,4 +3,5 @@
 """This module contains utilities for handling the NeuroMMSig knowledge base and operating on it."""
 
 from .algorithm import *
+from .significance import *
 from .utils import *
@@ -174,7 +174,7 @@ def neurommsig_hubs(graph, target_genes, top=None):
 
     unnormalized_sum = sum(
         node in target_genes
-        for node in bc.most_common(n)
+        for node, _ in bc.most_common(n)
     )
 
     return unnormalized_sum / n
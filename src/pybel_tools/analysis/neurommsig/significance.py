@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+
+"""Estimates the significance of NeuroMMSig scores with permutation tests.
+
+The null distribution for each subgraph is built by drawing random gene sets of the same size as the query from a
+background of genes. Each batch of random gene sets is represented as a boolean membership matrix (one row per random
+set) and scored with vectorized versions of the over-representation, hub, and topology kernels from
+:mod:`pybel_tools.analysis.neurommsig.algorithm` so the graph is only traversed once per subgraph.
+"""
+
+import logging
+from multiprocessing import Pool
+
+import numpy as np
+
+from pybel.constants import GENE
+from .algorithm import neurommsig_graph_preprocessor
+from ...filters.node_selection import get_nodes_by_function
+from ...grouping import get_subgraphs_by_annotation
+from ...utils import calculate_betweenness_centality
+
+__all__ = [
+    'get_neurommsig_significance_prestratified',
+    'get_neurommsig_significance',
+]
+
+log = logging.getLogger(__name__)
+
+#: The default number of random gene sets to score for each subgraph
+DEFAULT_NUMBER_PERMUTATIONS = 1000
+#: The default number of random gene sets to hold in memory at once
+DEFAULT_BATCH_SIZE = 500
+
+#: The parameters given to each worker process by :func:`_initialize_worker`
+_worker_parameters = None
+
+
+def _build_kernels(graph, genes, background, top):
+    """Builds the arrays needed to score membership matrices over the nodes of a subgraph
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param set[tuple] genes: The query gene nodes
+    :param list[tuple] background: The gene nodes that random gene sets are drawn from
+    :param float top: The percentage of top genes to use as hubs
+    :return: The local nodes (background or query genes in the graph), the number of genes in the graph, a boolean
+     mask of local nodes that are genes, a boolean mask of local nodes that are hubs, the number of hubs like in
+     :func:`neurommsig_hubs` (including the ones that aren't local nodes), and the adjacency matrix between local
+     nodes
+    :rtype: tuple[list[tuple],int,numpy.ndarray,numpy.ndarray,int,numpy.ndarray]
+    """
+    graph_genes = set(get_nodes_by_function(graph, GENE))
+
+    local_nodes = [node for node in background if node in graph]
+    local_nodes.extend(node for node in genes.difference(background) if node in graph)
+
+    gene_mask = np.array([node in graph_genes for node in local_nodes], dtype=bool)
+
+    hub_mask = np.zeros(len(local_nodes), dtype=bool)
+    number_hubs = 0
+
+    if 20 <= graph.number_of_nodes():
+        bc = calculate_betweenness_centality(graph)
+        number_hubs = max(1, int(len(graph_genes) * top))
+
+        # ties are broken in the same order as the counter in neurommsig_hubs
+        ranked_genes = sorted((node for node in bc if node in graph_genes), key=bc.get, reverse=True)
+        hubs = set(ranked_genes[:number_hubs])
+        hub_mask = np.array([node in hubs for node in local_nodes], dtype=bool)
+
+    adjacency = np.zeros((len(local_nodes), len(local_nodes)))
+    node_to_index = {node: i for i, node in enumerate(local_nodes)}
+
+    for i, v in enumerate(local_nodes):
+        for u in graph[v]:
+            j = node_to_index.get(u)
+            if j is not None and i != j:
+                adjacency[i, j] = 1.0
+
+    return local_nodes, len(graph_genes), gene_mask, hub_mask, number_hubs, adjacency
+
+
+def _score_membership(membership, set_size, number_graph_genes, gene_mask, hub_mask, number_hubs, adjacency,
+                      weights):
+    """Calculates the NeuroMMSig composite score for each row of a membership matrix
+
+    :param numpy.ndarray membership: A boolean matrix of gene sets x local nodes
+    :param int set_size: The number of genes in each set, including the ones not in the graph
+    :param int number_graph_genes: The number of genes in the graph
+    :param numpy.ndarray gene_mask: A boolean mask of local nodes that are genes
+    :param numpy.ndarray hub_mask: A boolean mask of local nodes that are hubs
+    :param int number_hubs: The number of hubs in the graph, which is 0 if the graph is too small to have any
+    :param numpy.ndarray adjacency: The adjacency matrix between local nodes
+    :param tuple[float,float,float] weights: The ORA, hub, and topology weights
+    :return: A vector with a score for each row
+    :rtype: numpy.ndarray
+    """
+    ora_weight, hub_weight, topology_weight = weights
+    membership = membership.astype(float)
+
+    if number_graph_genes:
+        ora_scores = membership[:, gene_mask].sum(axis=1) / number_graph_genes
+    else:
+        ora_scores = np.zeros(len(membership))
+
+    if number_hubs:
+        hub_scores = membership[:, hub_mask].sum(axis=1) / number_hubs
+    else:
+        hub_scores = np.zeros(len(membership))
+
+    if 1 < set_size:
+        topology_scores = (membership.dot(adjacency) * membership).sum(axis=1) / (set_size * (set_size - 1.0))
+    else:
+        topology_scores = np.zeros(len(membership))
+
+    weighted_sum = ora_weight * ora_scores + hub_weight * hub_scores + topology_weight * topology_scores
+    return weighted_sum / (ora_weight + hub_weight + topology_weight)
+
+
+def _iter_random_memberships(random_state, background, local_nodes, set_size, n_permutations, batch_size):
+    """Draws random gene sets from the background and gives their membership over the local nodes in batches
+
+    :param numpy.random.RandomState random_state: The source of randomness
+    :param list[tuple] background: The gene nodes that random gene sets are drawn from
+    :param list[tuple] local_nodes: The nodes that are scored
+    :param int set_size: The number of genes in each random set
+    :param int n_permutations: The total number of random sets
+    :param int batch_size: The maximum number of random sets per batch
+    :rtype: iter[numpy.ndarray]
+    """
+    node_to_local_index = {node: i for i, node in enumerate(local_nodes)}
+    background_to_local = np.array([node_to_local_index.get(node, -1) for node in background])
+
+    remaining = n_permutations
+    while 0 < remaining:
+        size = min(batch_size, remaining)
+        remaining -= size
+
+        # the first set_size positions of a random partition of each row are a uniformly random subset
+        draws = random_state.rand(size, len(background)).argpartition(set_size - 1, axis=1)[:, :set_size]
+        local_draws = background_to_local[draws]
+
+        rows, columns = np.nonzero(0 <= local_draws)
+        membership = np.zeros((size, len(local_nodes)), dtype=bool)
+        membership[rows, local_draws[rows, columns]] = True
+
+        yield membership
+
+
+def _run_permutations(task, parameters):
+    """Calculates the observed score and its empirical p-value for one subgraph
+
+    :param tuple[str,pybel.BELGraph,int] task: The annotation value, subgraph, and random seed
+    :param dict parameters: The parameters shared between all subgraphs
+    :return: The annotation value, the observed score, and the p-value
+    :rtype: tuple[str,float,float]
+    """
+    annotation_value, graph, seed = task
+
+    genes = parameters['genes']
+    background = parameters['background']
+    n_permutations = parameters['n_permutations']
+
+    local_nodes, number_graph_genes, gene_mask, hub_mask, number_hubs, adjacency = _build_kernels(
+        graph, genes, background, parameters['top']
+    )
+
+    def score(membership):
+        return _score_membership(membership, len(genes), number_graph_genes, gene_mask, hub_mask, number_hubs,
+                                 adjacency, parameters['weights'])
+
+    observed_membership = np.array([[node in genes for node in local_nodes]], dtype=bool)
+    observed_score = score(observed_membership)[0]
+
+    random_state = np.random.RandomState(seed)
+    memberships = _iter_random_memberships(random_state, background, local_nodes, len(genes), n_permutations,
+                                           parameters['batch_size'])
+
+    number_as_extreme = sum(
+        int((observed_score <= score(membership)).sum())
+        for membership in memberships
+    )
+
+    p_value = (1 + number_as_extreme) / (1 + n_permutations)
+
+    return annotation_value, observed_score, p_value
+
+
+def _initialize_worker(parameters):
+    """Stores the shared parameters in the worker process so they don't get pickled with every subgraph
+
+    :param dict parameters: The parameters shared between all subgraphs
+    """
+    global _worker_parameters
+    _worker_parameters = parameters
+
+
+def _run_permutations_in_worker(task):
+    """Runs :func:`_run_permutations` with the parameters from :func:`_initialize_worker`
+
+    :param tuple[str,pybel.BELGraph,int] task: The annotation value, subgraph, and random seed
+    :rtype: tuple[str,float,float]
+    """
+    return _run_permutations(task, _worker_parameters)
+
+
+def get_neurommsig_significance_prestratified(it, genes, background, n_permutations=None, ora_weight=None,
+                                              hub_weight=None, top=None, topology_weight=None, seed=None,
+                                              processes=None, batch_size=None):
+    """Takes a graph stratification and calculates the NeuroMMSig score and its empirical p-value for each
+
+    :param iter[tuple[str,pybel.BELGraph]] it: A pre-stratified set of graphs
+    :param list[tuple] genes: A list of gene nodes
+    :param iter[tuple] background: The gene nodes from which size-matched random gene sets are drawn
+    :param Optional[int] n_permutations: The number of random gene sets to score for each subgraph. Defaults to 1000.
+    :param Optional[float] ora_weight: The relative weight of the over-enrichment analysis score from
+     :py:func:`neurommsig_gene_ora`. Defaults to 1.0.
+    :param Optional[float] hub_weight: The relative weight of the hub analysis score from :py:func:`neurommsig_hubs`.
+     Defaults to 1.0.
+    :param Optional[float] top: The percentage of top genes to use as hubs. Defaults to 5% (0.05).
+    :param Optional[float] topology_weight: The relative weight of the topolgical analysis core from
+     :py:func:`neurommsig_topology`. Defaults to 1.0.
+    :param Optional[int] seed: The random seed. The same seed draws the same random gene sets for each subgraph,
+     regardless of the number of processes.
+    :param Optional[int] processes: If given, distributes the subgraphs over this many worker processes
+    :param Optional[int] batch_size: The maximum number of random gene sets to hold in memory at once. Defaults to 500.
+    :return: A dictionary from {annotation value: (NeuroMMSig composite score, p-value)}
+    :rtype: dict[str,tuple[float,float]]
+    :raises: ValueError
+    """
+    genes = set(genes)
+    background = sorted(set(background), key=str)
+
+    if not genes:
+        raise ValueError('can not calculate significance without genes')
+
+    if len(background) < len(genes):
+        raise ValueError('background has fewer genes ({}) than the query ({})'.format(len(background), len(genes)))
+
+    parameters = {
+        'genes': genes,
+        'background': background,
+        'n_permutations': n_permutations or DEFAULT_NUMBER_PERMUTATIONS,
+        'top': top or 0.05,
+        'weights': (ora_weight or 1.0, hub_weight or 1.0, topology_weight or 1.0),
+        'batch_size': batch_size or DEFAULT_BATCH_SIZE,
+    }
+
+    it = sorted(it, key=lambda pair: pair[0])
+
+    # each subgraph gets its own seed so the results don't depend on the order in which they're finished
+    random_state = np.random.RandomState(seed)
+    seeds = random_state.randint(0, np.iinfo('i').max, size=len(it))
+
+    tasks = [
+        (annotation_value, subgraph, subgraph_seed)
+        for (annotation_value, subgraph), subgraph_seed in zip(it, seeds)
+    ]
+
+    if processes is None:
+        results = (_run_permutations(task, parameters) for task in tasks)
+        return {
+            annotation_value: (score, p_value)
+            for annotation_value, score, p_value in results
+        }
+
+    with Pool(processes=processes, initializer=_initialize_worker, initargs=(parameters,)) as pool:
+        return {
+            annotation_value: (score, p_value)
+            for annotation_value, score, p_value in pool.imap_unordered(_run_permutations_in_worker, tasks)
+        }
+
+
+def get_neurommsig_significance(graph, genes, annotation='Subgraph', background=None, n_permutations=None,
+                                ora_weight=None, hub_weight=None, top=None, topology_weight=None, preprocess=False,
+                                seed=None, processes=None, batch_size=None):
+    """Preprocesses the graph, stratifies by the given annotation, then calculates the NeuroMMSig score and its
+    empirical p-value for each subgraph.
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param list[tuple] genes: A list of gene nodes
+    :param str annotation: The annotation to use to stratify the graph to subgraphs
+    :param Optional[iter[tuple]] background: The gene nodes from which size-matched random gene sets are drawn.
+     Defaults to all genes in the graph.
+    :param Optional[int] n_permutations: The number of random gene sets to score for each subgraph. Defaults to 1000.
+    :param Optional[float] ora_weight: The relative weight of the over-enrichment analysis score from
+     :py:func:`neurommsig_gene_ora`. Defaults to 1.0.
+    :param Optional[float] hub_weight: The relative weight of the hub analysis score from :py:func:`neurommsig_hubs`.
+     Defaults to 1.0.
+    :param Optional[float] top: The percentage of top genes to use as hubs. Defaults to 5% (0.05).
+    :param Optional[float] topology_weight: The relative weight of the topolgical analysis core from
+     :py:func:`neurommsig_topology`. Defaults to 1.0.
+    :param bool preprocess: If true, preprocess the graph.
+    :param Optional[int] seed: The random seed
+    :param Optional[int] processes: If given, distributes the subgraphs over this many worker processes
+    :param Optional[int] batch_size: The maximum number of random gene sets to hold in memory at once. Defaults to 500.
+    :return: A dictionary from {annotation value: (NeuroMMSig composite score, p-value)}
+    :rtype: Optional[dict[str,tuple[float,float]]]
+    """
+    if preprocess:
+        graph = neurommsig_graph_preprocessor.run(graph)
+
+    if not any(gene in graph for gene in genes):
+        log.debug('no genes mapping to graph')
+        return
+
+    if background is None:
+        background = get_nodes_by_function(graph, GENE)
+
+    it = get_subgraphs_by_annotation(graph, annotation=annotation).items()
+
+    return get_neurommsig_significance_prestratified(
+        it,
+        genes,
+        background,
+        n_permutations=n_permutations,
+        ora_weight=ora_weight,
+        hub_weight=hub_weight,
+        top=top,
+        topology_weight=topology_weight,
+        seed=seed,
+        processes=processes,
+        batch_size=batch_size,
+    )
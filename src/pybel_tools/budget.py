@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains limits on the size of the graphs made while running a query or pipeline and on the time it
+takes, so runaway expansions stop early instead of growing to the whole universe.
+
+>>> from pybel_tools.budget import Budget
+>>> budget = Budget(max_nodes=10000, max_edges=50000, max_seconds=60)
+>>> query.explain(manager, budget=budget)  # fails before running if the estimates are too big
+>>> graph = query.run(manager, budget=budget)  # fails between steps if the graph or the time get too big
+"""
+
+import time
+
+__all__ = [
+    'Budget',
+    'BudgetExceededError',
+]
+
+
+class BudgetExceededError(RuntimeError):
+    """Raised when a graph gets too big or running takes too long"""
+
+
+class Budget(object):
+    """Limits on the number of nodes and edges in a graph and on the number of seconds spent running"""
+
+    def __init__(self, max_nodes=None, max_edges=None, max_seconds=None):
+        """
+        :param Optional[int] max_nodes: The maximum number of nodes. If none, doesn't limit them.
+        :param Optional[int] max_edges: The maximum number of edges. If none, doesn't limit them.
+        :param Optional[float] max_seconds: The maximum number of seconds. If none, doesn't limit the time.
+        """
+        self.max_nodes = max_nodes
+        self.max_edges = max_edges
+        self.max_seconds = max_seconds
+
+    def check_size(self, number_nodes, number_edges, description):
+        """Checks the number of nodes and edges
+
+        :param int number_nodes: The number of nodes
+        :param int number_edges: The number of edges
+        :param str description: What has the nodes and edges, for the error message
+        :raises: BudgetExceededError
+        """
+        if self.max_nodes is not None and self.max_nodes < number_nodes:
+            raise BudgetExceededError('{} has {} nodes, more than the budget of {}'.format(
+                description, number_nodes, self.max_nodes))
+
+        if self.max_edges is not None and self.max_edges < number_edges:
+            raise BudgetExceededError('{} has {} edges, more than the budget of {}'.format(
+                description, number_edges, self.max_edges))
+
+    def check_graph(self, graph, description):
+        """Checks the number of nodes and edges in a graph
+
+        :param pybel.BELGraph graph: A BEL graph
+        :param str description: What the graph is, for the error message
+        :raises: BudgetExceededError
+        """
+        self.check_size(graph.number_of_nodes(), graph.number_of_edges(), description)
+
+    def check_time(self, started, description):
+        """Checks the time spent since starting
+
+        :param float started: When running started, from :func:`time.time`
+        :param str description: What's about to run, for the error message
+        :raises: BudgetExceededError
+        """
+        if self.max_seconds is None:
+            return
+
+        elapsed = time.time() - started
+
+        if self.max_seconds < elapsed:
+            raise BudgetExceededError('ran for {:.1f} seconds before {}, more than the budget of {} seconds'.format(
+                elapsed, description, self.max_seconds))
+
+    def __repr__(self):
+        return '{}(max_nodes={!r}, max_edges={!r}, max_seconds={!r})'.format(
+            self.__class__.__name__, self.max_nodes, self.max_edges, self.max_seconds)
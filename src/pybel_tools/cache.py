@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a size-bounded on-disk cache for BEL graphs and a content fingerprint to key it with, and an
+in-memory cache of the universes built from sets of networks in the database"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+
+from pybel import from_pickle, to_pickle
+from pybel.struct import union
+from pybel.utils import get_version as get_pybel_version
+
+__all__ = [
+    'hash_graph',
+    'GraphCache',
+    'UniverseCache',
+]
+
+log = logging.getLogger(__name__)
+
+_gpickle_extension = '.gpickle'
+
+
+def _hash_json(*parts):
+    """Hashes the JSON representation of the given objects
+
+    :rtype: bytes
+    """
+    s = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.sha256(s.encode('utf-8')).digest()
+
+
+def hash_graph(graph):
+    """Calculates a fingerprint of the contents of a graph that doesn't depend on the order nodes and edges were added
+
+    :param pybel.BELGraph graph: A BEL graph
+    :return: A hexadecimal digest
+    :rtype: str
+    """
+    node_hashes = sorted(
+        _hash_json(node, data)
+        for node, data in graph.nodes_iter(data=True)
+    )
+
+    edge_hashes = sorted(
+        _hash_json(u, v, data)
+        for u, v, data in graph.edges_iter(data=True)
+    )
+
+    h = hashlib.sha256()
+    h.update(_hash_json(graph.document))
+
+    for node_hash in node_hashes:
+        h.update(node_hash)
+
+    for edge_hash in edge_hashes:
+        h.update(edge_hash)
+
+    return h.hexdigest()
+
+
+class GraphCache(object):
+    """Stores BEL graphs as pickles in a directory and evicts the least recently used ones when it gets too big
+
+    The last access time of each entry is kept in its file's modification time, so the cache can be shared between
+    processes and survives restarts.
+    """
+
+    def __init__(self, directory, max_size=None):
+        """
+        :param str directory: The directory to store the pickles in. Is created if it doesn't exist.
+        :param Optional[int] max_size: The maximum total size of the pickles in bytes. If none, never evicts.
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Makes a key from JSON serializable parts, like a graph fingerprint and a protocol
+
+        The PyBEL version is included so pickles from other versions are never loaded.
+
+        :rtype: str
+        """
+        return hashlib.sha256(_hash_json(get_pybel_version(), *parts)).hexdigest()
+
+    def get_path(self, key):
+        """Gets the path of the pickle for the given key
+
+        :param str key: A key from :meth:`GraphCache.make_key`
+        :rtype: str
+        """
+        return os.path.join(self.directory, key + _gpickle_extension)
+
+    def __contains__(self, key):
+        return os.path.exists(self.get_path(key))
+
+    def get(self, key):
+        """Loads the graph for the given key and marks it as recently used
+
+        :param str key: A key from :meth:`GraphCache.make_key`
+        :return: The graph, or None if it's not in the cache
+        :rtype: Optional[pybel.BELGraph]
+        """
+        path = self.get_path(key)
+
+        try:
+            graph = from_pickle(path)
+        except FileNotFoundError:
+            return
+        except Exception:
+            log.warning('removing unreadable cache entry: %s', path)
+            self._remove(path)
+            return
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:  # evicted by another process in the meantime
+            pass
+
+        return graph
+
+    def set(self, key, graph):
+        """Stores the graph for the given key, then evicts the least recently used entries if the cache is too big
+
+        The pickle is written to a temporary file first, so other processes never read a partially written entry.
+
+        :param str key: A key from :meth:`GraphCache.make_key`
+        :param pybel.BELGraph graph: A BEL graph
+        """
+        path = self.get_path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        os.close(fd)
+
+        try:
+            to_pickle(graph, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        self.evict(keep=path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _iter_entries(self):
+        """Iterates over the entries in the cache
+
+        :return: An iterator over triples of the path, the size in bytes, and the last access time
+        :rtype: iter[tuple[str,int,float]]
+        """
+        for name in os.listdir(self.directory):
+            if not name.endswith(_gpickle_extension):
+                continue
+
+            path = os.path.join(self.directory, name)
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            yield path, stat.st_size, stat.st_mtime
+
+    def get_size(self):
+        """Gets the total size of the pickles in the cache in bytes
+
+        :rtype: int
+        """
+        return sum(size for _, size, _ in self._iter_entries())
+
+    def evict(self, keep=None):
+        """Removes the least recently used entries until the cache fits in its maximum size
+
+        :param Optional[str] keep: The path of an entry not to remove, even if it's bigger than the maximum size
+        :return: The number of entries removed
+        :rtype: int
+        """
+        if self.max_size is None:
+            return 0
+
+        entries = sorted(self._iter_entries(), key=lambda entry: entry[2])
+        size = sum(entry_size for _, entry_size, _ in entries)
+
+        count = 0
+
+        for path, entry_size, _ in entries:
+            if size <= self.max_size:
+                break
+
+            if path == keep:
+                continue
+
+            log.debug('evicting %s', path)
+            self._remove(path)
+            size -= entry_size
+            count += 1
+
+        return count
+
+    def clear(self):
+        """Removes all entries from the cache"""
+        for path, _, _ in self._iter_entries():
+            self._remove(path)
+
+
+class UniverseCache(object):
+    """Keeps the universes built from sets of networks in memory and evicts the least recently used ones when there
+    are too many or they're too big
+
+    A universe for a set of networks that isn't cached is built from the largest cached universe for a subset of them,
+    so only the networks that are missing from it are loaded from the database.
+
+    The cached universes are shared between all users of the cache, so they must not be modified.
+    """
+
+    def __init__(self, max_entries=8, max_edges=None):
+        """
+        :param Optional[int] max_entries: The maximum number of universes to keep. If none, doesn't limit the number.
+        :param Optional[int] max_edges: The maximum total number of edges in the universes to keep. If none, doesn't
+                                        limit the size. The most recently used universe is always kept.
+        """
+        self.max_entries = max_entries
+        self.max_edges = max_edges
+
+        #: A dictionary from the sorted tuples of network identifiers to their universes, in the order they were used
+        self._universes = OrderedDict()
+
+        #: A dictionary from the sorted tuples of network identifiers to the number of edges in their universes
+        self._sizes = {}
+
+    @staticmethod
+    def make_key(network_ids):
+        """Makes a key from network identifiers that doesn't depend on their order or repetition
+
+        :param iter[int] network_ids: Database network identifiers
+        :rtype: tuple[int]
+        """
+        return tuple(sorted(set(network_ids)))
+
+    def __contains__(self, network_ids):
+        return self.make_key(network_ids) in self._universes
+
+    def __len__(self):
+        return len(self._universes)
+
+    def _get_largest_subset(self, key):
+        """Gets the key of the cached universe with the most networks that are all in the given key
+
+        :param tuple[int] key: A key from :meth:`make_key`
+        :rtype: Optional[tuple[int]]
+        """
+        network_ids = set(key)
+
+        candidates = [
+            cached_key
+            for cached_key in self._universes
+            if network_ids.issuperset(cached_key)
+        ]
+
+        if not candidates:
+            return
+
+        return max(candidates, key=len)
+
+    def get(self, manager, network_ids):
+        """Gets the universe for the given networks, building and caching it if it isn't cached yet
+
+        :param pybel.manager.Manager manager: A cache manager
+        :param iter[int] network_ids: Database network identifiers
+        :return: The union of the networks. It must not be modified.
+        :rtype: pybel.BELGraph
+        """
+        key = self.make_key(network_ids)
+
+        universe = self._universes.get(key)
+
+        if universe is not None:
+            log.debug('using cached universe for networks: %s', key)
+            self._universes.move_to_end(key)
+            return universe
+
+        base_key = self._get_largest_subset(key)
+
+        if base_key is None:
+            universe = manager.get_graph_by_ids(list(key))
+        else:
+            missing = [network_id for network_id in key if network_id not in base_key]
+            log.debug('extending cached universe for networks %s with networks: %s', base_key, missing)
+
+            self._universes.move_to_end(base_key)
+            universe = union([self._universes[base_key], manager.get_graph_by_ids(missing)])
+
+        self.set(key, universe)
+
+        return universe
+
+    def set(self, key, universe):
+        """Stores the universe for the given key, then evicts the least recently used universes if there are too many
+        or they're too big
+
+        :param tuple[int] key: A key from :meth:`make_key`
+        :param pybel.BELGraph universe: The union of the networks
+        """
+        self._universes[key] = universe
+        self._universes.move_to_end(key)
+        self._sizes[key] = universe.number_of_edges()
+
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used universes until the cache fits in its limits
+
+        :return: The number of universes removed
+        :rtype: int
+        """
+        count = 0
+
+        while 1 < len(self._universes) and self._is_too_big():
+            key, _ = self._universes.popitem(last=False)
+            del self._sizes[key]
+            log.debug('evicting universe for networks: %s', key)
+            count += 1
+
+        return count
+
+    def _is_too_big(self):
+        if self.max_entries is not None and self.max_entries < len(self._universes):
+            return True
+
+        return self.max_edges is not None and self.max_edges < sum(self._sizes.values())
+
+    def clear(self):
+        """Removes all universes from the cache"""
+        self._universes.clear()
+        self._sizes.clear()
@@ -176,9 +176,10 @@ def post(path, url, skip_check_version):
 @click.option('-v', '--debug', count=True, help="Turn on debugging. More v's, more debugging")
 @click.option('--uncool', is_flag=True, help='disable cool mode')
 @click.option('-c', '--collate', is_flag=True, help='Make a single graph')
+@click.option('-j', '--jobs', type=int, help='Number of worker processes to parse with. Defaults to parsing here.')
 @click.pass_obj
 def convert(manager, enable_upload, enrich_citations, no_citation_clearing, allow_nested, directory, use_stdin,
-            send_pybel_web, exclude_directory_pattern, debug, uncool, collate):
+            send_pybel_web, exclude_directory_pattern, debug, uncool, collate, jobs):
     """Recursively walks the file tree and converts BEL scripts to gpickles. Optional uploader"""
     set_debug_param(debug)
 
@@ -198,7 +199,8 @@ def convert(manager, enable_upload, enrich_citations, no_citation_clearing, allo
         citation_clearing=(not no_citation_clearing),
         allow_nested=allow_nested,
         send=send_pybel_web,
-        use_tqdm=True
+        n_jobs=jobs,
+        use_tqdm=(jobs is None or jobs <= 1)
     )
 
     for path, e in failures:
@@ -476,5 +478,32 @@ def get_pmids(path, output):
         click.echo(pmid, file=output)
 
 
+@main.command()
+@click.option('-c', '--connection', help='Cache connection. Defaults to {}'.format(get_cache_connection()))
+@click.option('-n', '--network-ids', multiple=True,
+              help='Comma-separated database network identifiers of a universe to load at startup. Can be repeated.')
+@click.option('-s', '--socket', 'path', help='Path of the socket. Defaults to ~/.pybel/pybel_tools.sock')
+@click.option('-p', '--processes', type=int, help='Number of worker processes. Defaults to the number of CPUs.')
+@click.option('-t', '--timeout', type=float, help='Number of seconds each query can run')
+@click.option('-v', '--debug', count=True, help="Turn on debugging. More v's, more debugging")
+def daemon(connection, network_ids, path, processes, timeout, debug):
+    """Answers queries over a Unix socket with universes kept in memory"""
+    from functools import partial
+    from pybel.manager.cache_manager import Manager
+    from .daemon import QueryDaemon
+
+    set_debug_param(debug)
+
+    universes = [
+        [int(network_id) for network_id in ids.split(',')]
+        for ids in network_ids
+    ]
+
+    with QueryDaemon(partial(Manager, connection=connection), universes=universes, path=path, processes=processes,
+                     timeout=timeout) as query_daemon:
+        click.echo('Listening on {}'.format(query_daemon.path))
+        query_daemon.serve_forever()
+
+
 if __name__ == '__main__':
     main()
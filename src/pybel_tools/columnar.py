@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a compact binary format for BEL graphs that's read with :class:`numpy.memmap`, so opening a
+graph doesn't unpickle its nodes and edges. Analyses can use its arrays directly, and
+:meth:`ColumnarGraph.to_bel_graph` builds a :class:`pybel.BELGraph` only when one is needed.
+
+>>> from pybel_tools.columnar import from_columnar, to_columnar
+>>> to_columnar(graph, 'my_graph.bgraph')
+>>> columnar_graph = from_columnar('my_graph.bgraph')  # opens the file without reading it
+>>> columnar_graph.count_relations()
+Counter({'increases': 3201, 'decreases': 1802, ...})
+>>> graph = columnar_graph.to_bel_graph()
+
+The file has a short header followed by these arrays:
+
+- ``string_offsets`` and ``string_data``: a table of the strings used in the rest of the file, each stored once. String
+  ``i`` is the UTF-8 in ``string_data[string_offsets[i]:string_offsets[i + 1]]``.
+- ``node_tuples`` and ``node_data``: the index of the JSON of each node's tuple and data dictionary in the string table.
+  Tuples in the data dictionaries are written as ``{"__tuple__": [...]}`` so they're read back as tuples.
+- ``edge_offsets`` and ``edge_targets``: the edges in compressed sparse row format, so the edges from node ``i`` go to
+  the nodes in ``edge_targets[edge_offsets[i]:edge_offsets[i + 1]]``. The rest of the edge arrays are in the same order.
+- ``edge_keys``: the key of each edge in the multigraph
+- ``edge_relations``: the code of each edge's relation, from the list of relations in the header
+- ``edge_citations``, ``edge_evidences``, ``edge_annotations``, and ``edge_extras``: the index of the JSON of each
+  edge's citation, its evidence, the JSON of its annotations, and the JSON of the rest of its data in the string table,
+  or -1 if it doesn't have any
+
+The graph's metadata, like its document and its namespace definitions, is kept in the header.
+"""
+
+import copy
+import json
+import logging
+import os
+import pickle
+import struct
+from collections import Counter
+
+import numpy as np
+
+from pybel import BELGraph
+from pybel.constants import ANNOTATIONS, CITATION, EVIDENCE, RELATION
+
+__all__ = [
+    'ColumnarGraph',
+    'to_columnar',
+    'from_columnar',
+]
+
+log = logging.getLogger(__name__)
+
+_MAGIC = b'PBTCOL01'
+_ALIGNMENT = 64
+_header_size_format = '<Q'
+
+#: The edge data keys with their own columns
+_COLUMN_KEYS = (RELATION, CITATION, EVIDENCE, ANNOTATIONS)
+
+#: The key of the JSON objects that stand in for tuples in node and edge data
+_TUPLE_KEY = '__tuple__'
+
+
+def _to_tuple(value):
+    """Converts the lists from JSON back to the tuples of a node
+
+    :param value: A node's tuple after a trip through JSON
+    :rtype: tuple
+    """
+    if isinstance(value, list):
+        return tuple(_to_tuple(element) for element in value)
+    return value
+
+
+def _mark_tuples(value):
+    """Replaces the tuples in node or edge data with JSON objects, since JSON would make them lists
+
+    :param value: A data dictionary, or a value in one
+    """
+    if isinstance(value, tuple):
+        return {_TUPLE_KEY: [_mark_tuples(element) for element in value]}
+
+    if isinstance(value, list):
+        return [_mark_tuples(element) for element in value]
+
+    if isinstance(value, dict):
+        return {key: _mark_tuples(element) for key, element in value.items()}
+
+    return value
+
+
+def _restore_tuple(obj):
+    """Turns the JSON objects from :func:`_mark_tuples` back into tuples, as the ``object_hook`` of :func:`json.loads`
+
+    :param dict obj: A decoded JSON object
+    """
+    if len(obj) == 1 and _TUPLE_KEY in obj:
+        return tuple(obj[_TUPLE_KEY])
+
+    return obj
+
+
+class _StringTable(object):
+    """Gives each distinct string an index"""
+
+    def __init__(self):
+        self.indexes = {}
+        self.strings = []
+
+    def add(self, string):
+        index = self.indexes.get(string)
+
+        if index is None:
+            index = self.indexes[string] = len(self.strings)
+            self.strings.append(string)
+
+        return index
+
+    def add_json(self, value):
+        return self.add(json.dumps(value, sort_keys=True))
+
+    def add_data(self, data):
+        return self.add_json(_mark_tuples(data))
+
+    def to_arrays(self):
+        encoded = [string.encode('utf-8') for string in self.strings]
+
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+
+        return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def to_columnar(graph, path):
+    """Writes a graph in the columnar format
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param str path: The path to write to. By convention, ends with ``.bgraph``.
+    """
+    strings = _StringTable()
+
+    nodes = graph.nodes()
+    node_indexes = {node: index for index, node in enumerate(nodes)}
+
+    node_tuples = np.array([strings.add_json(node) for node in nodes], dtype=np.int32)
+    node_data = np.array([strings.add_data(graph.node[node]) for node in nodes], dtype=np.int32)
+
+    edges = sorted(
+        (
+            (node_indexes[u], node_indexes[v], k, data)
+            for u, v, k, data in graph.edges_iter(keys=True, data=True)
+        ),
+        key=lambda edge: edge[0]
+    )
+
+    number_edges = len(edges)
+    relations = sorted({data[RELATION] for _, _, _, data in edges})
+    relation_codes = {relation: code for code, relation in enumerate(relations)}
+
+    edge_offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount([u for u, _, _, _ in edges], minlength=len(nodes)), out=edge_offsets[1:])
+
+    edge_targets = np.empty(number_edges, dtype=np.int32)
+    edge_keys = np.empty(number_edges, dtype=np.int64)
+    edge_relations = np.empty(number_edges, dtype=np.uint8 if len(relations) < 2 ** 8 else np.uint16)
+    edge_citations = np.full(number_edges, -1, dtype=np.int32)
+    edge_evidences = np.full(number_edges, -1, dtype=np.int32)
+    edge_annotations = np.full(number_edges, -1, dtype=np.int32)
+    edge_extras = np.full(number_edges, -1, dtype=np.int32)
+
+    for i, (_, v, k, data) in enumerate(edges):
+        edge_targets[i] = v
+        edge_keys[i] = k
+        edge_relations[i] = relation_codes[data[RELATION]]
+
+        if CITATION in data:
+            edge_citations[i] = strings.add_json(data[CITATION])
+
+        if EVIDENCE in data:
+            edge_evidences[i] = strings.add(data[EVIDENCE])
+
+        if ANNOTATIONS in data:
+            edge_annotations[i] = strings.add_json(data[ANNOTATIONS])
+
+        extras = {key: value for key, value in data.items() if key not in _COLUMN_KEYS}
+        if extras:
+            edge_extras[i] = strings.add_data(extras)
+
+    string_offsets, string_data = strings.to_arrays()
+
+    arrays = [
+        ('string_offsets', string_offsets),
+        ('string_data', string_data),
+        ('node_tuples', node_tuples),
+        ('node_data', node_data),
+        ('edge_offsets', edge_offsets),
+        ('edge_targets', edge_targets),
+        ('edge_keys', edge_keys),
+        ('edge_relations', edge_relations),
+        ('edge_citations', edge_citations),
+        ('edge_evidences', edge_evidences),
+        ('edge_annotations', edge_annotations),
+        ('edge_extras', edge_extras),
+    ]
+
+    _write(path, arrays, relations, graph.graph)
+
+
+def _write(path, arrays, relations, metadata):
+    """Writes the header then the arrays, each starting at a multiple of :data:`_ALIGNMENT`
+
+    :param str path: The path to write to
+    :param list[tuple[str,numpy.ndarray]] arrays: The names and contents of the arrays
+    :param list[str] relations: The relation of each code
+    :param dict metadata: The graph's metadata
+    """
+    layout = {}
+    offset = 0
+
+    for name, array in arrays:
+        layout[name] = {'dtype': array.dtype.str, 'length': len(array), 'offset': offset}
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    header = pickle.dumps(
+        {'arrays': layout, 'relations': relations, 'metadata': metadata},
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
+
+    prefix_size = len(_MAGIC) + struct.calcsize(_header_size_format) + len(header)
+    data_start = -(-prefix_size // _ALIGNMENT) * _ALIGNMENT
+
+    tmp_path = path + '.tmp'
+
+    with open(tmp_path, 'wb') as file:
+        file.write(_MAGIC)
+        file.write(struct.pack(_header_size_format, len(header)))
+        file.write(header)
+
+        for name, array in arrays:
+            file.seek(data_start + layout[name]['offset'])
+            file.write(array.tobytes())
+
+        file.truncate(data_start + offset)
+
+    os.replace(tmp_path, path)
+
+
+class ColumnarGraph(object):
+    """A BEL graph read from the columnar format. The arrays are mapped from the file, so they're only read from disk as
+    they're used, and they can't be changed.
+    """
+
+    def __init__(self, path):
+        """
+        :param str path: The path to a file written by :func:`to_columnar`
+        :raises: ValueError
+        """
+        self.path = path
+
+        with open(path, 'rb') as file:
+            if file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError('Not a columnar BEL graph: {}'.format(path))
+
+            header_size, = struct.unpack(_header_size_format, file.read(struct.calcsize(_header_size_format)))
+            header = pickle.loads(file.read(header_size))
+            prefix_size = file.tell()
+
+        data_start = -(-prefix_size // _ALIGNMENT) * _ALIGNMENT
+
+        #: The relation of each code in :data:`edge_relations`
+        self.relations = header['relations']
+
+        #: The graph's metadata, like :data:`pybel.BELGraph.graph`
+        self.metadata = header['metadata']
+
+        for name, spec in header['arrays'].items():
+            if spec['length'] == 0:
+                array = np.empty(0, dtype=spec['dtype'])
+            else:
+                array = np.memmap(path, dtype=spec['dtype'], mode='r', offset=data_start + spec['offset'],
+                                  shape=(spec['length'],))
+
+            setattr(self, name, array)
+
+    def number_of_nodes(self):
+        """Counts the nodes
+
+        :rtype: int
+        """
+        return len(self.node_tuples)
+
+    def number_of_edges(self):
+        """Counts the edges
+
+        :rtype: int
+        """
+        return len(self.edge_targets)
+
+    def get_string(self, index):
+        """Gets a string from the string table
+
+        :param int index: The index of the string
+        :rtype: str
+        """
+        return bytes(self.string_data[self.string_offsets[index]:self.string_offsets[index + 1]]).decode('utf-8')
+
+    def _get_json(self, index):
+        return json.loads(self.get_string(index))
+
+    def _get_data(self, index):
+        return json.loads(self.get_string(index), object_hook=_restore_tuple)
+
+    def get_node(self, index):
+        """Gets the tuple of a node
+
+        :param int index: The index of the node
+        :rtype: tuple
+        """
+        return _to_tuple(self._get_json(self.node_tuples[index]))
+
+    def get_node_data(self, index):
+        """Gets the data dictionary of a node
+
+        :param int index: The index of the node
+        :rtype: dict
+        """
+        return self._get_data(self.node_data[index])
+
+    def get_edge_sources(self):
+        """Gets the index of the source node of each edge, which is stored implicitly by :data:`edge_offsets`
+
+        :rtype: numpy.ndarray
+        """
+        return np.repeat(np.arange(self.number_of_nodes(), dtype=np.int32), np.diff(self.edge_offsets))
+
+    def get_edge_data(self, index):
+        """Builds the data dictionary of an edge
+
+        :param int index: The index of the edge
+        :rtype: dict
+        """
+        return self._build_edge_data(index)
+
+    def _build_edge_data(self, index, evidences=None):
+        """Builds the data dictionary of an edge
+
+        :param int index: The index of the edge
+        :param Optional[dict[int,str]] evidences: A dictionary from the indexes of evidence strings to the ones already
+                                                  read, so edges with the same evidence share it
+        :rtype: dict
+        """
+        extras = self.edge_extras[index]
+        data = self._get_data(extras) if extras != -1 else {}
+
+        data[RELATION] = self.relations[self.edge_relations[index]]
+
+        citation = self.edge_citations[index]
+        if citation != -1:
+            data[CITATION] = self._get_json(citation)
+
+        evidence = self.edge_evidences[index]
+        if evidence != -1:
+            if evidences is None:
+                data[EVIDENCE] = self.get_string(evidence)
+            else:
+                if evidence not in evidences:
+                    evidences[evidence] = self.get_string(evidence)
+                data[EVIDENCE] = evidences[evidence]
+
+        annotations = self.edge_annotations[index]
+        if annotations != -1:
+            data[ANNOTATIONS] = self._get_json(annotations)
+
+        return data
+
+    def count_relations(self):
+        """Counts the edges with each relation without building the graph
+
+        :rtype: collections.Counter
+        """
+        counts = np.bincount(self.edge_relations, minlength=len(self.relations))
+
+        return Counter({
+            relation: int(count)
+            for relation, count in zip(self.relations, counts)
+            if count
+        })
+
+    def get_degrees(self):
+        """Counts the edges going out of and into each node without building the graph
+
+        :return: A pair of arrays with the out-degree and in-degree of each node
+        :rtype: tuple[numpy.ndarray,numpy.ndarray]
+        """
+        out_degrees = np.diff(self.edge_offsets)
+        in_degrees = np.bincount(self.edge_targets, minlength=self.number_of_nodes())
+        return out_degrees, in_degrees
+
+    def to_bel_graph(self):
+        """Builds the graph. Each call builds a new one that can be modified without changing the others.
+
+        :rtype: pybel.BELGraph
+        """
+        graph = BELGraph()
+        graph.graph.update(copy.deepcopy(self.metadata))
+
+        nodes = [self.get_node(index) for index in range(self.number_of_nodes())]
+
+        for index, node in enumerate(nodes):
+            graph.add_node(node, attr_dict=self.get_node_data(index))
+
+        # evidences are strings, so they can be shared between edges without one edge's changes affecting another's
+        evidences = {}
+        sources = self.get_edge_sources()
+
+        for index in range(self.number_of_edges()):
+            graph.add_edge(nodes[sources[index]], nodes[self.edge_targets[index]], key=int(self.edge_keys[index]),
+                           attr_dict=self._build_edge_data(index, evidences=evidences))
+
+        return graph
+
+
+def from_columnar(path):
+    """Opens a graph written by :func:`to_columnar`
+
+    :param str path: The path to the graph
+    :rtype: ColumnarGraph
+    :raises: ValueError
+    """
+    return ColumnarGraph(path)
@@ -25,6 +25,15 @@ title_url_fmt = "http://togows.dbcls.jp/entry/ncbi-pubmed/{}/title"
 #: SO gives short citation information
 so_url_fmt = "http://togows.dbcls.jp/entry/ncbi-pubmed/{}/so"
 
+#: The names of pipeline functions that only add the RNAs and genes inferred from the central dogma, which keep the
+#: namespace and name of the node they're inferred from, and the edges to them. Removing pathologies, biological
+#: processes, nodes from a given namespace, or associations gives the same result before or after them.
+CENTRAL_DOGMA_INFERENCES = {
+    'infer_central_dogma',
+    'infer_central_dogmatic_translations',
+    'infer_central_dogmatic_transcriptions',
+}
+
 CNAME = 'cname'
 DATA_WEIGHT = 'weight'
 
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a copy-on-write overlay for BEL graphs, so out-of-place algorithms don't have to copy the whole
+graph up front.
+
+A :class:`CopyOnWriteGraph` reads the nodes, edges, and their data from its parent and only records which nodes and
+edges have been removed. The structure is copied the first time it's changed in any other way (or when the adjacency
+dictionaries are accessed directly), and then only the parts that haven't been removed are copied.
+
+>>> from pybel_tools.copy_on_write import copy_on_write
+>>> network = ...
+>>> result = copy_on_write(network)
+>>> result.remove_nodes_from(...)  # the network isn't modified and nothing has been copied yet
+>>> result.add_edge(...)  # the remaining nodes and edges are copied before adding the edge
+
+The parent must not be modified while a copy that hasn't been materialized is still in use.
+"""
+
+import copy
+import logging
+from collections.abc import MutableMapping
+
+from networkx import NetworkXError
+
+from pybel import BELGraph
+
+__all__ = [
+    'CopyOnWriteGraph',
+    'copy_on_write',
+]
+
+log = logging.getLogger(__name__)
+
+
+def _copy_data(data):
+    """Copies a node or edge data dictionary, including the dictionaries and lists nested in it
+
+    BEL data dictionaries only contain dictionaries, lists, and immutable values, so this gives the same result as
+    :func:`copy.deepcopy` much faster.
+
+    :param dict data: A data dictionary
+    :rtype: dict
+    """
+    return {
+        key: _copy_data(value) if isinstance(value, dict) else list(value) if isinstance(value, list) else value
+        for key, value in data.items()
+    }
+
+
+def _make_bel_graph(state):
+    """Makes a BEL graph from its instance dictionary
+
+    :param dict state: The instance dictionary
+    :rtype: pybel.BELGraph
+    """
+    graph = BELGraph.__new__(BELGraph)
+    graph.__dict__.update(state)
+    return graph
+
+
+class _FrozenDict(dict):
+    """A dictionary that can't be modified, to give out the parent's edge data before the structure is copied"""
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('edge data from an unmaterialized copy-on-write graph is read-only. Use graph.edge instead.')
+
+    __setitem__ = __delitem__ = pop = popitem = clear = setdefault = _read_only
+
+    def update(self, *args, **kwargs):
+        # networkx calls update with the (usually empty) keyword arguments on the attr_dict given to add_edge
+        if kwargs or any(args):
+            self._read_only()
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class _NodeOverlay(MutableMapping):
+    """Stands in for the node dictionary of a :class:`CopyOnWriteGraph` until it's materialized
+
+    The data dictionary of a node is copied the first time it's looked up, so it can be modified without changing the
+    parent.
+    """
+
+    def __init__(self, graph):
+        """
+        :param CopyOnWriteGraph graph: The graph this overlays the nodes of
+        """
+        self._graph = graph
+
+    def __contains__(self, node):
+        return node in self._graph._cow_base.node and node not in self._graph._cow_removed_nodes
+
+    def __getitem__(self, node):
+        if node not in self:
+            raise KeyError(node)
+
+        cache = self._graph._cow_node_cache
+
+        if node not in cache:
+            cache[node] = _copy_data(self._graph._cow_base.node[node])
+
+        return cache[node]
+
+    def __iter__(self):
+        removed_nodes = self._graph._cow_removed_nodes
+
+        for node in self._graph._cow_base.node:
+            if node not in removed_nodes:
+                yield node
+
+    def __len__(self):
+        return len(self._graph._cow_base.node) - len(self._graph._cow_removed_nodes)
+
+    def __setitem__(self, node, data):
+        self._graph.materialize().node[node] = data
+
+    def __delitem__(self, node):
+        del self._graph.materialize().node[node]
+
+
+class CopyOnWriteGraph(BELGraph):
+    """A BEL graph that shares its nodes, edges, and their data with a parent graph until it's modified
+
+    Before it's materialized, the following don't copy anything:
+
+    - checking, counting, and iterating over nodes
+    - looking up a node's data, which copies only that node's data dictionary
+    - checking, counting, and iterating over edges. The edge data given by :meth:`edges_iter` is read-only; use
+      :code:`graph.edge[u][v][key]` to modify it, which materializes the graph.
+    - removing nodes and edges
+
+    Everything else, including accessing :code:`graph.adj`, :code:`graph.succ`, :code:`graph.pred`, or
+    :code:`graph.edge`, first materializes the graph by copying the remaining structure and data.
+    """
+
+    def __new__(cls, parent=None, **kwargs):
+        # networkx makes empty graphs of the same class, like in subgraph, and those don't need to be copy-on-write
+        if parent is None:
+            return BELGraph(**kwargs)
+
+        return super(CopyOnWriteGraph, cls).__new__(cls)
+
+    def __init__(self, parent):
+        """
+        :param pybel.BELGraph parent: The graph to copy. If it's a copy-on-write graph that hasn't been materialized,
+                                      the new graph overlays the same parent instead.
+        """
+        # networkx's constructor isn't called since it would assign empty structures. The journal of a
+        # pybel_tools.journal.JournaledGraph parent isn't copied either.
+        for key, value in parent.__dict__.items():
+            if key.startswith(('_cow_', '_journal')) or key in {'node', 'adj', 'succ', 'pred', 'edge'}:
+                continue
+            self.__dict__[key] = copy.deepcopy(value)
+
+        self._cow_node = self._cow_succ = self._cow_pred = None
+
+        if isinstance(parent, CopyOnWriteGraph) and not parent.is_materialized:
+            self._cow_base = parent._cow_base
+            self._cow_base_edges = parent._cow_base_edges
+            self._cow_removed_nodes = set(parent._cow_removed_nodes)
+            self._cow_removed_edges = set(parent._cow_removed_edges)
+            self._cow_removed_edge_count = parent._cow_removed_edge_count
+            self._cow_node_cache = {node: _copy_data(data) for node, data in parent._cow_node_cache.items()}
+        else:
+            self._cow_base = parent
+            self._cow_base_edges = None
+            self._cow_removed_nodes = set()
+            self._cow_removed_edges = set()
+            self._cow_removed_edge_count = 0
+            self._cow_node_cache = {}
+
+    @property
+    def is_materialized(self):
+        """Has this graph copied its structure from its parent?
+
+        :rtype: bool
+        """
+        return self._cow_succ is not None
+
+    def materialize(self):
+        """Copies the nodes and edges that haven't been removed from the parent, if this hasn't been done yet
+
+        :return: This graph
+        :rtype: CopyOnWriteGraph
+        """
+        if self.is_materialized:
+            return self
+
+        base = self._cow_base
+        removed_nodes = self._cow_removed_nodes
+        removed_edges = self._cow_removed_edges
+        node_cache = self._cow_node_cache
+
+        log.debug('materializing copy-on-write graph with %d removed nodes and %d removed edges', len(removed_nodes),
+                  self._cow_removed_edge_count)
+
+        node = {
+            n: node_cache[n] if n in node_cache else _copy_data(data)
+            for n, data in base.node.items()
+            if n not in removed_nodes
+        }
+        succ = {n: {} for n in node}
+        pred = {n: {} for n in node}
+
+        for u, neighbors in base.succ.items():
+            if u in removed_nodes:
+                continue
+
+            for v, keydict in neighbors.items():
+                if v in removed_nodes:
+                    continue
+
+                new_keydict = {
+                    key: _copy_data(data)
+                    for key, data in keydict.items()
+                    if (u, v, key) not in removed_edges
+                }
+
+                # the key dictionary is shared between the successors and predecessors, like in networkx
+                if new_keydict:
+                    succ[u][v] = pred[v][u] = new_keydict
+
+        self._cow_node, self._cow_succ, self._cow_pred = node, succ, pred
+
+        # new objects are assigned so iterators started before materializing aren't affected
+        self._cow_base = None
+        self._cow_removed_nodes = set()
+        self._cow_removed_edges = set()
+        self._cow_node_cache = {}
+
+        return self
+
+    def to_bel_graph(self):
+        """Materializes this graph and gives a plain :class:`pybel.BELGraph` with the same contents
+
+        The contents are shared with the returned graph, so this graph shouldn't be used afterwards.
+
+        :rtype: pybel.BELGraph
+        """
+        return _make_bel_graph(self._get_bel_graph_state())
+
+    def _get_bel_graph_state(self):
+        """Materializes this graph and gives the instance dictionary of a plain BEL graph with the same contents
+
+        :rtype: dict
+        """
+        self.materialize()
+
+        state = {
+            key: value
+            for key, value in self.__dict__.items()
+            if not key.startswith('_cow_')
+        }
+        state['node'] = self._cow_node
+        state['adj'] = state['succ'] = state['edge'] = self._cow_succ
+        state['pred'] = self._cow_pred
+
+        return state
+
+    def __reduce_ex__(self, protocol):
+        # pickles and deep copies are plain BEL graphs, since they don't have a parent to share with
+        return _make_bel_graph, (self._get_bel_graph_state(),)
+
+    def copy(self):
+        """Copies this graph. If it hasn't been materialized, the copy overlays the same parent.
+
+        :rtype: pybel.BELGraph
+        """
+        if not self.is_materialized:
+            return CopyOnWriteGraph(self)
+
+        return copy.deepcopy(self)
+
+    @property
+    def node(self):
+        if not self.is_materialized:
+            return _NodeOverlay(self)
+
+        return self._cow_node
+
+    @node.setter
+    def node(self, value):
+        self.materialize()
+        self._cow_node = value
+
+    @property
+    def succ(self):
+        return self.materialize()._cow_succ
+
+    @succ.setter
+    def succ(self, value):
+        self.materialize()
+        self._cow_succ = value
+
+    adj = edge = succ
+
+    @property
+    def pred(self):
+        return self.materialize()._cow_pred
+
+    @pred.setter
+    def pred(self, value):
+        self.materialize()
+        self._cow_pred = value
+
+    def _iter_keys(self, u, v):
+        """Iterates over the keys of the edges from u to v that haven't been removed, before materializing
+
+        :rtype: iter
+        """
+        if u in self._cow_removed_nodes or v in self._cow_removed_nodes:
+            return
+
+        for key in self._cow_base.succ.get(u, {}).get(v, {}):
+            if (u, v, key) not in self._cow_removed_edges:
+                yield key
+
+    def _count_incident_edges(self, n):
+        """Counts the edges to and from a node that haven't been removed, before materializing
+
+        :rtype: int
+        """
+        count = sum(
+            sum(1 for _ in self._iter_keys(n, v))
+            for v in self._cow_base.succ[n]
+        )
+
+        count += sum(
+            sum(1 for _ in self._iter_keys(u, n))
+            for u in self._cow_base.pred[n]
+            if u != n  # self-loops were already counted
+        )
+
+        return count
+
+    def has_edge(self, u, v, key=None):
+        if self.is_materialized:
+            return super(CopyOnWriteGraph, self).has_edge(u, v, key=key)
+
+        if key is None:
+            return any(True for _ in self._iter_keys(u, v))
+
+        return key in set(self._iter_keys(u, v))
+
+    def number_of_edges(self, u=None, v=None):
+        if self.is_materialized:
+            return super(CopyOnWriteGraph, self).number_of_edges(u=u, v=v)
+
+        if u is not None:
+            return sum(1 for _ in self._iter_keys(u, v))
+
+        if self._cow_base_edges is None:
+            self._cow_base_edges = self._cow_base.number_of_edges()
+
+        return self._cow_base_edges - self._cow_removed_edge_count
+
+    def edges_iter(self, nbunch=None, data=False, keys=False, default=None):
+        if self.is_materialized or nbunch is not None:
+            return super(CopyOnWriteGraph, self).edges_iter(nbunch=nbunch, data=data, keys=keys, default=default)
+
+        return self._iter_overlay_edges(data, keys, default)
+
+    def _iter_overlay_edges(self, data, keys, default):
+        """Iterates over the parent's edges that haven't been removed, like :meth:`networkx.MultiDiGraph.edges_iter`"""
+        removed_nodes = self._cow_removed_nodes
+        removed_edges = self._cow_removed_edges
+
+        for u, v, key, d in self._cow_base.edges_iter(keys=True, data=True):
+            if u in removed_nodes or v in removed_nodes or (u, v, key) in removed_edges:
+                continue
+
+            if data is True:
+                d = _FrozenDict(d)
+            elif data is not False:
+                d = d.get(data, default)
+            else:
+                yield (u, v, key) if keys else (u, v)
+                continue
+
+            yield (u, v, key, d) if keys else (u, v, d)
+
+    def remove_node(self, n):
+        if self.is_materialized:
+            return super(CopyOnWriteGraph, self).remove_node(n)
+
+        if n not in self.node:
+            raise NetworkXError('The node %s is not in the digraph.' % (n,))
+
+        self._cow_removed_edge_count += self._count_incident_edges(n)
+        self._cow_removed_nodes.add(n)
+        self._cow_node_cache.pop(n, None)
+
+    def remove_nodes_from(self, nbunch):
+        if self.is_materialized:
+            return super(CopyOnWriteGraph, self).remove_nodes_from(nbunch)
+
+        for n in nbunch:
+            if n in self.node:
+                self.remove_node(n)
+
+    def remove_edge(self, u, v, key=None):
+        if self.is_materialized:
+            return super(CopyOnWriteGraph, self).remove_edge(u, v, key=key)
+
+        live_keys = list(self._iter_keys(u, v))
+
+        if not live_keys:
+            raise NetworkXError('The edge %s-%s is not in the graph.' % (u, v))
+
+        if key is None:
+            key = live_keys[-1]
+        elif key not in live_keys:
+            raise NetworkXError('The edge %s-%s with key %s is not in the graph.' % (u, v, key))
+
+        self._cow_removed_edges.add((u, v, key))
+        self._cow_removed_edge_count += 1
+
+    def remove_edges_from(self, ebunch):
+        if self.is_materialized:
+            return super(CopyOnWriteGraph, self).remove_edges_from(ebunch)
+
+        for e in ebunch:
+            try:
+                self.remove_edge(*e[:3])
+            except NetworkXError:
+                pass
+
+
+def copy_on_write(graph):
+    """Makes a copy of a graph that only copies its contents once they're modified
+
+    The given graph must not be modified while the copy is in use, unless the copy has been materialized with
+    :meth:`CopyOnWriteGraph.materialize`.
+
+    :param pybel.BELGraph graph: A BEL graph
+    :rtype: CopyOnWriteGraph
+    """
+    return CopyOnWriteGraph(graph)
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a long-lived daemon that keeps universes in memory and answers queries over a Unix socket, so
+each query doesn't have to load its networks from the database first.
+
+Run it from the command line with ``pybel-tools daemon``, then send it queries with :func:`query_daemon`:
+
+>>> from pybel_tools.daemon import query_daemon
+>>> from pybel_tools.query import Query
+>>> query = Query(network_ids=[1, 2])
+>>> query.append_seeding_neighbors(...)
+>>> graph = query_daemon(query)
+
+Each request is a line of JSON with the query from :meth:`pybel_tools.query.Query.to_json`, the format of the result
+(either ``json`` for node-link JSON or ``pickle``), and optionally a timeout in seconds. Each response is a line of JSON
+with the status and the length of the result, followed by the result itself.
+
+The queries run in a pool of worker processes with :class:`pybel_tools.executor.AsyncQueryExecutor`. The universes
+loaded at startup are shared with the workers when they're forked, and each worker keeps the other universes it builds
+in memory for later queries too.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+
+from pybel import from_bytes, from_jsons, to_bytes, to_jsons
+from pybel.constants import PYBEL_DIR
+from .cache import UniverseCache
+from .executor import AsyncQueryExecutor
+from .query import Query
+
+__all__ = [
+    'DEFAULT_SOCKET_PATH',
+    'FORMAT_JSON',
+    'FORMAT_PICKLE',
+    'DaemonError',
+    'QueryDaemon',
+    'query_daemon',
+]
+
+log = logging.getLogger(__name__)
+
+#: The default location of the daemon's socket
+DEFAULT_SOCKET_PATH = os.path.join(PYBEL_DIR, 'pybel_tools.sock')
+
+FORMAT_JSON = 'json'
+FORMAT_PICKLE = 'pickle'
+
+STATUS_OK = 'ok'
+STATUS_EMPTY = 'empty'
+STATUS_ERROR = 'error'
+
+#: The longest request line the daemon reads, in bytes
+_MAX_REQUEST_SIZE = 2 ** 26
+
+_encoders = {
+    FORMAT_JSON: lambda graph: to_jsons(graph).encode('utf-8'),
+    FORMAT_PICKLE: to_bytes,
+}
+
+_decoders = {
+    FORMAT_JSON: lambda payload: from_jsons(payload.decode('utf-8')),
+    FORMAT_PICKLE: from_bytes,
+}
+
+
+class DaemonError(RuntimeError):
+    """Raised when the daemon couldn't answer a query"""
+
+
+def _make_error(message):
+    return {'status': STATUS_ERROR, 'message': message, 'length': 0}, b''
+
+
+class QueryDaemon(object):
+    """Answers queries over a Unix socket with universes kept in memory"""
+
+    def __init__(self, manager_factory, universes=None, path=None, processes=None, max_concurrent=None,
+                 timeout=None, max_universes=8):
+        """
+        :param manager_factory: A function that takes no arguments and returns a cache manager, like a
+                                :class:`functools.partial` of :class:`pybel.manager.Manager`
+        :param Optional[list[list[int]]] universes: The database network identifiers of each universe to load at
+                                                    startup
+        :param Optional[str] path: The path of the socket. Defaults to :data:`DEFAULT_SOCKET_PATH`.
+        :param Optional[int] processes: The number of worker processes. Defaults to the number of CPUs.
+        :param Optional[int] max_concurrent: The maximum number of queries running at once
+        :param Optional[float] timeout: The default number of seconds each query can run
+        :param Optional[int] max_universes: The maximum number of universes each worker keeps. It's raised to fit all
+                                            of the universes loaded at startup.
+        :raises: OSError if another daemon is already listening on the socket
+        """
+        self.path = path or DEFAULT_SOCKET_PATH
+        self._socket = self._bind()
+
+        universes = universes or []
+
+        if max_universes is not None:
+            max_universes = max(max_universes, len(universes))
+
+        #: The universes loaded at startup
+        self.universe_cache = UniverseCache(max_entries=max_universes)
+
+        if universes:
+            manager = manager_factory()
+
+            for network_ids in universes:
+                universe = self.universe_cache.get(manager, network_ids)
+                log.info('loaded universe for networks %s with %d nodes/%d edges', sorted(set(network_ids)),
+                         universe.number_of_nodes(), universe.number_of_edges())
+
+        self.executor = AsyncQueryExecutor(
+            manager_factory,
+            processes=processes,
+            max_concurrent=max_concurrent,
+            timeout=timeout,
+            universe_cache=self.universe_cache,
+        )
+
+        self._loop = None
+
+    def _bind(self):
+        """Makes the socket, replacing the file of a daemon that didn't shut down cleanly
+
+        :rtype: socket.socket
+        :raises: OSError
+        """
+        if os.path.exists(self.path):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                try:
+                    sock.connect(self.path)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    log.info('removing stale socket: %s', self.path)
+                    os.remove(self.path)
+                else:
+                    raise OSError('a daemon is already listening on {}'.format(self.path))
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.path)
+        os.chmod(self.path, 0o600)  # only the user running the daemon can query it
+        sock.listen(128)
+
+        return sock
+
+    @asyncio.coroutine
+    def _respond(self, line):
+        """Runs the query in a request
+
+        :param bytes line: A request
+        :return: The header and the result
+        :rtype: tuple[dict,bytes]
+        """
+        try:
+            request = json.loads(line.decode('utf-8'))
+            result_format = request.get('format', FORMAT_PICKLE)
+
+            if result_format not in _encoders:
+                return _make_error('unknown format: {}'.format(result_format))
+
+            query = Query.from_json(request['query'])
+            graph = yield from self.executor.run(query, timeout=request.get('timeout'))
+
+        except asyncio.TimeoutError:
+            return _make_error('query timed out')
+
+        except Exception as e:
+            log.exception('query failed')
+            return _make_error('{}: {}'.format(e.__class__.__name__, e))
+
+        if graph is None:
+            return {'status': STATUS_EMPTY, 'length': 0}, b''
+
+        # the result might be big, so it's serialized without blocking the other requests
+        loop = asyncio.get_event_loop()
+        payload = yield from loop.run_in_executor(None, _encoders[result_format], graph)
+
+        return {'status': STATUS_OK, 'format': result_format, 'length': len(payload)}, payload
+
+    @asyncio.coroutine
+    def _handle(self, reader, writer):
+        """Answers a connection
+
+        :param asyncio.StreamReader reader: The connection's reader
+        :param asyncio.StreamWriter writer: The connection's writer
+        """
+        try:
+            header, payload = yield from self._respond((yield from reader.readline()))
+            writer.write(json.dumps(header).encode('utf-8') + b'\n')
+            writer.write(payload)
+            yield from writer.drain()
+        except ConnectionError:
+            log.debug('client disconnected before the result was sent')
+        finally:
+            writer.close()
+
+    def serve_forever(self):
+        """Answers queries until :meth:`stop` is called or the process is interrupted"""
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+        server = self._loop.run_until_complete(asyncio.start_unix_server(
+            self._handle,
+            sock=self._socket,
+            limit=_MAX_REQUEST_SIZE,
+        ))
+
+        log.info('listening on %s', self.path)
+
+        try:
+            self._loop.run_forever()
+        except KeyboardInterrupt:
+            log.info('interrupted')
+        finally:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    def stop(self):
+        """Stops :meth:`serve_forever`. Can be called from another thread."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def close(self):
+        """Stops the worker processes and removes the socket"""
+        self.executor.close()
+        self._socket.close()
+
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def query_daemon(query, path=None, result_format=FORMAT_PICKLE, timeout=None):
+    """Runs a query with the daemon
+
+    :param query: A query or its JSON
+    :type query: pybel_tools.query.Query or dict
+    :param Optional[str] path: The path of the daemon's socket. Defaults to :data:`DEFAULT_SOCKET_PATH`.
+    :param str result_format: The format the result is sent in. Either :data:`FORMAT_PICKLE` or :data:`FORMAT_JSON`.
+    :param Optional[float] timeout: The number of seconds the query can run. Defaults to the daemon's timeout.
+    :return: The result of the query
+    :rtype: Optional[pybel.BELGraph]
+    :raises: DaemonError
+    """
+    request = {
+        'query': query.to_json() if isinstance(query, Query) else query,
+        'format': result_format,
+    }
+
+    if timeout is not None:
+        request['timeout'] = timeout
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path or DEFAULT_SOCKET_PATH)
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+
+        with sock.makefile('rb') as file:
+            header = json.loads(file.readline().decode('utf-8'))
+            payload = file.read(header['length'])
+
+    if header['status'] == STATUS_ERROR:
+        raise DaemonError(header['message'])
+
+    if header['status'] == STATUS_EMPTY:
+        return
+
+    return _decoders[header['format']](payload)
@@ -1,10 +1,24 @@
 # -*- coding: utf-8 -*-
 
 """This class contains an alternate implementation of the PyBEL database manager that only stores graphs
-in memory
+in memory, or in a directory with only the most recently used ones kept in memory
 """
 
+import logging
+import os
+from collections import OrderedDict
+
+from pybel import from_pickle, to_pickle
 from pybel.manager import Manager
+from pybel.struct import union
+from pybel.utils import hash_node
+from .copy_on_write import copy_on_write
+
+__all__ = [
+    'DictManager',
+]
+
+log = logging.getLogger(__name__)
 
 
 class _Namespace(object):
@@ -12,19 +26,52 @@ class _Namespace(object):
 
 
 class DictManager(Manager):
-    """A dictionary-based implementation of the PyBEL Manager"""
+    """A dictionary-based implementation of the PyBEL Manager
 
-    def __init__(self, connection=None):
+    If it's given a directory, each inserted graph is written there as a pickle, and graphs are loaded again when
+    they're needed. Only the most recently used graphs that fit in the limits stay in memory.
+    """
+
+    #: The graphs aren't in the database's edge store, so queries can't be run there
+    has_edge_store = False
+
+    def __init__(self, connection=None, directory=None, max_networks=None, max_edges=None, index=None):
         """
         :param Optional[str] connection:
+        :param Optional[str] directory: The directory to store the graphs in. Is created if it doesn't exist. If
+                                        none, all graphs are kept in memory.
+        :param Optional[int] max_networks: The maximum number of graphs to keep in memory if there's a directory. If
+                                           none, doesn't limit the number.
+        :param Optional[int] max_edges: The maximum total number of edges in the graphs to keep in memory if there's a
+                                        directory. If none, doesn't limit the size. The most recently used graph is
+                                        always kept.
+        :param Optional[pybel_tools.network_index.NetworkIndex] index: An index to add each inserted graph to
         """
         super(DictManager, self).__init__(connection=connection)
 
         self.universe = None
-        self.networks = {}
+
+        #: The graphs in memory, in the order they were used
+        self.networks = OrderedDict()
+
         self.disease_to_id = {}
         self.hash_to_node = {}
 
+        self.directory = directory
+        self.max_networks = max_networks
+        self.max_edges = max_edges
+
+        #: The number of edges in each graph, including the ones that aren't in memory
+        self.network_sizes = {}
+
+        self.index = index
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _get_path(self, network_id):
+        return os.path.join(self.directory, '{}.gpickle'.format(network_id))
+
     def insert_graph(self, graph, **kwargs):
         """
         :param pybel.BELGraph graph:
@@ -32,19 +79,69 @@ class DictManager(Manager):
         :rtype: Network
         """
         result = _Namespace()
-        result.id = len(self.networks)
+        result.id = len(self.network_sizes)
+
+        for node in graph:
+            self.hash_to_node[hash_node(node)] = node
+
+        if self.directory is not None:
+            to_pickle(graph, self._get_path(result.id))
+
+        self.network_sizes[result.id] = graph.number_of_edges()
+
+        if self.index is not None:
+            self.index.add_graph(result.id, graph)
 
-        self.networks[result.id] = graph
+        self._set(result.id, graph)
 
         return result
 
+    def _set(self, network_id, graph):
+        """Keeps a graph in memory, then evicts the least recently used graphs if there are too many or they're too big
+
+        :param int network_id:
+        :param pybel.BELGraph graph:
+        """
+        self.networks[network_id] = graph
+        self.networks.move_to_end(network_id)
+
+        if self.directory is None:
+            return
+
+        while 1 < len(self.networks) and self._is_too_big():
+            evicted_id, _ = self.networks.popitem(last=False)
+            log.debug('evicting network from memory: %s', evicted_id)
+
+    def _is_too_big(self):
+        if self.max_networks is not None and self.max_networks < len(self.networks):
+            return True
+
+        return (
+            self.max_edges is not None and
+            self.max_edges < sum(self.network_sizes[network_id] for network_id in self.networks)
+        )
+
     def get_graph_by_id(self, network_id):
         """Returns a graph by its id
 
         :param int network_id:
         :rtype: pybel.BELGraph
+        :raises: KeyError
         """
-        return self.networks[network_id]
+        graph = self.networks.get(network_id)
+
+        if graph is not None:
+            self.networks.move_to_end(network_id)
+            return graph
+
+        if network_id not in self.network_sizes or self.directory is None:
+            raise KeyError(network_id)
+
+        log.debug('loading network: %s', network_id)
+        graph = from_pickle(self._get_path(network_id))
+        self._set(network_id, graph)
+
+        return graph
 
     def get_graphs_by_ids(self, network_ids):
         """
@@ -52,6 +149,40 @@ class DictManager(Manager):
         :rtype: list[pybel.BELGraph]
         """
         return [
-            self.networks[network_id]
+            self.get_graph_by_id(network_id)
             for network_id in network_ids
         ]
+
+    def get_graph_by_ids(self, network_ids):
+        """Gets the union of the given graphs
+
+        The union shares its data with the stored graphs, so it's given as a copy-on-write copy that can be modified
+        without changing them, like by running a query in place.
+
+        :param list[int] network_ids:
+        :rtype: pybel_tools.copy_on_write.CopyOnWriteGraph
+        """
+        network_ids = list(network_ids)
+
+        if len(network_ids) == 1:
+            graph = self.get_graph_by_id(network_ids[0])
+        else:
+            graph = union(self.get_graphs_by_ids(network_ids))
+
+        return copy_on_write(graph)
+
+    def get_node_tuple_by_hash(self, node_hash):
+        """Gets a node tuple by its hash
+
+        :param str node_hash: A node hash from :func:`pybel.utils.hash_node`
+        :rtype: tuple
+        :raises: KeyError
+        """
+        return self.hash_to_node[node_hash]
+
+    def count_networks(self):
+        """Counts the graphs, including the ones that aren't in memory
+
+        :rtype: int
+        """
+        return len(self.network_sizes)
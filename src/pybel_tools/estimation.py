@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+
+"""This module estimates how big the graphs made while running a query get, without running it, so queries that would
+grow to the whole universe can be caught before spending minutes on them. It's used by
+:meth:`pybel_tools.query.Query.explain`.
+
+The universe's size comes from counting the nodes and edges of its networks in the database, or from the universe
+itself for managers that keep graphs in memory. The seeds' sizes come from the degrees of their nodes, or from counting
+the edges they select. The size after each step of the pipeline comes from a rule for how much the function it runs
+grows a graph, using the average degree of the universe. Functions without a rule are assumed not to change the size.
+
+These are rough estimates meant to find orders of magnitude. Seeds and expansions are never estimated to be bigger than
+the universe, but inferences can add nodes and edges that aren't in it.
+"""
+
+import math
+
+from pybel.utils import list2tuple
+from .constants import SAMPLE_RANDOM_EDGE_COUNT
+from .pipeline import _describe_entry, mapped, remove_fused_filters
+from .profiling import _get_entry_name
+from .selection.database import (
+    EDGE_SEED_TYPES, count_seed_edges_in_database, count_universe_in_database, get_node_degrees_in_database,
+    has_edge_store,
+)
+from .selection.induce_subgraph import (
+    SEED_TYPE_DOUBLE_NEIGHBORS, SEED_TYPE_DOWNSTREAM, SEED_TYPE_INDUCTION, SEED_TYPE_NEIGHBORS, SEED_TYPE_PATHS,
+    SEED_TYPE_SAMPLE, SEED_TYPE_UPSTREAM, get_subgraph,
+)
+
+__all__ = [
+    'StepEstimate',
+    'QueryEstimate',
+    'estimate_query',
+    'growth_estimator',
+]
+
+#: A map of pipeline function names to functions that estimate the size of a graph after running them
+growth_estimator_map = {}
+
+
+class _GraphStatistics(object):
+    """Gives statistics about a universe that's in memory"""
+
+    def __init__(self, universe):
+        """
+        :param pybel.BELGraph universe: The universe graph
+        """
+        self.universe = universe
+
+    def count_universe(self):
+        return self.universe.number_of_nodes(), self.universe.number_of_edges()
+
+    def get_degrees(self, nodes):
+        return {
+            node: self.universe.degree(node)
+            for node in nodes
+            if node in self.universe
+        }
+
+    def count_seed_edges(self, seed_method, seed_data):
+        subgraph = get_subgraph(self.universe, seed_method=seed_method, seed_data=seed_data)
+        return 0 if subgraph is None else subgraph.number_of_edges()
+
+
+class _DatabaseStatistics(object):
+    """Gives statistics about the universe of the networks in a database without loading them"""
+
+    def __init__(self, manager, network_ids):
+        """
+        :param pybel.manager.Manager manager: A cache manager
+        :param list[int] network_ids: Database network identifiers
+        """
+        self.manager = manager
+        self.network_ids = network_ids
+
+    def count_universe(self):
+        return count_universe_in_database(self.manager, self.network_ids)
+
+    def get_degrees(self, nodes):
+        return get_node_degrees_in_database(self.manager, self.network_ids, nodes)
+
+    def count_seed_edges(self, seed_method, seed_data):
+        return count_seed_edges_in_database(self.manager, self.network_ids, seed_method, seed_data)
+
+
+class StepEstimate(object):
+    """The estimated size of the graph after a step of a query"""
+
+    def __init__(self, description, number_nodes, number_edges, known=True):
+        """
+        :param str description: What the step does
+        :param int number_nodes: The estimated number of nodes
+        :param int number_edges: The estimated number of edges
+        :param bool known: Is there a rule for estimating the size of this step? If not, it's assumed not to change it.
+        """
+        self.description = description
+        self.number_nodes = number_nodes
+        self.number_edges = number_edges
+        self.known = known
+
+    def __str__(self):
+        return '{}: ~{} nodes / ~{} edges{}'.format(
+            self.description, self.number_nodes, self.number_edges, '' if self.known else ' (not estimated)')
+
+
+class QueryEstimate(object):
+    """The estimated sizes of the universe of a query and of the graph after each of its steps"""
+
+    def __init__(self, universe_nodes, universe_edges, steps):
+        """
+        :param int universe_nodes: The number of nodes in the universe
+        :param int universe_edges: The number of edges in the universe
+        :param list[StepEstimate] steps: The estimates after seeding and after each step of the pipeline
+        """
+        self.universe_nodes = universe_nodes
+        self.universe_edges = universe_edges
+        self.steps = steps
+
+    @property
+    def max_nodes(self):
+        """The largest estimated number of nodes after any step
+
+        :rtype: int
+        """
+        return max((step.number_nodes for step in self.steps), default=0)
+
+    @property
+    def max_edges(self):
+        """The largest estimated number of edges after any step
+
+        :rtype: int
+        """
+        return max((step.number_edges for step in self.steps), default=0)
+
+    def check(self, budget):
+        """Checks the estimates of every step fit in a budget
+
+        :param pybel_tools.budget.Budget budget: A budget
+        :raises: pybel_tools.budget.BudgetExceededError
+        """
+        for step in self.steps:
+            budget.check_size(step.number_nodes, step.number_edges, 'the estimate after {}'.format(step.description))
+
+    def __str__(self):
+        lines = ['universe: {} nodes / {} edges'.format(self.universe_nodes, self.universe_edges)]
+        lines.extend(
+            '{}. {}'.format(number, step)
+            for number, step in enumerate(self.steps, start=1)
+        )
+        return '\n'.join(lines)
+
+
+class _Estimator(object):
+    """Estimates the sizes of graphs in a universe"""
+
+    def __init__(self, statistics):
+        """
+        :param statistics: The statistics of the universe
+        """
+        self.statistics = statistics
+        self.universe_nodes, self.universe_edges = statistics.count_universe()
+
+        #: The average number of edges each node is in
+        self.average_degree = 2 * self.universe_edges / self.universe_nodes if self.universe_nodes else 0
+
+    def cap(self, number_nodes, number_edges):
+        """Limits an estimate to the size of the universe
+
+        :rtype: tuple[int,int]
+        """
+        return (
+            int(math.ceil(min(number_nodes, self.universe_nodes))),
+            int(math.ceil(min(number_edges, self.universe_edges))),
+        )
+
+    def sum_degrees(self, nodes):
+        """Sums the degrees of the given nodes in the universe
+
+        :param iter[tuple] nodes: BEL nodes
+        :rtype: int
+        """
+        return sum(self.statistics.get_degrees(nodes).values())
+
+    def estimate_seed(self, seed_method, seed_data):
+        """Estimates the size of the graph from a seed
+
+        :param str seed_method: The seed method
+        :param seed_data: The argument for the seed method
+        :rtype: tuple[int,int]
+        """
+        if seed_method in EDGE_SEED_TYPES:
+            number_edges = self.statistics.count_seed_edges(seed_method, seed_data)
+            return self.cap(2 * number_edges, number_edges)
+
+        if seed_method == SEED_TYPE_SAMPLE:
+            number_edges = seed_data.get('number_edges') or SAMPLE_RANDOM_EDGE_COUNT
+            return self.cap(2 * number_edges, number_edges)
+
+        degrees = self.statistics.get_degrees(seed_data)
+        first = sum(degrees.values())
+
+        if seed_method == SEED_TYPE_INDUCTION:
+            return self.cap(len(degrees), first / 2)
+
+        if seed_method in {SEED_TYPE_NEIGHBORS, SEED_TYPE_UPSTREAM, SEED_TYPE_DOWNSTREAM}:
+            return self.cap(len(degrees) + first, first)
+
+        if seed_method == SEED_TYPE_DOUBLE_NEIGHBORS:
+            second = first * self.average_degree
+            return self.cap(len(degrees) + first + second, first + second)
+
+        if seed_method == SEED_TYPE_PATHS:
+            # the nodes on a shortest path between each pair, with the length of a path in a random graph
+            if 1 < self.average_degree:
+                path_length = math.log(max(self.universe_nodes, 2)) / math.log(self.average_degree)
+            else:
+                path_length = self.universe_nodes
+
+            number_nodes = len(degrees) + len(degrees) * (len(degrees) - 1) / 2 * path_length
+            return self.cap(number_nodes, number_nodes * self.average_degree / 2)
+
+        raise ValueError('Invalid seed method: {}'.format(seed_method))
+
+    def iter_pipeline(self, protocol, number_nodes, number_edges, indent=''):
+        """Estimates the size of the graph after each entry of a protocol
+
+        :param list[dict] protocol: The protocol of a pipeline, as JSON
+        :param int number_nodes: The estimated number of nodes before running it
+        :param int number_edges: The estimated number of edges before running it
+        :param str indent: The prefix of each description
+        :rtype: iter[StepEstimate]
+        """
+        for entry in protocol:
+            if 'meta' in entry:
+                branches = [
+                    list(self.iter_pipeline(subprotocol, number_nodes, number_edges, indent=indent + '  '))
+                    for subprotocol in entry['pipelines']
+                ]
+                finals = [
+                    (steps[-1].number_nodes, steps[-1].number_edges) if steps else (number_nodes, number_edges)
+                    for steps in branches
+                ]
+
+                for steps in branches:
+                    yield from steps
+
+                if entry['meta'] == 'union':
+                    number_nodes, number_edges = self.cap(sum(n for n, _ in finals), sum(e for _, e in finals))
+                else:
+                    number_nodes, number_edges = min(n for n, _ in finals), min(e for _, e in finals)
+
+                yield StepEstimate(indent + entry['meta'], number_nodes, number_edges)
+
+            elif 'split' in entry:
+                steps = list(self.iter_pipeline(entry['pipeline'], number_nodes, number_edges, indent=indent + '  '))
+                yield from steps
+
+                if steps:
+                    number_nodes, number_edges = steps[-1].number_nodes, steps[-1].number_edges
+
+                yield StepEstimate(indent + _get_entry_name(entry), number_nodes, number_edges)
+
+            else:
+                f = mapped.get(entry['function'])
+                estimator = growth_estimator_map.get(entry['function'])
+                known = True
+
+                if estimator is not None:
+                    number_nodes, number_edges = (int(math.ceil(n)) for n in estimator(
+                        self, number_nodes, number_edges, *entry.get('args', []), **entry.get('kwargs', {})))
+
+                elif not _only_deletes(f):
+                    known = False
+
+                yield StepEstimate(indent + _describe_entry(entry), number_nodes, number_edges, known=known)
+
+
+def _only_deletes(f):
+    """Checks if a pipeline function only removes nodes and edges
+
+    :rtype: bool
+    """
+    return (
+        f is remove_fused_filters or
+        hasattr(f, 'node_predicate_builder') or
+        hasattr(f, 'edge_predicate_builder')
+    )
+
+
+def growth_estimator(*names):
+    """Builds a decorator for functions that estimate the size of a graph after running the pipeline functions with the
+    given names. Each takes the estimator, the estimated number of nodes and edges before running it, and the arguments
+    of the pipeline function except for the graph and universe, and returns the estimated number of nodes and edges.
+    Functions that take nodes and edges from the universe should limit their estimates with ``estimator.cap``.
+
+    :param str names: The names of pipeline functions
+    """
+
+    def decorator(f):
+        for name in names:
+            growth_estimator_map[name] = f
+        return f
+
+    return decorator
+
+
+@growth_estimator(
+    'expand_all_node_neighborhoods',
+    'expand_upstream_causal_subgraph',
+    'expand_downstream_causal_subgraph',
+    'expand_periphery',
+)
+def _estimate_neighborhoods(estimator, number_nodes, number_edges, *args, **kwargs):
+    added = number_nodes * estimator.average_degree
+    return estimator.cap(number_nodes + added, number_edges + added)
+
+
+@growth_estimator(
+    'expand_node_neighborhood',
+    'expand_node_predecessors',
+    'expand_node_successors',
+)
+def _estimate_node_neighborhood(estimator, number_nodes, number_edges, node):
+    added = estimator.sum_degrees([list2tuple(node)])
+    return estimator.cap(number_nodes + added, number_edges + added)
+
+
+@growth_estimator('expand_nodes_neighborhoods')
+def _estimate_nodes_neighborhoods(estimator, number_nodes, number_edges, nodes):
+    added = estimator.sum_degrees(list2tuple(node) for node in nodes)
+    return estimator.cap(number_nodes + added, number_edges + added)
+
+
+@growth_estimator('expand_internal', 'expand_internal_causal')
+def _estimate_internal(estimator, number_nodes, number_edges, *args, **kwargs):
+    return number_nodes, max(number_edges, min(number_nodes * estimator.average_degree / 2, estimator.universe_edges))
+
+
+@growth_estimator('infer_central_dogma')
+def _estimate_central_dogma(estimator, number_nodes, number_edges):
+    # each protein can get an RNA and a gene, with an edge to each
+    return 3 * number_nodes, number_edges + 2 * number_nodes
+
+
+@growth_estimator('infer_central_dogmatic_translations', 'infer_central_dogmatic_transcriptions')
+def _estimate_central_dogma_step(estimator, number_nodes, number_edges):
+    return 2 * number_nodes, number_edges + number_nodes
+
+
+def estimate_query(manager, network_ids, seeds, protocol, universe_cache=None):
+    """Estimates the size of the graph after each step of a query
+
+    :param pybel.manager.Manager manager: A cache manager. If it has an edge store, the universe is counted there
+                                          without loading it. Otherwise, the universe is loaded to count it.
+    :param list[int] network_ids: Database network identifiers
+    :param list[tuple[str,Any]] seeds: The seed method and argument of each seed
+    :param list[dict] protocol: The protocol of the query's pipeline, as JSON
+    :param Optional[pybel_tools.cache.UniverseCache] universe_cache: A cache to get the universe from if it's loaded
+    :rtype: QueryEstimate
+    """
+    if has_edge_store(manager):
+        statistics = _DatabaseStatistics(manager, network_ids)
+    elif universe_cache is not None:
+        statistics = _GraphStatistics(universe_cache.get(manager, network_ids))
+    else:
+        statistics = _GraphStatistics(manager.get_graph_by_ids(network_ids))
+
+    estimator = _Estimator(statistics)
+    steps = []
+
+    if not seeds:
+        number_nodes, number_edges = estimator.universe_nodes, estimator.universe_edges
+        steps.append(StepEstimate('no seeding', number_nodes, number_edges))
+
+    else:
+        number_nodes, number_edges = 0, 0
+
+        for seed_method, seed_data in seeds:
+            seed_nodes, seed_edges = estimator.estimate_seed(seed_method, seed_data)
+            number_nodes, number_edges = estimator.cap(number_nodes + seed_nodes, number_edges + seed_edges)
+            steps.append(StepEstimate('seed by {}'.format(seed_method), seed_nodes, seed_edges))
+
+        if 1 < len(seeds):
+            steps.append(StepEstimate('union of seeds', number_nodes, number_edges))
+
+    steps.extend(estimator.iter_pipeline(protocol, number_nodes, number_edges))
+
+    return QueryEstimate(estimator.universe_nodes, estimator.universe_edges, steps)
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+"""This module runs queries and pipelines from :mod:`asyncio` code in a pool of worker processes, so a service can
+handle many requests at once without blocking its event loop on the CPU-bound graph work.
+
+The :class:`AsyncQueryExecutor` limits how many computations run at once, gives up on ones that take longer than a
+timeout, and shares one computation between identical queries that are requested while it's still running.
+
+>>> import asyncio
+>>> from functools import partial
+>>> from pybel.manager import Manager
+>>> from pybel_tools.executor import AsyncQueryExecutor
+>>> query = ...
+>>> with AsyncQueryExecutor(partial(Manager, connection='sqlite:///...'), timeout=30) as executor:
+...     loop = asyncio.get_event_loop()
+...     graph = loop.run_until_complete(executor.run(query))
+
+Cancellation is cooperative. When a computation is cancelled, or every request waiting for it has timed out or been
+cancelled, its worker is told to stop and does so before running the next step of the pipeline. A step that has
+already started runs to the end first.
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+
+from .pipeline import Pipeline
+from .query import Query
+
+__all__ = [
+    'AsyncQueryExecutor',
+]
+
+log = logging.getLogger(__name__)
+
+#: The manager made by each worker process for running queries
+_worker_manager = None
+
+#: The universes held by each worker process for running queries
+_worker_universe_cache = None
+
+
+def _initialize_executor_worker(manager_factory, universe_cache=None):
+    """Makes the manager that a worker process uses to run queries
+
+    :param manager_factory: A function that takes no arguments and returns a cache manager
+    :param Optional[pybel_tools.cache.UniverseCache] universe_cache: The universes to re-use between queries
+    """
+    global _worker_manager, _worker_universe_cache
+    _worker_manager = manager_factory() if manager_factory is not None else None
+    _worker_universe_cache = universe_cache
+
+
+def _run_query_in_worker(query_json, cancel_event):
+    """Runs a query in a worker process
+
+    :param dict query_json: A query, as JSON
+    :param cancel_event: The event that cancels the query
+    :rtype: Optional[pybel.BELGraph]
+    """
+    query = Query.from_json(query_json)
+    return query.run(_worker_manager, universe_cache=_worker_universe_cache, cancel_event=cancel_event)
+
+
+def _run_pipeline_in_worker(protocol, graph, universe, cancel_event):
+    """Runs a pipeline in a worker process
+
+    :param list[dict] protocol: The protocol of a pipeline, as JSON
+    :param pybel.BELGraph graph: The graph to run the pipeline on
+    :param Optional[pybel.BELGraph] universe: The universe graph
+    :param cancel_event: The event that cancels the pipeline
+    :rtype: pybel.BELGraph
+    """
+    pipeline = Pipeline(protocol=protocol)
+    return pipeline.run(graph, universe=universe, cancel_event=cancel_event)
+
+
+def _set_future_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_future_exception(future, exception):
+    if not future.done():
+        future.set_exception(exception)
+
+
+class _InFlight(object):
+    """A computation that's running in the pool and the requests waiting for it"""
+
+    def __init__(self, task, cancel_event, key=None):
+        """
+        :param asyncio.Future task: The computation
+        :param cancel_event: The event that cancels the computation in its worker
+        :param Optional[str] key: The key of the computation if identical requests can share it
+        """
+        self.task = task
+        self.cancel_event = cancel_event
+        self.key = key
+        self.waiters = 0
+
+
+class AsyncQueryExecutor(object):
+    """Runs queries and pipelines in a pool of worker processes for :mod:`asyncio` code"""
+
+    def __init__(self, manager_factory=None, processes=None, max_concurrent=None, timeout=None, universe_cache=None):
+        """
+        :param manager_factory: A function that takes no arguments and returns a cache manager, like a
+                                :class:`functools.partial` of :class:`pybel.manager.Manager`. It's called once in each
+                                worker, so it should be defined at the top level of a module. Only needed for queries.
+        :param Optional[int] processes: The number of worker processes. Defaults to the number of CPUs.
+        :param Optional[int] max_concurrent: The maximum number of computations sent to the pool at once. The others
+                                             wait their turn without holding the data they're run on in the pool's
+                                             queue. Defaults to the number of worker processes.
+        :param Optional[float] timeout: The default number of seconds to wait for each request
+        :param Optional[pybel_tools.cache.UniverseCache] universe_cache: If given, each worker starts with a copy of
+                                        it and re-uses its universes between queries. When the workers are forked, the
+                                        universes already in it are shared with them without being copied.
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.max_concurrent = max_concurrent or self.processes
+        self.timeout = timeout
+
+        self._pool = multiprocessing.Pool(
+            self.processes,
+            initializer=_initialize_executor_worker,
+            initargs=(manager_factory, universe_cache),
+        )
+
+        # events from a manager process can be sent to the workers with each task
+        self._sync_manager = multiprocessing.Manager()
+
+        #: The semaphore limiting the computations sent to the pool. It belongs to an event loop, so it's made when
+        #: first used.
+        self._semaphore = None
+
+        #: The running computations of queries, by their JSON
+        self._in_flight = {}
+
+    def _get_semaphore(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        return self._semaphore
+
+    @asyncio.coroutine
+    def _apply(self, func, args):
+        """Runs a function in the pool, once there's room
+
+        :param func: A function that can be pickled
+        :param tuple args: The arguments to call it with
+        """
+        with (yield from self._get_semaphore()):
+            loop = asyncio.get_event_loop()
+            future = asyncio.Future(loop=loop)
+
+            # the pool calls these from its result handler thread
+            self._pool.apply_async(
+                func,
+                args,
+                callback=lambda result: loop.call_soon_threadsafe(_set_future_result, future, result),
+                error_callback=lambda exception: loop.call_soon_threadsafe(_set_future_exception, future, exception),
+            )
+
+            return (yield from future)
+
+    @asyncio.coroutine
+    def _wait(self, in_flight, timeout):
+        """Waits for a computation, then cancels it if nothing else is waiting for it and it isn't finished
+
+        :param _InFlight in_flight: The computation
+        :param Optional[float] timeout: The number of seconds to wait. If none, uses the default.
+        :raises: asyncio.TimeoutError
+        """
+        in_flight.waiters += 1
+
+        try:
+            return (yield from asyncio.wait_for(
+                asyncio.shield(in_flight.task),
+                timeout if timeout is not None else self.timeout,
+            ))
+        finally:
+            in_flight.waiters -= 1
+
+            if not in_flight.waiters and not in_flight.task.done():
+                log.debug('cancelling computation that no requests are waiting for')
+                in_flight.cancel_event.set()
+                in_flight.task.cancel()
+                self._forget(in_flight)
+
+    def _start(self, func, args, key=None):
+        """Starts running a function in the pool. Its last argument is the event that cancels it.
+
+        :param func: A function that can be pickled
+        :param tuple args: The arguments to call it with, except the event
+        :param Optional[str] key: If given, later identical requests wait for this computation until it finishes
+        :rtype: _InFlight
+        """
+        cancel_event = self._sync_manager.Event()
+        task = asyncio.ensure_future(self._apply(func, args + (cancel_event,)))
+        in_flight = _InFlight(task, cancel_event, key=key)
+
+        if key is not None:
+            self._in_flight[key] = in_flight
+            task.add_done_callback(lambda _: self._forget(in_flight))
+
+        return in_flight
+
+    def _forget(self, in_flight):
+        """Stops later requests from waiting for a computation
+
+        :param _InFlight in_flight: The computation
+        """
+        if in_flight.key is not None and self._in_flight.get(in_flight.key) is in_flight:
+            del self._in_flight[in_flight.key]
+
+    @asyncio.coroutine
+    def run(self, query, timeout=None):
+        """Runs a query in the pool. If an identical query is already running, waits for its result instead.
+
+        :param pybel_tools.query.Query query: A query
+        :param Optional[float] timeout: The number of seconds to wait. If none, uses the default.
+        :return: The result of :meth:`pybel_tools.query.Query.run`. It's shared between identical queries, so it
+                 shouldn't be modified.
+        :rtype: Optional[pybel.BELGraph]
+        :raises: asyncio.TimeoutError
+        """
+        query_json = query.to_json()
+        key = json.dumps(query_json, sort_keys=True)
+
+        in_flight = self._in_flight.get(key)
+
+        if in_flight is None:
+            in_flight = self._start(_run_query_in_worker, (query_json,), key=key)
+        else:
+            log.debug('waiting for identical query already in flight')
+
+        return (yield from self._wait(in_flight, timeout))
+
+    @asyncio.coroutine
+    def run_pipeline(self, pipeline, graph, universe=None, timeout=None):
+        """Runs a pipeline in the pool
+
+        :param pybel_tools.pipeline.Pipeline pipeline: A pipeline
+        :param pybel.BELGraph graph: The graph to run the pipeline on. It's sent to a worker, so it's not modified.
+        :param Optional[pybel.BELGraph] universe: The universe graph
+        :param Optional[float] timeout: The number of seconds to wait. If none, uses the default.
+        :rtype: pybel.BELGraph
+        :raises: asyncio.TimeoutError
+        """
+        in_flight = self._start(_run_pipeline_in_worker, (pipeline.protocol, graph, universe))
+
+        return (yield from self._wait(in_flight, timeout))
+
+    def number_in_flight(self):
+        """Gets the number of different queries running or waiting for their turn
+
+        :rtype: int
+        """
+        return len(self._in_flight)
+
+    def close(self):
+        """Stops the worker processes"""
+        for in_flight in self._in_flight.values():
+            in_flight.cancel_event.set()
+            in_flight.task.cancel()
+
+        self._in_flight.clear()
+        self._pool.terminate()
+        self._pool.join()
+        self._sync_manager.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -7,6 +7,7 @@ from .node_filters import (
     function_namespace_inclusion_builder
 )
 from .. import pipeline
+from ..constants import CENTRAL_DOGMA_INFERENCES
 
 __all__ = [
     'remove_filtered_nodes',
@@ -28,7 +29,7 @@ def remove_filtered_nodes(graph, node_filters):
     graph.remove_nodes_from(nodes)
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(function_inclusion_filter_builder)
 def remove_nodes_by_function(graph, function):
     """Removes nodes with the given function.
 
@@ -40,7 +41,7 @@ def remove_nodes_by_function(graph, function):
     remove_filtered_nodes(graph, function_inclusion_filter_builder(function))
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(namespace_inclusion_builder)
 def remove_nodes_by_namespace(graph, namespace):
     """Removes nodes with the given  namespace.
 
@@ -53,7 +54,10 @@ def remove_nodes_by_namespace(graph, namespace):
     remove_filtered_nodes(graph, namespace_inclusion_builder(namespace))
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(
+    lambda: namespace_inclusion_builder('MGI'),
+    commutes_with=CENTRAL_DOGMA_INFERENCES,
+)
 def remove_mgi_nodes(graph):
     """Removes MGI nodes.
 
@@ -62,7 +66,10 @@ def remove_mgi_nodes(graph):
     remove_nodes_by_namespace(graph, 'MGI')
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(
+    lambda: namespace_inclusion_builder('RGD'),
+    commutes_with=CENTRAL_DOGMA_INFERENCES,
+)
 def remove_rgd_nodes(graph):
     """Removes RGD nodes.
 
@@ -71,7 +78,7 @@ def remove_rgd_nodes(graph):
     remove_nodes_by_namespace(graph, 'RGD')
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(function_namespace_inclusion_builder)
 def remove_nodes_by_function_namespace(graph, function, namespace):
     """Removes nodes with the given function and namespace.
 
@@ -34,6 +34,7 @@ __all__ = [
     'remove_unweighted_sources',
     'prune_mechanism_by_data',
     'generate_mechanism',
+    'iter_bioprocess_mechanisms',
     'generate_bioprocess_mechanisms',
 ]
 
@@ -123,6 +124,21 @@ def generate_mechanism(graph, node, key=None):
     return subgraph
 
 
+@pipeline.splitter
+def iter_bioprocess_mechanisms(graph, key=None):
+    """Generates a mechanistic subgraph for each biological process in the graph using :func:`generate_mechanism`,
+    making each one only when it's needed
+
+    :param pybel.BELGraph graph: A BEL Graph
+    :param str key: The key in the node data dictionary representing the experimental data. If none, does not prune
+                unannotated nodes after generation
+    :return: An iterator over pairs of biological process nodes and their candidate mechanisms
+    :rtype: iter[tuple[tuple,pybel.BELGraph]]
+    """
+    for bp in get_nodes_by_function(graph, BIOPROCESS):
+        yield bp, generate_mechanism(graph, bp, key=key)
+
+
 @pipeline.splitter
 def generate_bioprocess_mechanisms(graph, key=None):
     """Generates a mechanistic subgraph for each biological process in the graph using :func:`generate_mechanism`
@@ -133,7 +149,4 @@ def generate_bioprocess_mechanisms(graph, key=None):
     :return: A dictionary from {tuple bioprocess node: BELGraph candidate mechanism}
     :rtype: dict[tuple, pybel.BELGraph]
     """
-    return {
-        bp: generate_mechanism(graph, bp, key=key)
-        for bp in get_nodes_by_function(graph, BIOPROCESS)
-    }
+    return dict(iter_bioprocess_mechanisms(graph, key=key))
@@ -14,49 +14,97 @@ log = logging.getLogger(__name__)
 __all__ = [
     'get_subgraphs_by_annotation',
     'get_subgraphs_by_annotation_filtered',
+    'iter_subgraphs_by_annotation',
+    'iter_subgraphs_by_annotation_filtered',
 ]
 
 
-@pipeline.splitter
-def get_subgraphs_by_annotation(graph, annotation, keep_undefined=True, sentinel='Undefined'):
-    """Stratifies the given graph into subgraphs based on the values for edges' annotations
+def _index_edges_by_annotation(graph, annotation, keep_undefined=True, sentinel='Undefined'):
+    """Groups the edges in a graph by the values of an annotation in one pass over the edges. Edges with several values
+    are in the group of each one.
 
     :param pybel.BELGraph graph: A BEL graph
     :param str annotation: The annotation to group by
-    :param bool keep_undefined: If true, uses the sentinel value to store a subgraph of edges not matching the given
-     annotation.
+    :param bool keep_undefined: If true, uses the sentinel value to store the edges not matching the given annotation.
     :param str sentinel: The value to stick unannotated edges into
-    :rtype: dict[str,pybel.BELGraph]
+    :return: A dictionary from values to lists of (source, target, key, data) edges
+    :rtype: dict[str,list[tuple]]
     """
-    result = defaultdict(BELGraph)
+    index = defaultdict(list)
 
     for source, target, key, data in graph.edges_iter(keys=True, data=True):
         annotation_dict = data.get(ANNOTATIONS)
 
         if annotation_dict is None or annotation not in annotation_dict:
             if keep_undefined:
-                safe_add_edge(result[sentinel], source, target, key, data)
+                index[sentinel].append((source, target, key, data))
         else:
             for value in annotation_dict[annotation]:
-                safe_add_edge(result[value], source, target, key, data)
+                index[value].append((source, target, key, data))
+
+    return index
+
+
+def _build_subgraph(graph, edges):
+    """Builds the subgraph of the given edges, with the nodes' data and the definitions from the graph
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param iter[tuple] edges: An iterable of (source, target, key, data) edges
+    :rtype: pybel.BELGraph
+    """
+    subgraph = BELGraph()
+
+    for source, target, key, data in edges:
+        safe_add_edge(subgraph, source, target, key, data)
+
+    update_metadata(subgraph, graph)
 
-    for value in result.values():
-        update_metadata(value, graph)
+    return subgraph
 
-    return dict(result)
+
+def _iter_subgraphs_from_index(graph, index):
+    """Builds the subgraph for each value in an index of edges, one at a time
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param dict[str,list[tuple]] index: A dictionary from values to lists of (source, target, key, data) edges
+    :rtype: iter[tuple[str,pybel.BELGraph]]
+    """
+    for value, edges in index.items():
+        yield value, _build_subgraph(graph, edges)
 
 
 @pipeline.splitter
-def get_subgraphs_by_annotation_filtered(graph, annotation, values):
+def iter_subgraphs_by_annotation(graph, annotation, keep_undefined=True, sentinel='Undefined'):
+    """Stratifies the given graph into subgraphs based on the values for edges' annotations, making each subgraph only
+    when it's needed
+
+    Only one subgraph is held at a time if the previous ones aren't kept, so this can be used with
+    :meth:`pybel_tools.pipeline.Pipeline.split` on graphs with many annotation values.
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param str annotation: The annotation to group by
+    :param bool keep_undefined: If true, uses the sentinel value to store a subgraph of edges not matching the given
+     annotation.
+    :param str sentinel: The value to stick unannotated edges into
+    :return: An iterator over pairs of annotation values and their subgraphs
+    :rtype: iter[tuple[str,pybel.BELGraph]]
+    """
+    index = _index_edges_by_annotation(graph, annotation, keep_undefined=keep_undefined, sentinel=sentinel)
+    return _iter_subgraphs_from_index(graph, index)
+
+
+@pipeline.splitter
+def iter_subgraphs_by_annotation_filtered(graph, annotation, values):
     """Stratifies the given graph into subgraphs based on the values for edges' annotations, but filter by a set
-    of given values
+    of given values, making each subgraph only when it's needed
 
     :param pybel.BELGraph graph: A BEL graph
     :param str annotation: The annotation to group by
     :param iter[str] values: The values to keep
-    :rtype: dict[str,pybel.BELGraph]
+    :return: An iterator over pairs of annotation values and their subgraphs
+    :rtype: iter[tuple[str,pybel.BELGraph]]
     """
-    result = defaultdict(BELGraph)
+    index = defaultdict(list)
     values = set(values)
 
     for source, target, key, data in graph.edges_iter(keys=True, data=True):
@@ -67,9 +115,33 @@ def get_subgraphs_by_annotation_filtered(graph, annotation, values):
 
         for value in annotation_dict[annotation]:
             if value in values:
-                safe_add_edge(result[value], source, target, key, data)
+                index[value].append((source, target, key, data))
+
+    return _iter_subgraphs_from_index(graph, index)
+
+
+@pipeline.splitter
+def get_subgraphs_by_annotation(graph, annotation, keep_undefined=True, sentinel='Undefined'):
+    """Stratifies the given graph into subgraphs based on the values for edges' annotations
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param str annotation: The annotation to group by
+    :param bool keep_undefined: If true, uses the sentinel value to store a subgraph of edges not matching the given
+     annotation.
+    :param str sentinel: The value to stick unannotated edges into
+    :rtype: dict[str,pybel.BELGraph]
+    """
+    return dict(iter_subgraphs_by_annotation(graph, annotation, keep_undefined=keep_undefined, sentinel=sentinel))
 
-    for value in result.values():
-        update_metadata(value, graph)
 
-    return dict(result)
+@pipeline.splitter
+def get_subgraphs_by_annotation_filtered(graph, annotation, values):
+    """Stratifies the given graph into subgraphs based on the values for edges' annotations, but filter by a set
+    of given values
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param str annotation: The annotation to group by
+    :param iter[str] values: The values to keep
+    :rtype: dict[str,pybel.BELGraph]
+    """
+    return dict(iter_subgraphs_by_annotation_filtered(graph, annotation, values))
@@ -2,16 +2,26 @@
 
 """Additional input and output methods"""
 
+import itertools as itt
 import logging
 import os
+import queue
+from functools import partial
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
 
-from pybel import from_path, from_pickle, to_pickle, union
+from pybel import from_path, from_pickle, to_pickle
 from pybel.manager import Manager
+from .columnar import from_columnar
+from .merge import streaming_union
+from .parse_cache import get_parse_key
 
 __all__ = [
     'from_path_ensure_pickle',
     'from_directory',
     'from_directory_pickles',
+    'from_columnars',
+    'iter_prefetched',
 ]
 
 log = logging.getLogger(__name__)
@@ -19,6 +29,8 @@ log = logging.getLogger(__name__)
 _bel_extension = '.bel'
 _gpickle_extension = '.gpickle'
 _json_extension = '.json'
+_columnar_extension = '.bgraph'
+_key_extension = '.key'
 
 
 def get_corresponding_gpickle_path(path):
@@ -29,26 +41,81 @@ def get_corresponding_json_path(path):
     return path[:-len(_bel_extension)] + _json_extension
 
 
-def from_path_ensure_pickle(path, connection=None, **kwargs):
-    """Parses a path exactly like :func:`pybel.from_path` unless a corresponding .gpickle file is available
+def _from_fresh_pickle_or_none(gpickle_path, key):
+    """Loads the .gpickle file next to a BEL script if the key written next to it is the script's current key
+
+    :param str gpickle_path: The path to the .gpickle file corresponding to a BEL script
+    :param str key: The key of the BEL script from :func:`pybel_tools.parse_cache.get_parse_key`
+    :rtype: Optional[pybel.BELGraph]
+    """
+    try:
+        with open(gpickle_path + _key_extension) as file:
+            if file.read() != key:
+                return
+        return from_pickle(gpickle_path)
+    except OSError:
+        return
+    except Exception:
+        log.warning('parsing again since the pickle can not be read: %s', gpickle_path)
+        return
+
+
+def _to_keyed_pickle(graph, gpickle_path, key):
+    """Writes the .gpickle file next to a BEL script, and the script's key next to it
+
+    :param pybel.BELGraph graph: The graph parsed from the BEL script
+    :param str gpickle_path: The path to the .gpickle file corresponding to the BEL script
+    :param str key: The key of the BEL script from :func:`pybel_tools.parse_cache.get_parse_key`
+    """
+    key_path = gpickle_path + _key_extension
+
+    # the old key is removed first so it's never left next to the new graph
+    if os.path.exists(key_path):
+        os.remove(key_path)
+
+    to_pickle(graph, file=gpickle_path)
+
+    with open(key_path, 'w') as file:
+        file.write(key)
+
+
+def from_path_ensure_pickle(path, connection=None, cache=None, **kwargs):
+    """Parses a path exactly like :func:`pybel.from_path` unless it's already been parsed
+
+    Parsed graphs are keyed by the script's contents, the versions of PyBEL and PyBEL Tools, and the parser's options,
+    so they're only loaded instead of parsing again if none of them have changed. Without a cache, parsed graphs are
+    written to a .gpickle file next to the BEL script, with their key in a .gpickle.key file. With a cache, they're only
+    written to the cache.
 
     :param str path: A file path
     :param connection: database connection string to cache, pre-built :class:`Manager`, or None to use default cache
     :type connection: Optional[str or pybel.manager.Manager]
-    :param kwargs:
+    :param Optional[pybel_tools.parse_cache.ParseCache] cache: A parse cache to use instead of the .gpickle file
+    :param kwargs: Parameters to pass to :func:`pybel.from_path`
     :rtype: pybel.BELGraph
     """
     if not path.endswith(_bel_extension):
         raise ValueError('Wrong extension. Should be .bel for file: {}'.format(path))
 
-    gpickle_path = get_corresponding_gpickle_path(path)
+    if cache is not None:
+        key = cache.get_key(path, **kwargs)
+        graph = cache.get(key)
+    else:
+        key = get_parse_key(path, **kwargs)
+        gpickle_path = get_corresponding_gpickle_path(path)
+        graph = _from_fresh_pickle_or_none(gpickle_path, key)
 
-    if os.path.exists(gpickle_path):
-        return from_pickle(path=path)
+    if graph is not None:
+        log.debug('loaded %s without parsing', path)
+        return graph
 
     manager = Manager.ensure(connection=connection)
     graph = from_path(path, manager=manager, **kwargs)
-    to_pickle(graph, file=gpickle_path)
+
+    if cache is not None:
+        cache.set(key, graph)
+    else:
+        _to_keyed_pickle(graph, gpickle_path, key)
 
     return graph
 
@@ -74,46 +141,198 @@ def iter_pickle_paths_from_directory(directory, blacklist=None):
         yield os.path.join(directory, path)
 
 
-def iter_from_pickles(paths):
+def _get_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def iter_prefetched(paths, load=from_pickle, ahead=2, processes=None, ordered=True, max_bytes=None):
+    """Loads files in a pool of background threads or processes, keeping a few loaded ahead of the caller
+
+    >>> for graph in iter_prefetched(paths, ahead=4, max_bytes=2 ** 30):
+    ...     analyze(graph)
+
+    :param iter[str] paths: The paths to load
+    :param load: The function to load each path with. Has to be a module-level function if ``processes`` is given.
+    :type load: (str) -> object
+    :param int ahead: The maximum number of files loading or loaded but not yet given to the caller
+    :param Optional[int] processes: If given, loads in this many worker processes instead of in ``ahead`` threads.
+                                    Only worth it when loading takes much longer than sending the result back, since
+                                    it's pickled to get to this process.
+    :param bool ordered: Should the results come in the same order as the paths, or in the order they're finished?
+    :param Optional[int] max_bytes: The maximum total size on disk of the files loading or loaded but not yet given to
+                                    the caller. At least one is always loaded, no matter its size.
+    :return: An iterator over the results of ``load``. If loading a path fails, the exception is raised here.
+    """
+    paths = iter(paths)
+    results = queue.Queue()
+
+    #: The sizes on disk of the files that are loading or loaded, but not yet given to the caller, by their index
+    pending = {}
+    buffered = {}
+    counter = itt.count()
+    exhausted = False
+
+    pool = ThreadPool(ahead) if processes is None else Pool(processes)
+
+    def submit():
+        nonlocal exhausted
+
+        while not exhausted and len(pending) < ahead:
+            if pending and max_bytes is not None and max_bytes <= sum(pending.values()):
+                return
+
+            try:
+                path = next(paths)
+            except StopIteration:
+                exhausted = True
+                return
+
+            index = next(counter)
+            pending[index] = _get_size(path)
+            pool.apply_async(
+                load,
+                args=(path,),
+                callback=partial(_put_result, results, index),
+                error_callback=partial(_put_error, results, index),
+            )
+
+    next_index = 0
+
+    try:
+        submit()
+
+        while pending:
+            if ordered:
+                while next_index not in buffered:
+                    index, result, error = results.get()
+                    buffered[index] = result, error
+
+                index = next_index
+                next_index += 1
+                result, error = buffered.pop(index)
+            else:
+                index, result, error = results.get()
+
+            del pending[index]
+
+            if error is not None:
+                raise error
+
+            submit()  # before yielding, so the next files load while the caller uses this one
+
+            yield result
+            del result
+    finally:
+        pool.terminate()
+
+
+def _put_result(results, index, result):
+    results.put((index, result, None))
+
+
+def _put_error(results, index, error):
+    results.put((index, None, error))
+
+
+def _filter_extension(paths, extension):
+    for path in paths:
+        if not path.endswith(extension):
+            log.info('Wrong extension. Should be %s: %s', extension, path)
+            continue
+        yield path
+
+
+def _iter_loaded(paths, load, ahead=None, **kwargs):
+    """Loads each path in this thread, or with :func:`iter_prefetched` if ``ahead`` is given"""
+    if ahead is None:
+        return (load(path) for path in paths)
+
+    return iter_prefetched(paths, load=load, ahead=ahead, **kwargs)
+
+
+def iter_from_pickles(paths, ahead=None, **kwargs):
     """Iterates over the pickled BEL graphs in a directory
 
     :param iter[str] paths:
+    :param Optional[int] ahead: If given, loads up to this many graphs ahead in the background with
+                                :func:`iter_prefetched`
+    :param kwargs: Keyword arguments to pass to :func:`iter_prefetched`, like ``ordered`` and ``max_bytes``
     :rtype: iter[pybel.BELGraph]
     """
-    for path in paths:
-        if not path.endswith('.gpickle'):
-            log.info('Wrong extension. Should be .gpickle: %s', path)
-            continue
-        yield from_pickle(path)
+    return _iter_loaded(_filter_extension(paths, _gpickle_extension), from_pickle, ahead=ahead, **kwargs)
 
 
-def iter_from_pickles_from_directory(directory, blacklist=None):
+def iter_from_pickles_from_directory(directory, blacklist=None, ahead=None, **kwargs):
     """Iterates over the pickled BEL graphs in a directory
 
     :param str directory:
     :param Optional[list[str]] blacklist: An optional list of file names not to use
+    :param Optional[int] ahead: If given, loads up to this many graphs ahead in the background with
+                                :func:`iter_prefetched`
+    :param kwargs: Keyword arguments to pass to :func:`iter_prefetched`, like ``ordered`` and ``max_bytes``
     :rtype: iter[pybel.BELGraph]
     """
-    return iter_from_pickles(iter_pickle_paths_from_directory(directory, blacklist=blacklist))
+    paths = iter_pickle_paths_from_directory(directory, blacklist=blacklist)
+    return iter_from_pickles(paths, ahead=ahead, **kwargs)
 
 
-def from_pickles(paths):
+def from_pickles(paths, ahead=None, **kwargs):
     """Loads multiple PyBEL pickles with :func:`pybel.from_pickle` and returns the union of the resulting graphs.
 
+    Each graph is merged with :func:`pybel_tools.merge.streaming_union` then freed, so only the merged graph and the
+    ones being loaded are in memory at once.
+
     :param iter[str] paths: An iterable over paths to PyBEL pickles
+    :param Optional[int] ahead: If given, loads up to this many graphs ahead in the background while the others are
+                                merged
+    :param kwargs: Keyword arguments to pass to :func:`iter_prefetched`, like ``max_bytes``
     :rtype: pybel.BELGraph
     """
-    return union(iter_from_pickles(paths))
+    return streaming_union(iter_from_pickles(paths, ahead=ahead, ordered=False, **kwargs))
 
 
-def from_directory_pickles(directory):
-    """Parses all BEL scripts in the given directory with :func:`load_paths` and returns the union of the resulting
-    graphs.
+def from_directory_pickles(directory, ahead=None, **kwargs):
+    """Loads all BEL pickles in the given directory and returns the union of the resulting graphs, like
+    :func:`from_pickles`.
 
     :param str directory: A path to a directory
+    :param Optional[int] ahead: If given, loads up to this many graphs ahead in the background while the others are
+                                merged
+    :param kwargs: Keyword arguments to pass to :func:`iter_prefetched`, like ``max_bytes``
+    :rtype: pybel.BELGraph
+    """
+    return from_pickles(iter_pickle_paths_from_directory(directory), ahead=ahead, **kwargs)
+
+
+def _from_columnar_to_bel_graph(path):
+    return from_columnar(path).to_bel_graph()
+
+
+def iter_from_columnars(paths):
+    """Iterates over the BEL graphs in the columnar format from :mod:`pybel_tools.columnar`
+
+    :param iter[str] paths: Paths to graphs written with :func:`pybel_tools.columnar.to_columnar`
+    :rtype: iter[pybel_tools.columnar.ColumnarGraph]
+    """
+    return (from_columnar(path) for path in _filter_extension(paths, _columnar_extension))
+
+
+def from_columnars(paths, ahead=None, **kwargs):
+    """Loads multiple graphs in the columnar format and returns the union of the resulting graphs, like
+    :func:`from_pickles`.
+
+    :param iter[str] paths: Paths to graphs written with :func:`pybel_tools.columnar.to_columnar`
+    :param Optional[int] ahead: If given, builds up to this many graphs ahead in the background while the others are
+                                merged
+    :param kwargs: Keyword arguments to pass to :func:`iter_prefetched`, like ``max_bytes``
     :rtype: pybel.BELGraph
     """
-    return union(iter_from_pickles_from_directory(directory))
+    paths = _filter_extension(paths, _columnar_extension)
+    graphs = _iter_loaded(paths, _from_columnar_to_bel_graph, ahead=ahead, ordered=False, **kwargs)
+    return streaming_union(graphs)
 
 
 def iter_paths_from_directory(directory):
@@ -123,27 +342,65 @@ def iter_paths_from_directory(directory):
         yield filename
 
 
-def iter_from_directory(directory, connection=None):
+def iter_from_directory(directory, connection=None, ahead=None):
     """Parses all BEL scripts in the given directory with :func:`load_paths` and returns the union of the resulting
     graphs.
 
     :param str directory: A path to a directory
     :param connection: database connection string to cache, pre-built :class:`Manager`, or None to use default cache
     :type connection: Optional[str or pybel.manager.Manager]
+    :param Optional[int] ahead: If given, loads up to this many already parsed graphs ahead in background threads.
+                                Scripts that have to be parsed are still parsed in this thread, since they use the
+                                manager.
     :rtype: iter[pybel.BELGraph]
     """
-    for filename in iter_paths_from_directory(directory):
-        path = os.path.join(directory, filename)
-        yield from_path_ensure_pickle(path, connection=connection)
+    paths = (
+        os.path.join(directory, filename)
+        for filename in iter_paths_from_directory(directory)
+    )
+
+    if ahead is None:
+        return (from_path_ensure_pickle(path, connection=connection) for path in paths)
+
+    return _iter_parsed_ahead(paths, connection, ahead)
+
+
+def _load_fresh_pickle(path):
+    """Loads the .gpickle file next to a BEL script if it was parsed from the script's current contents
+
+    :param str path: The path to a BEL script
+    :return: The path and its graph, or None if it has to be parsed
+    :rtype: tuple[str,Optional[pybel.BELGraph]]
+    """
+    return path, _from_fresh_pickle_or_none(get_corresponding_gpickle_path(path), get_parse_key(path))
 
 
-def from_directory(directory, connection=None):
+def _iter_parsed_ahead(paths, connection, ahead):
+    """Loads the fresh pickles of BEL scripts in background threads, then parses the rest in this thread, since the
+    manager's session can't be shared between threads
+
+    :param iter[str] paths: The paths to BEL scripts
+    :param connection: database connection string to cache, pre-built :class:`Manager`, or None to use default cache
+    :type connection: Optional[str or pybel.manager.Manager]
+    :param int ahead: The number of pickles to load ahead
+    :rtype: iter[pybel.BELGraph]
+    """
+    for path, graph in iter_prefetched(paths, load=_load_fresh_pickle, ahead=ahead):
+        if graph is None:
+            graph = from_path_ensure_pickle(path, connection=connection)
+
+        yield graph
+
+
+def from_directory(directory, connection=None, ahead=None):
     """Parses all BEL scripts in the given directory with :func:`load_paths` and returns the union of the resulting
-    graphs.
+    graphs. Each graph is merged then freed before the next is parsed, like in :func:`from_pickles`.
 
     :param str directory: A path to a directory
     :param connection: database connection string to cache, pre-built :class:`Manager`, or None to use default cache
     :type connection: Optional[str or pybel.manager.Manager]
+    :param Optional[int] ahead: If given, loads up to this many already parsed graphs ahead in background threads while
+                                the others are merged
     :rtype: pybel.BELGraph
     """
-    return union(iter_from_directory(directory, connection=connection))
+    return streaming_union(iter_from_directory(directory, connection=connection, ahead=ahead))
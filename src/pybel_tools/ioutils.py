@@ -4,14 +4,16 @@
 
 import logging
 import os
+import pickle
+from multiprocessing import Pool
 
 from pybel import from_pickle, to_database, to_pickle, to_web
 from pybel.io.exc import ImportVersionWarning
 from pybel.manager import Manager
-from .io import from_path_ensure_pickle
+from .columnar import to_columnar
+from .grouping import _build_subgraph, _index_edges_by_annotation
+from .io import from_path_ensure_pickle, iter_prefetched
 from .mutation import add_canonical_names, enrich_pubmed_citations, infer_central_dogma as infer_central_dogma_mutator
-from .selection import get_subgraph_by_annotation_value
-from .summary import get_annotation_values
 
 __all__ = [
     'subgraphs_to_pickles',
@@ -40,8 +42,103 @@ def get_paths_recursive(directory, extension='.bel', exclude_directory_pattern=N
                 yield os.path.join(root, file)
 
 
+#: The manager and parameters given to each worker process by :func:`_initialize_convert_worker`
+_worker_manager = None
+_worker_parameters = None
+
+#: The network and its edges grouped by annotation value given to each worker process by
+#: :func:`_initialize_subgraph_writer`
+_worker_network = None
+_worker_index = None
+
+
+def _parse_path(path, manager, canonicalize, infer_central_dogma, kwargs):
+    """Parses a BEL script with :func:`from_path_ensure_pickle`, then adds canonical names and infers
+    the central dogma
+
+    :param str path: The path to a BEL script
+    :param pybel.manager.Manager manager: A cache manager
+    :param bool canonicalize: Calculate canonical nodes?
+    :param bool infer_central_dogma: Should the central dogma be inferred for all proteins, RNAs, and miRNAs
+    :param dict kwargs: Parameters to pass to :func:`pybel.from_path`
+    :rtype: pybel.BELGraph
+    """
+    graph = from_path_ensure_pickle(path, connection=manager, **kwargs)
+
+    if canonicalize:
+        add_canonical_names(graph)
+
+    if infer_central_dogma:
+        infer_central_dogma_mutator(graph)
+
+    return graph
+
+
+def _initialize_convert_worker(connection, parameters):
+    """Gives a worker process its own connection to the cache and the parameters for :func:`_parse_path`
+
+    :param str connection: A database connection string
+    :param tuple parameters: The rest of the arguments to :func:`_parse_path`
+    """
+    global _worker_manager, _worker_parameters
+    _worker_manager = Manager(connection=connection)
+    _worker_parameters = parameters
+
+
+def _parse_path_in_worker(path):
+    """Runs :func:`_parse_path` with the manager and parameters from :func:`_initialize_convert_worker`
+
+    :param str path: The path to a BEL script
+    :return: A triple of the path, the graph or None, and the exception or None
+    :rtype: tuple[str,Optional[pybel.BELGraph],Optional[Exception]]
+    """
+    try:
+        graph = _parse_path(path, _worker_manager, *_worker_parameters)
+    except Exception as e:
+        log.exception('problem parsing %s', path)
+
+        # the exception has to get back to the parent process, which some parser exceptions can't do
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError('{}: {}'.format(e.__class__.__name__, e))
+
+        return path, None, e
+
+    return path, graph, None
+
+
+def _iter_parsed_paths(paths, manager, n_jobs, parameters):
+    """Parses the paths in this process, or in worker processes if there's more than one job
+
+    :param iter[str] paths: The paths to parse
+    :param pybel.manager.Manager manager: A cache manager
+    :param Optional[int] n_jobs: The number of worker processes
+    :param tuple parameters: The rest of the arguments to :func:`_parse_path`
+    :return: An iterator over triples of the path, the graph or None, and the exception or None, in the order they're
+             finished
+    :rtype: iter[tuple[str,Optional[pybel.BELGraph],Optional[Exception]]]
+    """
+    if n_jobs is None or n_jobs <= 1:
+        for path in paths:
+            try:
+                graph = _parse_path(path, manager, *parameters)
+            except Exception as e:
+                log.exception('problem parsing %s', path)
+                yield path, None, e
+            else:
+                yield path, graph, None
+
+        return
+
+    with Pool(processes=n_jobs, initializer=_initialize_convert_worker,
+              initargs=(manager.connection, parameters)) as pool:
+        for result in pool.imap_unordered(_parse_path_in_worker, paths):
+            yield result
+
+
 def convert_paths(paths, connection=None, upload=False, canonicalize=True, infer_central_dogma=True,
-                  enrich_citations=False, send=False, **kwargs):
+                  enrich_citations=False, send=False, n_jobs=None, **kwargs):
     """Recursively parses and either uploads/pickles graphs in a given set of files
 
     :param iter[str] paths: The paths to convert
@@ -52,6 +149,9 @@ def convert_paths(paths, connection=None, upload=False, canonicalize=True, infer
     :param bool infer_central_dogma: Should the central dogma be inferred for all proteins, RNAs, and miRNAs
     :param bool enrich_citations: Should the citations be enriched using Entrez Utils?
     :param bool send: Send to PyBEL Web?
+    :param Optional[int] n_jobs: If more than one, parses the files in this many worker processes, each with its own
+                                 connection to the cache, so the connection can't be to an in-memory database. The
+                                 graphs are enriched, uploaded, and sent in this process in the order they're finished.
     :param kwargs: Parameters to pass to :func:`pybel.from_path`
     :return: A pair of a dictionary {path: bel graph} and list of failed paths
     :rtype: tuple[dict[str,pybel.BELGraph],list[str]]
@@ -61,20 +161,11 @@ def convert_paths(paths, connection=None, upload=False, canonicalize=True, infer
     successes = {}
     failures = []
 
-    for path in paths:
-        try:
-            graph = from_path_ensure_pickle(path, connection=manager, **kwargs)
-        except Exception as e:
-            log.exception('problem parsing %s', path)
+    for path, graph, e in _iter_parsed_paths(paths, manager, n_jobs, (canonicalize, infer_central_dogma, kwargs)):
+        if graph is None:
             failures.append((path, e))
             continue
 
-        if canonicalize:
-            add_canonical_names(graph)
-
-        if infer_central_dogma:
-            infer_central_dogma_mutator(graph)
-
         if enrich_citations:
             enrich_pubmed_citations(graph=graph, manager=manager)
 
@@ -130,13 +221,28 @@ def convert_directory(directory, connection=None, upload=False, pickle=False, ca
     return result
 
 
-def upload_recursive(directory, connection=None, exclude_directory_pattern=None):
+def _from_pickle_or_none(path):
+    """Loads a pickle, or returns None if it's from an old version of PyBEL
+
+    :param str path: The path to a BEL pickle
+    :rtype: Optional[pybel.BELGraph]
+    """
+    try:
+        return from_pickle(path)
+    except (ImportError, ImportVersionWarning):
+        log.warning('%s uses a pickle from an old version of PyBEL. Skipping.', path)
+
+
+def upload_recursive(directory, connection=None, exclude_directory_pattern=None, ahead=None, **kwargs):
     """Recursively uploads all gpickles in a given directory and sub-directories
     
     :param str directory: the directory to traverse
     :param connection: A connection string or manager
     :type connection: Optional[str or pybel.manage.Manager]
     :param Optional[str] exclude_directory_pattern: Any directory names to exclude
+    :param Optional[int] ahead: If given, loads up to this many graphs ahead in the background while the others are
+                                uploaded, with :func:`pybel_tools.io.iter_prefetched`
+    :param kwargs: Keyword arguments to pass to :func:`pybel_tools.io.iter_prefetched`, like ``max_bytes``
     """
     manager = Manager.ensure(connection)
     paths = list(get_paths_recursive(
@@ -146,30 +252,88 @@ def upload_recursive(directory, connection=None, exclude_directory_pattern=None)
     ))
     log.info('Paths to upload: %s', paths)
 
-    for path in paths:
-        try:
-            network = from_pickle(path)
-        except (ImportError, ImportVersionWarning):
-            log.warning('%s uses a pickle from an old version of PyBEL. Quitting.', path)
+    if ahead is None:
+        networks = (_from_pickle_or_none(path) for path in paths)
+    else:
+        networks = iter_prefetched(paths, load=_from_pickle_or_none, ahead=ahead, ordered=False, **kwargs)
+
+    for network in networks:
+        if network is None:
             continue
 
         to_database(network, connection=manager, store_parts=True)
 
 
-def subgraphs_to_pickles(network, annotation, directory=None):
-    """Groups the given graph into subgraphs by the given annotation with :func:`get_subgraph_by_annotation` and
-    outputs them as gpickle files to the given directory with :func:`pybel.to_pickle`
+def _write_subgraph(network, edges, path, columnar):
+    """Builds the subgraph of some edges from a network and writes it
+
+    :param pybel.BELGraph network: A BEL network
+    :param list[tuple] edges: A list of (source, target, key, data) edges
+    :param str path: The path to write to
+    :param bool columnar: Should the format from :mod:`pybel_tools.columnar` be written instead of a gpickle?
+    """
+    subgraph = _build_subgraph(network, edges)
+    subgraph.document.update(network.document)
+
+    if columnar:
+        to_columnar(subgraph, path)
+    else:
+        to_pickle(subgraph, path)
+
+
+def _initialize_subgraph_writer(network, index):
+    """Gives a worker process the network and its edges grouped by annotation value
+
+    :param pybel.BELGraph network: A BEL network
+    :param dict[str,list[tuple]] index: A dictionary from values to lists of (source, target, key, data) edges
+    """
+    global _worker_network, _worker_index
+    _worker_network = network
+    _worker_index = index
+
+
+def _write_subgraph_in_worker(task):
+    """Runs :func:`_write_subgraph` with the network and edges from :func:`_initialize_subgraph_writer`
+
+    :param tuple[str,str,bool] task: The annotation value, the path to write to, and whether to write the columnar
+                                     format
+    :return: The path
+    :rtype: str
+    """
+    value, path, columnar = task
+    _write_subgraph(_worker_network, _worker_index[value], path, columnar)
+    return path
+
+
+def subgraphs_to_pickles(network, annotation, directory=None, processes=None, columnar=False):
+    """Groups the given graph into subgraphs by the given annotation in a single pass over its edges, like
+    :func:`pybel_tools.grouping.get_subgraphs_by_annotation`, and outputs them as gpickle files to the given directory
+    with :func:`pybel.to_pickle`
 
     :param pybel.BELGraph network: A BEL network
     :param str annotation: An annotation to split by. Suggestion: ``Subgraph``
     :param Optional[str] directory: A directory to output the pickles
+    :param Optional[int] processes: If given, builds and writes the subgraphs in this many worker processes
+    :param bool columnar: Should the subgraphs be written in the format from :mod:`pybel_tools.columnar` with the
+                          ``.bgraph`` extension instead?
+    :return: The paths of the written subgraphs
+    :rtype: list[str]
     """
     directory = directory or os.getcwd()
+    extension = '.bgraph' if columnar else '.gpickle'
+
+    index = _index_edges_by_annotation(network, annotation, keep_undefined=False)
+
+    tasks = [
+        (value, os.path.join(directory, '{}_{}{}'.format(annotation, value.replace(' ', '_'), extension)), columnar)
+        for value in index
+    ]
+
+    if processes is None:
+        for value, path, _ in tasks:
+            _write_subgraph(network, index[value], path, columnar)
 
-    for value in get_annotation_values(network, annotation):
-        sg = get_subgraph_by_annotation_value(network, annotation, value)
-        sg.document.update(network.document)
+        return [path for _, path, _ in tasks]
 
-        file_name = '{}_{}.gpickle'.format(annotation, value.replace(' ', '_'))
-        path = os.path.join(directory, file_name)
-        to_pickle(sg, path)
+    with Pool(processes=processes, initializer=_initialize_subgraph_writer, initargs=(network, index)) as pool:
+        return list(pool.imap_unordered(_write_subgraph_in_worker, tasks))
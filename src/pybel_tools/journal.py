@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a BEL graph that records the changes made to it, so they can be undone without having copied
+the graph beforehand.
+
+A :class:`JournaledGraph` shares its nodes and edges with the graph it wraps. While a savepoint is active, adding and
+removing nodes and edges and changing their data dictionaries is recorded in a journal, and
+:meth:`JournaledGraph.rollback` undoes the changes in reverse order. Both take time proportional to the number of
+changes, not the size of the graph.
+
+>>> from pybel_tools.journal import JournaledGraph
+>>> from pybel_tools.mutation import infer_central_dogma
+>>> network = ...
+>>> graph = JournaledGraph(network)
+>>> savepoint = graph.savepoint()
+>>> infer_central_dogma(graph)
+>>> ...  # look at the result
+>>> graph.rollback(savepoint)  # the network is back how it was
+
+Changes should be made through the journaled graph, since changes to the structure of the wrapped graph aren't
+recorded. Changes inside nested dictionaries, like the citation of an edge, are recorded if they were in the graph when
+it was wrapped or when the node or edge was added. Changes inside lists aren't recorded.
+"""
+
+import logging
+
+from networkx import MultiDiGraph, NetworkXError
+
+from pybel import BELGraph
+from .copy_on_write import CopyOnWriteGraph, _make_bel_graph
+
+__all__ = [
+    'JournaledGraph',
+    'journal',
+]
+
+log = logging.getLogger(__name__)
+
+_MISSING = object()
+
+_DATA = 'data'
+_ADD_NODE = 'add_node'
+_REMOVE_NODE = 'remove_node'
+_ADD_EDGE = 'add_edge'
+_REMOVE_EDGE = 'remove_edge'
+
+
+class _Journal(object):
+    """The changes made since the first active savepoint, shared between a graph and its data dictionaries"""
+
+    def __init__(self):
+        #: The changes, in the order they were made
+        self.entries = []
+
+        #: The positions in the entries of the active savepoints
+        self.savepoints = []
+
+    def record(self, entry):
+        """Records a change if there are active savepoints
+
+        :param tuple entry: A change
+        """
+        if self.savepoints:
+            self.entries.append(entry)
+
+
+class _JournaledDict(dict):
+    """A data dictionary that records the previous value of each key before it's changed"""
+
+    __slots__ = ('_journal',)
+
+    def __init__(self, journal, data):
+        """
+        :param _Journal journal: The journal to record changes in
+        :param dict data: The data to copy. Nested dictionaries are copied and journaled too.
+        """
+        super(_JournaledDict, self).__init__(
+            (key, _JournaledDict(journal, value) if isinstance(value, dict) else value)
+            for key, value in data.items()
+        )
+        self._journal = journal
+
+    def _record(self, key):
+        if self._journal.savepoints:
+            self._journal.entries.append((_DATA, self, key, dict.get(self, key, _MISSING)))
+
+    def __setitem__(self, key, value):
+        self._record(key)
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        if key in self:
+            self._record(key)
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self._record(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._journal.record((_DATA, self, key, value))
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._record(key)
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        for key in self:
+            self._record(key)
+        dict.clear(self)
+
+    def __reduce__(self):
+        # pickles and copies are plain dictionaries, since they aren't part of the journaled graph
+        return dict, (dict(self),)
+
+
+class JournaledGraph(BELGraph):
+    """A BEL graph that records the changes made to it while a savepoint is active, so they can be rolled back"""
+
+    def __new__(cls, graph=None, **kwargs):
+        # networkx makes empty graphs of the same class, like in subgraph, and those don't need to be journaled
+        if graph is None:
+            return BELGraph(**kwargs)
+
+        return super(JournaledGraph, cls).__new__(cls)
+
+    def __init__(self, graph):
+        """
+        :param pybel.BELGraph graph: The graph to wrap. Its nodes and edges are shared with this graph, and their data
+                                     dictionaries are replaced with ones that record their changes.
+        """
+        if isinstance(graph, CopyOnWriteGraph):
+            graph = graph.to_bel_graph()
+
+        # networkx's constructor isn't called since it would assign empty structures
+        self.__dict__.update(
+            (key, value)
+            for key, value in graph.__dict__.items()
+            if not key.startswith('_journal')
+        )
+
+        self._journal = _Journal()
+
+        for node, data in self.node.items():
+            self.node[node] = _JournaledDict(self._journal, data)
+
+        for neighbors in self.succ.values():
+            for keydict in neighbors.values():
+                for key, data in keydict.items():
+                    keydict[key] = _JournaledDict(self._journal, data)
+
+    def savepoint(self):
+        """Marks the current state of the graph, so the changes made afterwards can be undone with :meth:`rollback`
+
+        :return: The savepoint
+        :rtype: int
+        """
+        position = len(self._journal.entries)
+        self._journal.savepoints.append(position)
+        return position
+
+    def rollback(self, savepoint=None):
+        """Undoes the changes made since the given savepoint, which stays active. Later savepoints are released.
+
+        :param Optional[int] savepoint: A savepoint from :meth:`savepoint`. Defaults to the latest one.
+        :raises: ValueError
+        """
+        index = self._get_savepoint_index(savepoint)
+        position = self._journal.savepoints[index]
+        del self._journal.savepoints[index + 1:]
+
+        entries = self._journal.entries
+        log.debug('rolling back %d changes', len(entries) - position)
+
+        while len(entries) > position:
+            self._undo(entries.pop())
+
+    def release(self, savepoint=None):
+        """Keeps the changes made since the given savepoint and stops being able to roll back to it or later savepoints
+
+        :param Optional[int] savepoint: A savepoint from :meth:`savepoint`. Defaults to the latest one.
+        :raises: ValueError
+        """
+        index = self._get_savepoint_index(savepoint)
+        del self._journal.savepoints[index:]
+
+        if not self._journal.savepoints:
+            del self._journal.entries[:]
+
+    def number_of_changes(self):
+        """Gets the number of changes recorded since the first active savepoint
+
+        :rtype: int
+        """
+        return len(self._journal.entries)
+
+    def _get_savepoint_index(self, savepoint):
+        savepoints = self._journal.savepoints
+
+        if not savepoints:
+            raise ValueError('there are no active savepoints')
+
+        if savepoint is None:
+            return len(savepoints) - 1
+
+        try:
+            return savepoints.index(savepoint)
+        except ValueError:
+            raise ValueError('savepoint is not active: {}'.format(savepoint))
+
+    def _wrap(self, data):
+        return _JournaledDict(self._journal, data)
+
+    def _restore_edge(self, u, v, key, data):
+        keydict = self.succ[u].get(v)
+
+        # the key dictionary is shared between the successors and predecessors, like in networkx
+        if keydict is None:
+            keydict = self.succ[u][v] = self.pred[v][u] = {}
+
+        keydict[key] = data
+
+    def _undo(self, entry):
+        """Undoes a single change
+
+        :param tuple entry: A change from the journal
+        """
+        kind = entry[0]
+
+        if kind == _DATA:
+            _, data, key, value = entry
+
+            if value is _MISSING:
+                dict.pop(data, key, None)
+            else:
+                dict.__setitem__(data, key, value)
+
+        elif kind == _ADD_NODE:
+            MultiDiGraph.remove_node(self, entry[1])
+
+        elif kind == _ADD_EDGE:
+            _, u, v, key = entry
+            MultiDiGraph.remove_edge(self, u, v, key=key)
+
+        elif kind == _REMOVE_EDGE:
+            self._restore_edge(*entry[1:])
+
+        elif kind == _REMOVE_NODE:
+            _, node, data, out_edges, in_edges = entry
+
+            self.node[node] = data
+            self.succ[node] = {}
+            self.pred[node] = {}
+
+            for v, key, edge_data in out_edges:
+                self._restore_edge(node, v, key, edge_data)
+
+            for u, key, edge_data in in_edges:
+                self._restore_edge(u, node, key, edge_data)
+
+    def add_node(self, n, attr_dict=None, **attr):
+        if n in self.succ:
+            self.node[n].update(attr_dict or {}, **attr)
+            return
+
+        super(JournaledGraph, self).add_node(n, attr_dict=attr_dict, **attr)
+        self.node[n] = self._wrap(self.node[n])
+        self._journal.record((_ADD_NODE, n))
+
+    def add_nodes_from(self, nodes, **attr):
+        for n in nodes:
+            try:
+                hash(n)
+            except TypeError:
+                n, node_data = n
+                self.add_node(n, attr_dict=dict(attr, **node_data))
+            else:
+                self.add_node(n, **attr)
+
+    def remove_node(self, n):
+        if n not in self.succ:
+            raise NetworkXError('The node %s is not in the digraph.' % (n,))
+
+        if self._journal.savepoints:
+            out_edges = [
+                (v, key, data)
+                for v, keydict in self.succ[n].items()
+                for key, data in keydict.items()
+            ]
+            in_edges = [
+                (u, key, data)
+                for u, keydict in self.pred[n].items()
+                if u != n  # self-loops are already in the out edges
+                for key, data in keydict.items()
+            ]
+            self._journal.entries.append((_REMOVE_NODE, n, self.node[n], out_edges, in_edges))
+
+        super(JournaledGraph, self).remove_node(n)
+
+    def remove_nodes_from(self, nbunch):
+        for n in nbunch:
+            if n in self.succ:
+                self.remove_node(n)
+
+    def add_edge(self, u, v, key=None, attr_dict=None, **attr):
+        keydict = self.succ[u].get(v, {}) if u in self.succ else {}
+
+        if key is None:
+            key = len(keydict)
+            while key in keydict:
+                key += 1
+
+        if key in keydict:
+            keydict[key].update(attr_dict or {}, **attr)
+            return
+
+        for n in ((u, v) if u != v else (u,)):
+            if n not in self.succ:
+                self.add_node(n)
+
+        super(JournaledGraph, self).add_edge(u, v, key=key, attr_dict=attr_dict, **attr)
+
+        keydict = self.succ[u][v]
+        keydict[key] = self._wrap(keydict[key])
+        self._journal.record((_ADD_EDGE, u, v, key))
+
+    def remove_edge(self, u, v, key=None):
+        try:
+            keydict = self.succ[u][v]
+        except KeyError:
+            raise NetworkXError('The edge %s-%s is not in the graph.' % (u, v))
+
+        if key is None:
+            key = list(keydict)[-1]  # the same edge networkx would remove
+        elif key not in keydict:
+            raise NetworkXError('The edge %s-%s with key %s is not in the graph.' % (u, v, key))
+
+        self._journal.record((_REMOVE_EDGE, u, v, key, keydict[key]))
+        super(JournaledGraph, self).remove_edge(u, v, key=key)
+
+    def clear(self):
+        self.remove_nodes_from(list(self.succ))
+
+    def to_bel_graph(self):
+        """Gives a plain :class:`pybel.BELGraph` that shares the nodes and edges of this graph
+
+        :rtype: pybel.BELGraph
+        """
+        return _make_bel_graph(self._get_bel_graph_state())
+
+    def _get_bel_graph_state(self):
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if not key.startswith('_journal')
+        }
+
+    def __reduce_ex__(self, protocol):
+        # pickles and deep copies are plain BEL graphs, without the journal
+        return _make_bel_graph, (self._get_bel_graph_state(),)
+
+
+def journal(graph):
+    """Wraps a graph so the changes made to it can be rolled back. See :class:`JournaledGraph`.
+
+    :param pybel.BELGraph graph: A BEL graph
+    :rtype: JournaledGraph
+    """
+    return JournaledGraph(graph)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a union that adds graphs to the merged graph one at a time, so each graph can be freed as soon
+as it's added instead of all of them being held until the end like with :func:`pybel.union`.
+
+>>> from pybel_tools.merge import streaming_union
+>>> graph = streaming_union(iter_from_pickles(paths))
+
+Edges are deduplicated with the same hashes as :func:`pybel.union`, but the hashes of the merged graph's edges are kept
+between graphs instead of being calculated again for each one. The citations, evidences, and annotations of the edges
+are shared between the edges that have equal ones, which saves a lot of memory when many documents cite the same
+papers. Since they're shared, changing one in place changes it for all of the edges that have it.
+"""
+
+import json
+import logging
+from copy import deepcopy
+
+from pybel import BELGraph
+from pybel.constants import ANNOTATIONS, CITATION, EVIDENCE
+from pybel.utils import hash_edge
+
+__all__ = [
+    'StreamingUnion',
+    'streaming_union',
+]
+
+log = logging.getLogger(__name__)
+
+#: The number of bytes of each edge hash kept to check for duplicate edges
+_KEY_SIZE = 16
+
+_namespace_keys = ('namespace_url', 'namespace_pattern', 'namespace_owl')
+_annotation_keys = ('annotation_url', 'annotation_pattern', 'annotation_owl')
+
+
+class StreamingUnion(object):
+    """Builds the union of graphs that are added one at a time"""
+
+    def __init__(self, share_data=True):
+        """
+        :param bool share_data: Should equal citations, evidences, and annotations be shared between edges?
+        """
+        self.share_data = share_data
+
+        #: The merged graph. None until the first graph is added.
+        self.graph = None
+
+        #: The shortened hashes of the qualified edges in the merged graph
+        self._edge_keys = set()
+
+        #: Dictionaries from the JSON of citations and annotations or evidence strings to the shared ones
+        self._citations = {}
+        self._annotations = {}
+        self._evidences = {}
+
+    def _share(self, shared, value, key=None):
+        if key is None:
+            key = json.dumps(value, sort_keys=True)
+
+        return shared.setdefault(key, value)
+
+    def _get_data(self, data):
+        """Makes a copy of an edge's data that uses the shared citation, evidence, and annotations
+
+        :param dict data: An edge's data dictionary
+        :rtype: dict
+        """
+        data = data.copy()
+
+        if not self.share_data:
+            return data
+
+        if CITATION in data:
+            data[CITATION] = self._share(self._citations, data[CITATION])
+
+        if EVIDENCE in data:
+            data[EVIDENCE] = self._share(self._evidences, data[EVIDENCE], key=data[EVIDENCE])
+
+        if ANNOTATIONS in data:
+            data[ANNOTATIONS] = self._share(self._annotations, data[ANNOTATIONS])
+
+        return data
+
+    def _add_metadata(self, graph):
+        """Adds the namespace and annotation definitions of a graph to the merged graph
+
+        :param pybel.BELGraph graph: A BEL graph
+        """
+        for key in _namespace_keys + _annotation_keys:
+            getattr(self.graph, key).update(getattr(graph, key))
+
+        for keyword, values in graph.annotation_list.items():
+            self.graph.annotation_list.setdefault(keyword, set()).update(values)
+
+    def add(self, graph):
+        """Adds a graph to the merged graph. The graph isn't kept, so it can be freed afterwards.
+
+        :param pybel.BELGraph graph: A BEL graph
+        """
+        if self.graph is None:
+            self.graph = BELGraph()
+            self.graph.graph.update(deepcopy(graph.graph))
+        else:
+            self._add_metadata(graph)
+
+        for node, data in graph.nodes_iter(data=True):
+            if node not in self.graph:
+                self.graph.add_node(node, attr_dict=data.copy())
+
+        for u, v, k, data in graph.edges_iter(keys=True, data=True):
+            if k < 0:  # unqualified edges are unique by their key
+                if not self.graph.has_edge(u, v, key=k):
+                    self.graph.add_edge(u, v, key=k, attr_dict=data.copy())
+                continue
+
+            edge_key = bytes.fromhex(hash_edge(u, v, data)[:2 * _KEY_SIZE])
+
+            if edge_key in self._edge_keys:
+                continue
+
+            self._edge_keys.add(edge_key)
+            self.graph.add_edge(u, v, attr_dict=self._get_data(data))
+
+    def __iadd__(self, graph):
+        self.add(graph)
+        return self
+
+
+def streaming_union(graphs, share_data=True):
+    """Takes the union of graphs, freeing each one after it's added
+
+    For each graph to be freed, nothing else can refer to it, so ``graphs`` should be an iterator that loads them
+    rather than a list.
+
+    :param iter[pybel.BELGraph] graphs: An iterable of BEL graphs
+    :param bool share_data: Should equal citations, evidences, and annotations be shared between edges?
+    :rtype: pybel.BELGraph
+    :raises: ValueError
+    """
+    merger = StreamingUnion(share_data=share_data)
+
+    for graph in graphs:
+        merger.add(graph)
+        log.debug('merged %d nodes and %d edges', graph.number_of_nodes(), graph.number_of_edges())
+        del graph  # so it's freed before the next one is made
+
+    if merger.graph is None:
+        raise ValueError('no networks given')
+
+    return merger.graph
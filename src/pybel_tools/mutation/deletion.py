@@ -2,11 +2,14 @@
 
 """This module contains convenient functions for removing nodes/edges that are returned from selection functions"""
 
+from functools import partial
+
 from pybel.constants import BIOPROCESS, PATHOLOGY
 from pybel.struct.filters import get_nodes
 from pybel.struct.filters.edge_filters import filter_edges
 from pybel.struct.filters.edge_predicates import is_associative_relation
 from .. import pipeline
+from ..constants import CENTRAL_DOGMA_INFERENCES
 from ..filters.node_selection import function_inclusion_filter_builder
 from ..selection.leaves import get_gene_leaves, get_rna_leaves
 from ..selection.utils import get_leaves_by_type
@@ -82,7 +85,10 @@ def remove_inconsistent_edges(graph):
         graph.remove_edges_from(edges)
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(
+    partial(function_inclusion_filter_builder, PATHOLOGY),
+    commutes_with=CENTRAL_DOGMA_INFERENCES,
+)
 def remove_pathologies(graph):
     """Remove pathology nodes
 
@@ -92,7 +98,10 @@ def remove_pathologies(graph):
     graph.remove_nodes_from(nodes)
 
 
-@pipeline.in_place_mutator
+@pipeline.node_deleter(
+    partial(function_inclusion_filter_builder, BIOPROCESS),
+    commutes_with=CENTRAL_DOGMA_INFERENCES,
+)
 def remove_biological_processes(graph):
     """Remove biological process nodes
 
@@ -102,7 +111,10 @@ def remove_biological_processes(graph):
     graph.remove_nodes_from(nodes)
 
 
-@pipeline.in_place_mutator
+@pipeline.edge_deleter(
+    lambda: is_associative_relation,
+    commutes_with=CENTRAL_DOGMA_INFERENCES,
+)
 def remove_associations(graph):
     """Removes all associative relationships from the graph
 
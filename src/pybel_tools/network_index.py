@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains an inverted index from nodes and edges to the networks that contain them, so questions like
+"which networks contain this edge?" can be answered without loading any networks.
+
+>>> from pybel_tools.network_index import NetworkIndex
+>>> index = NetworkIndex('~/.pybel/network_index.pickle')
+>>> network = index.insert_graph(manager, graph)  # inserts into the manager and indexes the graph
+>>> index.get_network_ids_by_edge(u, v, 'increases')
+{1, 5, 32}
+
+Nodes are indexed by :func:`pybel.utils.hash_node`, the same hash the database uses, and edges by a hash of their
+source, target, and relation, so edges with different citations or annotations count as the same edge.
+
+If the index has a path, each change is appended to the file as soon as it's made, and the index is read back from it
+when it's made again. :meth:`NetworkIndex.compact` rewrites the file as a single snapshot.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+from pybel.constants import RELATION
+from pybel.utils import hash_node
+
+__all__ = [
+    'NetworkIndex',
+    'hash_edge_triple',
+]
+
+log = logging.getLogger(__name__)
+
+_ADD = 'add'
+_REMOVE = 'remove'
+_SNAPSHOT = 'snapshot'
+
+#: The number of bytes of each hash kept as keys in the index
+_KEY_SIZE = 16
+
+
+def hash_edge_triple(u, v, relation):
+    """Hashes an edge by its source, target, and relation, ignoring the rest of its data
+
+    :param tuple u: The source BEL node
+    :param tuple v: The target BEL node
+    :param str relation: The relation
+    :rtype: str
+    """
+    return hashlib.sha512(pickle.dumps((u, v, relation))).hexdigest()
+
+
+def _make_key(hexdigest):
+    """Shortens a hash to save memory in the index
+
+    :param str hexdigest: A hash from :func:`pybel.utils.hash_node` or :func:`hash_edge_triple`
+    :rtype: bytes
+    """
+    return bytes.fromhex(hexdigest[:2 * _KEY_SIZE])
+
+
+def _iter_graph_keys(graph):
+    """Gets the keys of the nodes and edges in a graph
+
+    :param pybel.BELGraph graph: A BEL graph
+    :rtype: tuple[set[bytes],set[bytes]]
+    """
+    node_keys = {_make_key(hash_node(node)) for node in graph}
+    edge_keys = {
+        _make_key(hash_edge_triple(u, v, data[RELATION]))
+        for u, v, data in graph.edges_iter(data=True)
+    }
+    return node_keys, edge_keys
+
+
+class NetworkIndex(object):
+    """Maps the hashes of nodes and edges to the identifiers of the networks that contain them
+
+    The networks containing each node or edge are stored as the bits of an integer, so each lookup gives them all at
+    once and set queries across several nodes or edges are bitwise operations.
+    """
+
+    def __init__(self, path=None):
+        """
+        :param Optional[str] path: The file to keep the index in. If it exists, the index is read from it.
+        """
+        self.path = os.path.expanduser(path) if path is not None else None
+
+        #: The bit of each network identifier
+        self._bits = {}
+
+        #: The network identifier of each bit
+        self._network_ids = []
+
+        #: A dictionary from node keys to the bits of the networks containing them
+        self._nodes = {}
+
+        #: A dictionary from edge keys to the bits of the networks containing them
+        self._edges = {}
+
+        if self.path is not None and os.path.exists(self.path):
+            self._read()
+
+    def _read(self):
+        """Replays the changes in the index's file"""
+        count = 0
+
+        with open(self.path, 'rb') as file:
+            while True:
+                try:
+                    record = pickle.load(file)
+                except EOFError:
+                    break
+
+                self._apply(record)
+                count += 1
+
+        log.debug('read %d records for %d networks from %s', count, len(self._bits), self.path)
+
+    def _write(self, record, mode='ab'):
+        if self.path is None:
+            return
+
+        with open(self.path, mode) as file:
+            pickle.dump(record, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _apply(self, record):
+        kind = record[0]
+
+        if kind == _ADD:
+            _, network_id, node_keys, edge_keys = record
+            self._add(network_id, node_keys, edge_keys)
+
+        elif kind == _REMOVE:
+            self._remove(record[1])
+
+        elif kind == _SNAPSHOT:
+            _, self._network_ids, self._nodes, self._edges = record
+            self._bits = {
+                network_id: 1 << bit
+                for bit, network_id in enumerate(self._network_ids)
+                if network_id is not None
+            }
+
+    def _add(self, network_id, node_keys, edge_keys):
+        if network_id in self._bits:
+            self._remove(network_id)
+
+        # bits of removed networks are re-used
+        try:
+            position = self._network_ids.index(None)
+        except ValueError:
+            position = len(self._network_ids)
+            self._network_ids.append(network_id)
+        else:
+            self._network_ids[position] = network_id
+
+        bit = self._bits[network_id] = 1 << position
+
+        for keys, index in ((node_keys, self._nodes), (edge_keys, self._edges)):
+            for key in keys:
+                index[key] = index.get(key, 0) | bit
+
+    def _remove(self, network_id):
+        bit = self._bits.pop(network_id)
+        self._network_ids[self._network_ids.index(network_id)] = None
+
+        for index in (self._nodes, self._edges):
+            for key in [key for key, bits in index.items() if bits & bit]:
+                bits = index[key] & ~bit
+
+                if bits:
+                    index[key] = bits
+                else:
+                    del index[key]
+
+    def add_graph(self, network_id, graph):
+        """Indexes the nodes and edges of a network. If the network is already indexed, it's replaced.
+
+        :param int network_id: A network identifier
+        :param pybel.BELGraph graph: The network's graph
+        """
+        node_keys, edge_keys = _iter_graph_keys(graph)
+        self._add(network_id, node_keys, edge_keys)
+        self._write((_ADD, network_id, node_keys, edge_keys))
+
+    def remove_network(self, network_id):
+        """Removes a network from the index
+
+        :param int network_id: A network identifier
+        :raises: KeyError
+        """
+        self._remove(network_id)
+        self._write((_REMOVE, network_id))
+
+    def insert_graph(self, manager, graph, **kwargs):
+        """Inserts a graph with a manager, then indexes it
+
+        :param pybel.manager.Manager manager: A cache manager
+        :param pybel.BELGraph graph: A BEL graph
+        :param kwargs: Passed to the manager's ``insert_graph``
+        :return: The network from the manager
+        """
+        network = manager.insert_graph(graph, **kwargs)
+        self.add_graph(network.id, graph)
+        return network
+
+    def compact(self):
+        """Rewrites the index's file as a single snapshot of the current index"""
+        if self.path is None:
+            return
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            pickle.dump((_SNAPSHOT, self._network_ids, self._nodes, self._edges), file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(tmp_path, self.path)
+
+    def _to_network_ids(self, bits):
+        """Converts the bits of networks to their identifiers
+
+        :param int bits: The bits of some networks
+        :rtype: set[int]
+        """
+        return {
+            network_id
+            for position, network_id in enumerate(self._network_ids)
+            if bits >> position & 1
+        }
+
+    def _combine(self, index, keys, match_all):
+        bits = None
+
+        for key in keys:
+            key_bits = index.get(key, 0)
+
+            if bits is None:
+                bits = key_bits
+            elif match_all:
+                bits &= key_bits
+            else:
+                bits |= key_bits
+
+        return self._to_network_ids(bits or 0)
+
+    def get_network_ids(self):
+        """Gets the identifiers of the indexed networks
+
+        :rtype: set[int]
+        """
+        return set(self._bits)
+
+    def get_network_ids_by_node_hash(self, node_hash):
+        """Gets the identifiers of the networks containing a node
+
+        :param str node_hash: A node hash from :func:`pybel.utils.hash_node`
+        :rtype: set[int]
+        """
+        return self._to_network_ids(self._nodes.get(_make_key(node_hash), 0))
+
+    def get_network_ids_by_node(self, node):
+        """Gets the identifiers of the networks containing a node
+
+        :param tuple node: A BEL node
+        :rtype: set[int]
+        """
+        return self.get_network_ids_by_node_hash(hash_node(node))
+
+    def get_network_ids_by_edge(self, u, v, relation):
+        """Gets the identifiers of the networks containing an edge
+
+        :param tuple u: The source BEL node
+        :param tuple v: The target BEL node
+        :param str relation: The relation
+        :rtype: set[int]
+        """
+        return self._to_network_ids(self._edges.get(_make_key(hash_edge_triple(u, v, relation)), 0))
+
+    def get_network_ids_by_nodes(self, nodes, match_all=True):
+        """Gets the identifiers of the networks containing all or any of the given nodes
+
+        :param iter[tuple] nodes: BEL nodes
+        :param bool match_all: Should the networks contain all of the nodes, or any of them?
+        :rtype: set[int]
+        """
+        return self._combine(self._nodes, (_make_key(hash_node(node)) for node in nodes), match_all)
+
+    def get_network_ids_by_edges(self, edges, match_all=True):
+        """Gets the identifiers of the networks containing all or any of the given edges
+
+        :param iter[tuple[tuple,tuple,str]] edges: The source, target, and relation of each edge
+        :param bool match_all: Should the networks contain all of the edges, or any of them?
+        :rtype: set[int]
+        """
+        keys = (_make_key(hash_edge_triple(u, v, relation)) for u, v, relation in edges)
+        return self._combine(self._edges, keys, match_all)
+
+    def _count_shared(self, index, network_ids, match_all):
+        bits = [self._bits[network_id] for network_id in network_ids]
+
+        if not bits:
+            return 0
+
+        mask = 0
+        for bit in bits:
+            mask |= bit
+
+        if match_all:
+            return sum(1 for key_bits in index.values() if key_bits & mask == mask)
+
+        return sum(1 for key_bits in index.values() if key_bits & mask)
+
+    def count_shared_nodes(self, network_ids, match_all=True):
+        """Counts the nodes in all or any of the given networks
+
+        :param iter[int] network_ids: Network identifiers
+        :param bool match_all: Should the nodes be in all of the networks, or any of them?
+        :rtype: int
+        :raises: KeyError
+        """
+        return self._count_shared(self._nodes, network_ids, match_all)
+
+    def count_shared_edges(self, network_ids, match_all=True):
+        """Counts the edges in all or any of the given networks
+
+        :param iter[int] network_ids: Network identifiers
+        :param bool match_all: Should the edges be in all of the networks, or any of them?
+        :rtype: int
+        :raises: KeyError
+        """
+        return self._count_shared(self._edges, network_ids, match_all)
+
+    def __contains__(self, network_id):
+        return network_id in self._bits
+
+    def __len__(self):
+        return len(self._bits)
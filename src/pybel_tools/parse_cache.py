@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""This module contains a cache of parsed BEL scripts, so unchanged scripts don't have to be parsed again.
+
+Each parsed graph is kept as a pickle named by a hash of the script's contents, the versions of PyBEL and PyBEL Tools,
+and the options given to the parser, so changing any of them means the script is parsed again instead of a stale graph
+being loaded.
+
+>>> from pybel_tools.parse_cache import ParseCache
+>>> cache = ParseCache(directory='~/.pybel/parse_cache', max_size=2 ** 30)
+>>> graph = cache.get_from_path('my_document.bel', allow_nested=True)  # None if it hasn't been parsed like this
+>>> graph = from_path_ensure_pickle('my_document.bel', cache=cache, allow_nested=True)  # parses, or uses the cache
+"""
+
+import hashlib
+import logging
+import os
+
+from pybel.constants import PYBEL_DIR
+from .cache import GraphCache
+from .utils import get_version
+
+__all__ = [
+    'ParseCache',
+    'get_parse_key',
+    'DEFAULT_PARSE_CACHE_DIRECTORY',
+    'DEFAULT_PARSE_CACHE_SIZE',
+]
+
+log = logging.getLogger(__name__)
+
+#: The directory parsed graphs are kept in by default
+DEFAULT_PARSE_CACHE_DIRECTORY = os.path.join(PYBEL_DIR, 'parse_cache')
+
+#: The default maximum total size in bytes of the parsed graphs in the cache
+DEFAULT_PARSE_CACHE_SIZE = 2 ** 31
+
+#: Options to :func:`pybel.from_path` that don't change the graph, so they aren't part of the key
+_IGNORED_OPTIONS = {'use_tqdm'}
+
+_chunk_size = 2 ** 20
+
+
+def _hash_file(path):
+    """Hashes the contents of a file
+
+    :param str path: The path to a file
+    :rtype: str
+    """
+    hasher = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(_chunk_size), b''):
+            hasher.update(chunk)
+
+    return hasher.hexdigest()
+
+
+def get_parse_key(path, **kwargs):
+    """Hashes the contents of a BEL script with the versions of PyBEL and PyBEL Tools and the parser's options
+
+    :param str path: The path to a BEL script
+    :param kwargs: The options for :func:`pybel.from_path`
+    :rtype: str
+    """
+    options = sorted(
+        (key, value)
+        for key, value in kwargs.items()
+        if key not in _IGNORED_OPTIONS
+    )
+
+    return GraphCache.make_key(get_version(), options, _hash_file(path))
+
+
+class ParseCache(GraphCache):
+    """A :class:`pybel_tools.cache.GraphCache` of parsed graphs keyed by the hashes of the BEL scripts they came from"""
+
+    def __init__(self, directory=None, max_size=None):
+        """
+        :param Optional[str] directory: The directory to keep the parsed graphs in. Is created if it doesn't exist.
+                                        Defaults to :data:`DEFAULT_PARSE_CACHE_DIRECTORY`.
+        :param Optional[int] max_size: The maximum total size in bytes of the parsed graphs. Defaults to
+                                       :data:`DEFAULT_PARSE_CACHE_SIZE`.
+        """
+        super(ParseCache, self).__init__(
+            os.path.expanduser(directory or DEFAULT_PARSE_CACHE_DIRECTORY),
+            max_size=max_size if max_size is not None else DEFAULT_PARSE_CACHE_SIZE,
+        )
+
+    def get_key(self, path, **kwargs):
+        """Gets the key of a BEL script with :func:`get_parse_key`
+
+        :param str path: The path to a BEL script
+        :param kwargs: The options for :func:`pybel.from_path`
+        :rtype: str
+        """
+        return get_parse_key(path, **kwargs)
+
+    def get_from_path(self, path, **kwargs):
+        """Gets the graph parsed from a BEL script if its contents and the options haven't changed
+
+        :param str path: The path to a BEL script
+        :param kwargs: The options for :func:`pybel.from_path`
+        :rtype: Optional[pybel.BELGraph]
+        """
+        return self.get(self.get_key(path, **kwargs))
@@ -42,17 +42,60 @@ This example shows how the results from multiple pipelines can be combine.
 >>> pipeline_c = Pipeline.union(pipeline_a, pipeline_b)
 >>> result = pipeline_c.run(network)
 
+Steps at the beginning of the pipelines that are identical, like the same ``get_subgraph_by_annotation_value``
+followed by different expansions, are only run once. The intermediate graph is only copied where the pipelines
+diverge.
+
+Optimizing Pipelines
+~~~~~~~~~~~~~~~~~~~~
+Deletions like :func:`pybel_tools.mutation.remove_pathologies` each take a pass over the graph.
+:meth:`Pipeline.optimize` moves them ahead of the steps they're declared to commute with and runs neighbouring ones
+in a single pass. :meth:`Pipeline.explain` shows the rewritten steps.
+
+>>> network = ...
+>>> example = Pipeline()
+>>> example.append('infer_central_dogma')
+>>> example.append('remove_pathologies')
+>>> example.append('remove_associations')
+>>> print(example.explain())
+>>> result = example.optimize().run(network)
+
+Stratified Pipelines
+~~~~~~~~~~~~~~~~~~~~
+:meth:`Pipeline.split` runs another pipeline on each stratum from a splitter, like the subgraph for each value of an
+annotation, and combines the results. Splitters that return iterators make one stratum at a time, and with
+``processes``, the strata are run in worker processes while the next ones are being made.
+
+>>> network = ...
+>>> stratum_pipeline = Pipeline()
+>>> stratum_pipeline.append('infer_central_dogma')
+>>> stratum_pipeline.append('expand_periphery')
+>>> example = Pipeline()
+>>> example.split('iter_subgraphs_by_annotation', stratum_pipeline, 'Subgraph')
+>>> result = example.run(network, processes=4)
+
 """
 
 from __future__ import print_function
 
 import json
 import logging
+import multiprocessing
+import os
+import time
 import types
+from collections import OrderedDict
 from functools import wraps
 from inspect import signature
 
-from pybel.struct import node_intersection, union
+from pybel import BELGraph, from_pickle, to_pickle
+from pybel.struct import left_full_join, node_intersection, union
+from pybel.struct.filters.edge_filters import and_edge_predicates
+from pybel.struct.filters.node_filters import concatenate_node_predicates
+from .cache import hash_graph
+from .copy_on_write import CopyOnWriteGraph, copy_on_write
+from .profiling import _get_entry_name
+from .utils import iter_unordered_bounded
 
 __all__ = [
     'Pipeline',
@@ -61,7 +104,12 @@ __all__ = [
     'uni_mutator',
     'mutator',
     'splitter',
+    'node_deleter',
+    'edge_deleter',
     'MissingPipelineFunctionError',
+    'PipelineCancelledError',
+    'build_plan',
+    'optimize_protocol',
 ]
 
 log = logging.getLogger(__name__)
@@ -69,6 +117,9 @@ log = logging.getLogger(__name__)
 META_UNION = 'union'
 META_INTERSECTION = 'intersection'
 
+#: The valid values for the meta key in a protocol entry
+META_TYPES = {META_UNION, META_INTERSECTION}
+
 mapped = {}
 universe_map = {}
 no_universe_map = {}
@@ -85,6 +136,10 @@ class MissingPipelineFunctionError(KeyError):
     """Raised when trying to run the pipeline with a function that isn't registered"""
 
 
+class PipelineCancelledError(Exception):
+    """Raised when a pipeline is cancelled between steps with the event given to :meth:`Pipeline.run`"""
+
+
 def _register(universe, in_place, **kwargs):
     """Builds a decorator function to tag mutator functions
 
@@ -133,6 +188,43 @@ uni_mutator = _register(universe=True, in_place=False)
 #: A function decorator to inform the Pipeline how to handle a function
 mutator = _register(universe=False, in_place=False)
 
+
+def node_deleter(predicate_builder, commutes_with=None):
+    """Builds a decorator for in-place mutators that only remove the nodes passing a predicate that looks at nothing
+    but the node itself, so :meth:`Pipeline.optimize` can fuse them with neighbouring deletions
+
+    :param predicate_builder: A function that takes the same arguments as the decorated function, except for the graph,
+                              and returns the node predicate or list of node predicates (graph, node) -> bool that the
+                              decorated function removes the nodes passing
+    :param Optional[iter[str]] commutes_with: The names of pipeline functions that give the same result when they're run
+                                              before or after the decorated function
+    """
+    return _register(
+        universe=False,
+        in_place=True,
+        node_predicate_builder=predicate_builder,
+        commutes_with=frozenset(commutes_with or ()),
+    )
+
+
+def edge_deleter(predicate_builder, commutes_with=None):
+    """Builds a decorator for in-place mutators that only remove the edges passing a predicate that looks at nothing
+    but the edge itself, so :meth:`Pipeline.optimize` can fuse them with neighbouring deletions
+
+    :param predicate_builder: A function that takes the same arguments as the decorated function, except for the graph,
+                              and returns the edge predicate or list of edge predicates (graph, node, node, key) -> bool
+                              that the decorated function removes the edges passing
+    :param Optional[iter[str]] commutes_with: The names of pipeline functions that give the same result when they're run
+                                              before or after the decorated function
+    """
+    return _register(
+        universe=False,
+        in_place=True,
+        edge_predicate_builder=predicate_builder,
+        commutes_with=frozenset(commutes_with or ()),
+    )
+
+
 SET_UNIVERSE = 'UNIVERSE'
 
 
@@ -146,7 +238,9 @@ def assert_is_mapped_to_pipeline(name):
 
 
 def splitter(f):
-    """A function decorator that signifies a function that takes in a graph and returns a dictionary of keys to graphs
+    """A function decorator that signifies a function that takes in a graph and returns a dictionary of keys to graphs,
+    or an iterator over pairs of keys and graphs. Splitters that return iterators can be run in a pipeline one stratum
+    at a time with :meth:`Pipeline.split`.
 
     :param types.FunctionType f: A function
     :rtype: types.FunctionType
@@ -167,6 +261,19 @@ def function_is_registered(name):
     return name in mapped
 
 
+def get_splitter(name):
+    """Gets a splitter by name or raises an error if it doesn't exist
+
+    :param str name: The name of the splitter
+    :rtype: types.FunctionType
+    :raises: MissingPipelineFunctionError
+    """
+    if name not in splitter_map:
+        raise MissingPipelineFunctionError('{} is not registered as a splitter'.format(name))
+
+    return splitter_map[name]
+
+
 def get_function(name):
     """Gets a pipeline function by name or raises an error if it doesnt exist
 
@@ -186,6 +293,508 @@ def _get_protocol_tuple(data):
     return data['function'], data.get('args', []), data.get('kwargs', {})
 
 
+@in_place_mutator
+def remove_fused_filters(graph, entries):
+    """Runs several deletions registered with :func:`node_deleter` or :func:`edge_deleter` with one pass over the
+    nodes and one pass over the edges
+
+    :param pybel.BELGraph graph: A BEL graph
+    :param list[dict] entries: The protocol entries of the deletions
+    """
+    node_predicates = []
+    edge_predicates = []
+
+    for entry in entries:
+        name, args, kwargs = _get_protocol_tuple(entry)
+        f = get_function(name)
+
+        if hasattr(f, 'node_predicate_builder'):
+            node_predicates.append(concatenate_node_predicates(f.node_predicate_builder(*args, **kwargs)))
+        else:
+            edge_predicates.append(and_edge_predicates(f.edge_predicate_builder(*args, **kwargs)))
+
+    if node_predicates:
+        nodes = [
+            node
+            for node in graph
+            if any(predicate(graph, node) for predicate in node_predicates)
+        ]
+        graph.remove_nodes_from(nodes)
+
+    if edge_predicates:
+        edges = [
+            (u, v, k)
+            for u, v, k in graph.edges_iter(keys=True)
+            if any(predicate(graph, u, v, k) for predicate in edge_predicates)
+        ]
+        graph.remove_edges_from(edges)
+
+
+def _is_deletion(entry):
+    """Checks if a protocol entry is a deletion that can be fused with others, or is already a fused one
+
+    :param dict entry: A protocol entry
+    :rtype: bool
+    """
+    if 'function' not in entry:
+        return False
+
+    f = mapped.get(entry['function'])
+
+    return (
+        f is remove_fused_filters or
+        hasattr(f, 'node_predicate_builder') or
+        hasattr(f, 'edge_predicate_builder')
+    )
+
+
+def _commutes(entry, other):
+    """Checks if a deletion gives the same result when it's run before or after another protocol entry
+
+    :param dict entry: A protocol entry of a deletion
+    :param dict other: Another protocol entry
+    :rtype: bool
+    """
+    if 'function' not in other:
+        return False
+
+    f = mapped.get(entry['function'])
+    g = mapped.get(other['function'])
+
+    return other['function'] in getattr(f, 'commutes_with', ()) or entry['function'] in getattr(g, 'commutes_with', ())
+
+
+def _iter_fused_entries(entry):
+    """Iterates over the deletions in a protocol entry of a deletion, which can already be fused
+
+    :param dict entry: A protocol entry of a deletion
+    :rtype: iter[dict]
+    """
+    if entry['function'] == remove_fused_filters.__name__:
+        yield from entry['args'][0]
+    else:
+        yield entry
+
+
+def _fuse(entry, other):
+    """Fuses two deletions into a single :func:`remove_fused_filters` entry
+
+    :param dict entry: A protocol entry of a deletion, which can already be fused
+    :param dict other: Another protocol entry of a deletion, which can already be fused
+    :rtype: dict
+    """
+    return {
+        'function': remove_fused_filters.__name__,
+        'args': [list(_iter_fused_entries(entry)) + list(_iter_fused_entries(other))],
+    }
+
+
+def optimize_protocol(protocol):
+    """Rewrites a protocol so it gives the same result with fewer passes over the graph
+
+    Each deletion registered with :func:`node_deleter` or :func:`edge_deleter` is moved ahead of the steps before it
+    that it commutes with, then deletions that end up next to each other are fused into a single
+    :func:`remove_fused_filters` entry. The subprotocols of meta entries are optimized separately.
+
+    :param list[dict] protocol: The protocol, as JSON
+    :rtype: list[dict]
+    """
+    result = []
+
+    for entry in protocol:
+        if 'meta' in entry:
+            result.append({
+                'meta': entry['meta'],
+                'pipelines': [
+                    optimize_protocol(subprotocol)
+                    for subprotocol in entry['pipelines']
+                ]
+            })
+            continue
+
+        if 'split' in entry:
+            result.append(dict(entry, pipeline=optimize_protocol(entry['pipeline'])))
+            continue
+
+        if not _is_deletion(entry):
+            result.append(entry)
+            continue
+
+        position = len(result)
+        while 0 < position and not _is_deletion(result[position - 1]) and _commutes(entry, result[position - 1]):
+            position -= 1
+
+        if 0 < position and _is_deletion(result[position - 1]):
+            result[position - 1] = _fuse(result[position - 1], entry)
+        else:
+            result.insert(position, entry)
+
+    return result
+
+
+def _describe_entry(entry):
+    """Describes a function entry like a call
+
+    :param dict entry: A protocol entry
+    :rtype: str
+    """
+    name, args, kwargs = _get_protocol_tuple(entry)
+
+    arguments = [repr(arg) for arg in args]
+    arguments.extend('{}={!r}'.format(key, value) for key, value in sorted(kwargs.items()))
+
+    return '{}({})'.format(name, ', '.join(arguments))
+
+
+def _iter_explanation(protocol, indent=''):
+    """Iterates over the lines describing a protocol for :meth:`Pipeline.explain`
+
+    :param list[dict] protocol: The protocol, as JSON
+    :param str indent: The prefix of each line
+    :rtype: iter[str]
+    """
+    for number, entry in enumerate(protocol, start=1):
+        if 'meta' in entry:
+            yield '{}{}. {} of:'.format(indent, number, entry['meta'])
+
+            for branch, subprotocol in enumerate(entry['pipelines'], start=1):
+                yield '{}    pipeline {}:'.format(indent, branch)
+                yield from _iter_explanation(subprotocol, indent=indent + '        ')
+
+        elif 'split' in entry:
+            yield '{}{}. {} of running on each stratum from {}:'.format(
+                indent, number, entry['reduce'], _describe_entry(entry['split']))
+            yield from _iter_explanation(entry['pipeline'], indent=indent + '    ')
+
+        elif entry['function'] == remove_fused_filters.__name__:
+            yield '{}{}. in a single pass:'.format(indent, number)
+
+            for fused_entry in entry['args'][0]:
+                yield '{}    - {}'.format(indent, _describe_entry(fused_entry))
+
+        else:
+            yield '{}{}. {}'.format(indent, number, _describe_entry(entry))
+
+
+def _get_entry_key(entry):
+    """Gets a canonical string for a protocol entry so identical steps can be recognized
+
+    Arguments that can't be serialized to JSON (like edge filter functions) fall back to their representation, so they
+    only match when they are the same object.
+
+    :param dict entry: A protocol entry
+    :rtype: str
+    """
+    return json.dumps(entry, sort_keys=True, default=repr)
+
+
+def _iter_prefix_cache_keys(cache, graph, universe, protocol, fingerprint=None):
+    """Makes the cache keys for running each prefix of a protocol on the given graph
+
+    The keys stop at the first entry whose arguments can't be serialized to JSON, since they can't be recognized across
+    runs.
+
+    :param pybel_tools.cache.GraphCache cache: A graph cache
+    :param pybel.BELGraph graph: The seed BEL graph
+    :param pybel.BELGraph universe: The universe graph
+    :param list[dict] protocol: The protocol, as JSON
+    :param Optional[str] fingerprint: A fingerprint of the graph and universe from the caller. If none, they're hashed
+                                      with :func:`pybel_tools.cache.hash_graph`.
+    :return: The key for running the first i + 1 entries for each i
+    :rtype: iter[str]
+    """
+    if fingerprint is not None:
+        fingerprints = (fingerprint,)
+    else:
+        graph_fingerprint = hash_graph(graph)
+        fingerprints = graph_fingerprint, graph_fingerprint if universe is graph else hash_graph(universe)
+
+    for i in range(len(protocol)):
+        try:
+            prefix = json.dumps(protocol[:i + 1], sort_keys=True)
+        except TypeError:
+            log.debug('can not cache beyond entry %d since its arguments are not JSON serializable', i)
+            return
+
+        yield cache.make_key(*fingerprints + (prefix,))
+
+
+def _protocol_uses_universe(protocol):
+    """Checks if any of the functions in the protocol, including the branches of meta entries and the pipelines of
+    split entries, take a universe
+
+    :param list[dict] protocol: A protocol, as JSON
+    :rtype: bool
+    """
+    for entry in protocol:
+        if 'meta' in entry:
+            if any(_protocol_uses_universe(subprotocol) for subprotocol in entry['pipelines']):
+                return True
+
+        elif 'split' in entry:
+            if entry['split']['function'] in universe_map or _protocol_uses_universe(entry['pipeline']):
+                return True
+
+        elif entry['function'] in universe_map:
+            return True
+
+    return False
+
+
+def _entry_mutates_input(entry):
+    """Checks if running a protocol entry might modify the graph it's given
+
+    :param dict entry: A protocol entry
+    :rtype: bool
+    """
+    # meta entries hand their input to their branches, which might contain in-place functions
+    if 'meta' in entry:
+        return True
+
+    # the strata share the nested data of the input graph's edges
+    if 'split' in entry:
+        return any(_entry_mutates_input(split_entry) for split_entry in entry['pipeline'])
+
+    return entry['function'] in in_place_map
+
+
+def _reduce_graphs(graphs, meta):
+    """Combines graphs one at a time, so only the running result and the next graph are held at once
+
+    :param iter[pybel.BELGraph] graphs: BEL graphs
+    :param str meta: Either union or intersection
+    :return: The union or node intersection of the graphs, or an empty graph if there are none
+    :rtype: pybel.BELGraph
+    """
+    result = None
+
+    for graph in graphs:
+        if result is None:
+            result = graph
+
+        elif meta == META_UNION:
+            left_full_join(result, graph)
+
+        else:
+            # the running result only ever holds nodes that are in all graphs so far, so restricting it to the nodes
+            # the next graph has in common gives the same result as pybel.struct.node_intersection
+            nodes = set(result).intersection(graph)
+            result = result.subgraph(nodes)
+            left_full_join(result, graph.subgraph(nodes))
+
+    if result is None:
+        return BELGraph()
+
+    return result
+
+
+class PlanNode(object):
+    """A node in the prefix tree of the subprotocols of a meta entry"""
+
+    def __init__(self, entry=None):
+        """
+        :param Optional[dict] entry: The protocol entry run at this node. None for the root.
+        """
+        self.entry = entry
+
+        #: The following steps, keyed by their canonical string from :func:`_get_entry_key`
+        self.children = OrderedDict()
+
+        #: The indexes of the subprotocols that end at this node
+        self.branches = []
+
+    def get_or_add_child(self, entry):
+        """Gets the child for the given entry, adding it if it doesn't exist yet
+
+        :param dict entry: A protocol entry
+        :rtype: PlanNode
+        """
+        key = _get_entry_key(entry)
+
+        child = self.children.get(key)
+        if child is None:
+            child = self.children[key] = PlanNode(entry)
+
+        return child
+
+    def iter_steps(self):
+        """Iterates over the nodes below this one, each shared prefix counted once
+
+        :rtype: iter[PlanNode]
+        """
+        for child in self.children.values():
+            yield child
+            yield from child.iter_steps()
+
+
+def build_plan(subprotocols):
+    """Builds a prefix tree from the subprotocols of a meta entry so steps shared by several of them are run once
+
+    :param list[list[dict]] subprotocols: The subprotocols of a meta entry
+    :return: The root of the prefix tree
+    :rtype: PlanNode
+    """
+    root = PlanNode()
+
+    for index, subprotocol in enumerate(subprotocols):
+        node = root
+
+        for entry in subprotocol:
+            node = node.get_or_add_child(entry)
+
+        node.branches.append(index)
+
+    return root
+
+
+def _iter_plan_branches(node):
+    """Iterates over the indexes of all subprotocols that end at or below the given node
+
+    :param PlanNode node: A node in the prefix tree
+    :rtype: iter[int]
+    """
+    yield from node.branches
+
+    for child in node.children.values():
+        yield from _iter_plan_branches(child)
+
+
+#: The universe held by each worker process for running meta entry branches
+_worker_universe = None
+
+
+def _initialize_branch_worker(universe):
+    """Stores the universe in a worker process so it doesn't get pickled with every branch
+
+    :param Optional[pybel.BELGraph] universe: The universe graph
+    """
+    global _worker_universe
+    _worker_universe = universe
+
+
+def _make_branch_pool(universe, processes):
+    """Makes a process pool whose workers each hold the universe
+
+    :param Optional[pybel.BELGraph] universe: The universe graph
+    :param Optional[int] processes: The number of worker processes. If 0, uses the number of CPUs.
+    :rtype: multiprocessing.pool.Pool
+    """
+    processes = processes or None
+
+    if multiprocessing.get_start_method() != 'fork':
+        return multiprocessing.Pool(processes, initializer=_initialize_branch_worker, initargs=(universe,))
+
+    # forked workers share the parent's memory, so the universe is handed over without being pickled at all
+    _initialize_branch_worker(universe)
+    try:
+        return multiprocessing.Pool(processes)
+    finally:
+        _initialize_branch_worker(None)
+
+
+def _run_branches_in_worker(task):
+    """Runs a group of subprotocols that share their first step in a worker process
+
+    :param tuple[bool,Optional[pybel.BELGraph],list[list[dict]]] task: Whether the branches start from the universe,
+     the graph they start from otherwise, and the subprotocols
+    :rtype: list[pybel.BELGraph]
+    """
+    use_universe, graph, subprotocols = task
+
+    if use_universe:
+        graph = _worker_universe
+
+        # the universe is re-used by later tasks in this worker, so it can't be modified
+        if any(_entry_mutates_input(entry) for subprotocol in subprotocols for entry in subprotocol):
+            graph = copy_on_write(graph)
+
+    pipeline = Pipeline(universe=_worker_universe)
+    return pipeline._run_branches(graph, subprotocols)
+
+
+def _run_stratum_in_worker(task):
+    """Runs the pipeline of a split entry on a stratum in a worker process
+
+    :param tuple[pybel.BELGraph,list[dict]] task: The stratum and the protocol, as JSON
+    :rtype: pybel.BELGraph
+    """
+    graph, protocol = task
+    return Pipeline(protocol=protocol).run(graph, universe=_worker_universe)
+
+
+def _run_map_task(task, universe, in_place=True):
+    """Loads a graph if it's given by path, runs a protocol on it, then writes, summarizes, or returns the result
+
+    :param tuple task: The key, the graph or path to a pickle, the protocol, the output path, and the summary
+                       function of a task from :meth:`Pipeline.map`
+    :param Optional[pybel.BELGraph] universe: The universe graph
+    :param bool in_place: Can a given graph be modified? Graphs loaded from paths always are.
+    :return: The key and either the result, the path it was written to, or its summary
+    :rtype: tuple
+    """
+    key, graph_or_path, protocol, output_path, summarize = task
+
+    if isinstance(graph_or_path, str):
+        graph, in_place = from_pickle(graph_or_path), True
+    else:
+        graph = graph_or_path
+
+    result = Pipeline(protocol=protocol).run(graph, universe=universe, in_place=in_place)
+
+    if output_path is not None:
+        to_pickle(result, output_path)
+        return key, output_path
+
+    if summarize is not None:
+        return key, summarize(result)
+
+    return key, result
+
+
+def _iter_map_tasks(graphs_or_paths, protocol, output_directory, summarize):
+    """Makes the tasks for :meth:`Pipeline.map`, giving each result its own output path
+
+    A result is named after the pickle it came from, or by the position of its graph otherwise. If the name is already
+    taken, like by a pickle with the same name in another directory, the position is added to it, or the first number
+    after the position that gives a name that isn't taken.
+
+    :param iter[pybel.BELGraph or str] graphs_or_paths: BEL graphs or paths to pickles of BEL graphs
+    :param list[dict] protocol: The protocol, as JSON
+    :param Optional[str] output_directory: The directory to write the results to
+    :param summarize: The summary function
+    :rtype: iter[tuple]
+    """
+    names = set()
+
+    for index, graph_or_path in enumerate(graphs_or_paths):
+        key = graph_or_path if isinstance(graph_or_path, str) else index
+        output_path = None
+
+        if output_directory is not None:
+            name = os.path.basename(key) if isinstance(key, str) else '{}.gpickle'.format(index)
+
+            stem, extension = os.path.splitext(name)
+            number = index
+
+            while name in names:
+                name = '{}_{}{}'.format(stem, number, extension)
+                number += 1
+
+            names.add(name)
+            output_path = os.path.join(output_directory, name)
+
+        yield key, graph_or_path, protocol, output_path, summarize
+
+
+def _run_map_task_in_worker(task):
+    """Runs a task from :meth:`Pipeline.map` in a worker process with the universe it holds
+
+    :param tuple task: A task
+    :rtype: tuple
+    """
+    return _run_map_task(task, _worker_universe)
+
+
 class Pipeline(object):
     """Builds and runs analytical pipelines on BEL graphs"""
 
@@ -197,6 +806,23 @@ class Pipeline(object):
         self.universe = universe
         self.protocol = []
 
+        #: The process pool for running the branches of meta entries and the strata of split entries, only set while
+        #: running
+        self._pool = None
+        self._processes = None
+
+        #: The profiler recording each step, only set while running
+        self._profiler = None
+
+        #: The event that cancels running before the next step, only set while running
+        self._cancel_event = None
+
+        #: The limits on the graph after each step and the time spent, only set while running
+        self._budget = None
+
+        #: When running started, only set while running with a budget
+        self._started = None
+
         if protocol is not None:
             self._extend_helper(protocol)
 
@@ -271,6 +897,87 @@ class Pipeline(object):
         self.protocol.append(av)
         return self
 
+    def _append_meta(self, meta, protocols):
+        """Adds a meta entry that combines the results of several protocols
+
+        :param str meta: Either union or intersection
+        :param list[list[dict]] protocols: The protocols whose results get combined
+        :raises: ValueError
+        :raises: MissingPipelineFunctionError
+        """
+        if meta not in META_TYPES:
+            raise ValueError('invalid meta-command: {}'.format(meta))
+
+        self.protocol.append({
+            'meta': meta,
+            'pipelines': [
+                Pipeline(protocol=protocol).protocol
+                for protocol in protocols
+            ]
+        })
+
+    def _append_split(self, split, protocol, reduce):
+        """Adds a split entry that runs a protocol on each stratum from a splitter and combines the results
+
+        :param dict split: The splitter, as a protocol entry
+        :param list[dict] protocol: The protocol to run on each stratum
+        :param str reduce: Either union or intersection
+        :raises: ValueError
+        :raises: MissingPipelineFunctionError
+        """
+        if reduce not in META_TYPES:
+            raise ValueError('invalid reduce: {}'.format(reduce))
+
+        name, args, kwargs = _get_protocol_tuple(split)
+        get_splitter(name)
+
+        split = {
+            'function': name,
+        }
+
+        if args:
+            split['args'] = args
+
+        if kwargs:
+            split['kwargs'] = kwargs
+
+        self.protocol.append({
+            'split': split,
+            'pipeline': Pipeline(protocol=protocol).protocol,
+            'reduce': reduce,
+        })
+
+    def split(self, name, pipeline, *args, reduce=META_UNION, **kwargs):
+        """Adds a step that splits the graph into strata with a splitter, runs another pipeline on each stratum, and
+        combines the results
+
+        If the splitter returns an iterator, like :func:`pybel_tools.grouping.iter_subgraphs_by_annotation`, only one
+        stratum is made at a time. When run with processes, the strata are run in the process pool.
+
+        >>> network = ...
+        >>> stratum_pipeline = Pipeline()
+        >>> stratum_pipeline.append('infer_central_dogma')
+        >>> example = Pipeline()
+        >>> example.split('iter_subgraphs_by_annotation', stratum_pipeline, 'Subgraph')
+        >>> result = example.run(network, processes=4)
+
+        :param name: The name of the splitter
+        :type name: str or (pybel.BELGraph -> dict or iter)
+        :param Pipeline pipeline: The pipeline to run on each stratum
+        :param args: The positional arguments to call the splitter with
+        :param str reduce: How to combine the results. Either union or intersection.
+        :param kwargs: The keyword arguments to call the splitter with
+        :return: This pipeline for fluid query building
+        :rtype: Pipeline
+        :raises: ValueError
+        :raises: MissingPipelineFunctionError
+        """
+        if isinstance(name, types.FunctionType):
+            name = name.__name__
+
+        self._append_split({'function': name, 'args': args, 'kwargs': kwargs}, pipeline.protocol, reduce)
+        return self
+
     def _extend_helper(self, protocol):
         """Extends this pipeline's protocol with another protocol
 
@@ -278,6 +985,14 @@ class Pipeline(object):
         """
         if protocol:
             for data in protocol:
+                if 'meta' in data:
+                    self._append_meta(data['meta'], data['pipelines'])
+                    continue
+
+                if 'split' in data:
+                    self._append_split(data['split'], data['pipeline'], data.get('reduce', META_UNION))
+                    continue
+
                 name, args, kwargs = _get_protocol_tuple(data)
                 self.append(name, *args, **kwargs)
 
@@ -294,6 +1009,210 @@ class Pipeline(object):
     def __nonzero__(self):
         return self.protocol
 
+    def uses_universe(self):
+        """Checks if any of the steps in this pipeline take a universe, like
+        :func:`pybel_tools.mutation.expand_periphery`
+
+        :rtype: bool
+        """
+        return _protocol_uses_universe(self.protocol)
+
+    def optimize(self):
+        """Makes a pipeline that gives the same result with fewer passes over the graph using
+        :func:`optimize_protocol`
+
+        :rtype: Pipeline
+        """
+        return Pipeline(protocol=optimize_protocol(self.protocol), universe=self.universe)
+
+    def explain(self, optimize=True):
+        """Describes the steps this pipeline runs, one per line
+
+        >>> pipeline = Pipeline()
+        >>> pipeline.append('infer_central_dogma')
+        >>> pipeline.append('remove_pathologies')
+        >>> pipeline.append('remove_associations')
+        >>> print(pipeline.explain())
+        1. in a single pass:
+            - remove_pathologies()
+            - remove_associations()
+        2. infer_central_dogma()
+
+        :param bool optimize: Should the steps from :meth:`Pipeline.optimize` be described instead of the original ones?
+        :rtype: str
+        """
+        protocol = optimize_protocol(self.protocol) if optimize else self.protocol
+        return '\n'.join(_iter_explanation(protocol))
+
+    def _run_entry(self, graph, entry):
+        """Runs a single protocol entry, recording its measurements if profiling
+
+        :param pybel.BELGraph graph: A BEL graph
+        :param dict entry: A protocol entry, as JSON
+        :rtype: pybel.BELGraph
+        :raises: PipelineCancelledError
+        :raises: pybel_tools.budget.BudgetExceededError
+        """
+        if self._cancel_event is not None and self._cancel_event.is_set():
+            raise PipelineCancelledError('pipeline was cancelled')
+
+        if self._budget is not None:
+            self._budget.check_time(self._started, 'running {}'.format(_get_entry_name(entry)))
+
+        if self._profiler is None:
+            result = self._run_entry_helper(graph, entry)
+
+        else:
+            step = self._profiler.begin_step(entry, graph)
+
+            try:
+                result = self._run_entry_helper(graph, entry)
+            except Exception:
+                self._profiler.end_step(step, None, failed=True)
+                raise
+
+            self._profiler.end_step(step, result)
+
+        if self._budget is not None:
+            self._budget.check_graph(result, 'the result of {}'.format(_get_entry_name(entry)))
+
+        return result
+
+    def _run_entry_helper(self, graph, entry):
+        """Runs a single protocol entry
+
+        :param pybel.BELGraph graph: A BEL graph
+        :param dict entry: A protocol entry, as JSON
+        :rtype: pybel.BELGraph
+        """
+        if 'split' in entry:
+            return self._run_split(graph, entry)
+
+        meta_entry = entry.get('meta')
+
+        if meta_entry is None:
+            name, args, kwargs = _get_protocol_tuple(entry)
+            func = self.get_function(name)
+            return func(graph, *args, **kwargs)
+
+        if meta_entry not in META_TYPES:
+            raise ValueError('invalid meta-command: {}'.format(meta_entry))
+
+        networks = self._run_branches(graph, entry['pipelines'])
+
+        if meta_entry == META_UNION:
+            return union(networks)
+
+        return node_intersection(networks)
+
+    def _run_split(self, graph, entry):
+        """Runs the pipeline of a split entry on each stratum, making and combining them one at a time
+
+        :param pybel.BELGraph graph: A BEL graph
+        :param dict entry: A split entry
+        :rtype: pybel.BELGraph
+        """
+        name, args, kwargs = _get_protocol_tuple(entry['split'])
+        strata = get_splitter(name)(graph, *args, **kwargs)
+
+        # splitters that return dictionaries have already made all strata
+        if isinstance(strata, dict):
+            strata = strata.items()
+
+        graphs = (stratum for _, stratum in strata)
+
+        if self._pool is None:
+            results = (self._run_helper(stratum, entry['pipeline']) for stratum in graphs)
+        else:
+            tasks = ((stratum, entry['pipeline']) for stratum in graphs)
+            results = iter_unordered_bounded(self._pool, _run_stratum_in_worker, tasks, self._processes)
+
+        return _reduce_graphs(results, entry['reduce'])
+
+    def _run_plan_node(self, graph, node, results):
+        """Runs the children of a node in the prefix tree on the graph, making copies only where branches diverge
+
+        :param pybel.BELGraph graph: The result of running the steps up to and including the given node
+        :param PlanNode node: A node in the prefix tree
+        :param dict[int,pybel.BELGraph] results: A dictionary to fill with the result of each subprotocol
+        """
+        for index in node.branches:
+            results[index] = graph
+
+        children = list(node.children.values())
+        mutating_children = [child for child in children if _entry_mutates_input(child.entry)]
+
+        # the graph can be handed over to the last mutating child as long as no subprotocol ends here, since the
+        # other children have all been run by then
+        last_mutating_child = mutating_children[-1] if mutating_children and not node.branches else None
+
+        for child in sorted(children, key=lambda child: child in mutating_children):
+            if child in mutating_children and child is not last_mutating_child:
+                child_graph = graph.copy()
+            else:
+                child_graph = graph
+
+            child_result = self._run_entry(child_graph, child.entry)
+            self._run_plan_node(child_result, child, results)
+
+    def _run_plan_node_in_pool(self, graph, node, subprotocols, results):
+        """Runs the prefix shared by all branches in this process, then each diverging subtree in the process pool
+
+        :param pybel.BELGraph graph: The result of running the steps up to and including the given node
+        :param PlanNode node: A node in the prefix tree
+        :param list[list[dict]] subprotocols: The subprotocols, as JSON
+        :param dict[int,pybel.BELGraph] results: A dictionary to fill with the result of each subprotocol
+        """
+        depth = 0
+
+        while 1 == len(node.children) and not node.branches:
+            node = next(iter(node.children.values()))
+            graph = self._run_entry(graph, node.entry)
+            depth += 1
+
+        if len(node.children) < 2:
+            self._run_plan_node(graph, node, results)
+            return
+
+        for index in node.branches:
+            results[index] = graph
+
+        use_universe = graph is self.universe
+
+        groups = []
+        tasks = []
+
+        for child in node.children.values():
+            indexes = list(_iter_plan_branches(child))
+            groups.append(indexes)
+            tasks.append((
+                use_universe,
+                None if use_universe else graph,
+                [subprotocols[index][depth:] for index in indexes],
+            ))
+
+        for indexes, group_results in zip(groups, self._pool.map(_run_branches_in_worker, tasks)):
+            results.update(zip(indexes, group_results))
+
+    def _run_branches(self, graph, subprotocols):
+        """Runs the subprotocols of a meta entry, running the steps shared between their prefixes only once
+
+        :param pybel.BELGraph graph: A BEL graph
+        :param list[list[dict]] subprotocols: The subprotocols, as JSON
+        :return: The results of the subprotocols, in order
+        :rtype: list[pybel.BELGraph]
+        """
+        plan = build_plan(subprotocols)
+
+        results = {}
+
+        if self._pool is None:
+            self._run_plan_node(graph, plan, results)
+        else:
+            self._run_plan_node_in_pool(graph, plan, subprotocols, results)
+
+        return [results[index] for index in range(len(subprotocols))]
+
     def _run_helper(self, graph, protocol):
         """Helps run the protocol
 
@@ -304,52 +1223,192 @@ class Pipeline(object):
         result = graph
 
         for entry in protocol:
-            meta_entry = entry.get('meta')
+            result = self._run_entry(result, entry)
 
-            if meta_entry is None:
-                name, args, kwargs = _get_protocol_tuple(entry)
-                func = self.get_function(name)
-                result = func(result, *args, **kwargs)
-            else:
-                networks = (
-                    self._run_helper(graph, subprotocol)
-                    for subprotocol in entry['pipeline']
-                )
+        return result
+
+    def _run_cached(self, graph, in_place, cache, fingerprint=None):
+        """Runs the protocol, starting from the result of the longest prefix that's in the cache and storing the
+        results of the following prefixes
 
-                if meta_entry == META_UNION:
-                    result = union(networks)
+        :param pybel.BELGraph graph: The seed BEL graph
+        :param bool in_place: Should the graph be copied before applying the algorithm?
+        :param pybel_tools.cache.GraphCache cache: A graph cache
+        :param Optional[str] fingerprint: A fingerprint of the graph and universe to key the cache with instead of
+                                          hashing them
+        :rtype: pybel.BELGraph
+        """
+        keys = list(_iter_prefix_cache_keys(cache, graph, self.universe, self.protocol, fingerprint=fingerprint))
+
+        start = 0
+        result = None
 
-                elif meta_entry == META_INTERSECTION:
-                    result = node_intersection(networks)
+        for i in reversed(range(len(keys))):
+            result = cache.get(keys[i])
 
-                else:
-                    raise ValueError('invalid meta-command: {}'.format(meta_entry))
+            if result is not None:
+                log.debug('resuming from cached result of the first %d entries', i + 1)
+                start = i + 1
+                break
+
+        if result is None:
+            result = graph if in_place else copy_on_write(graph)
+
+        for i in range(start, len(self.protocol)):
+            result = self._run_entry(result, self.protocol[i])
+
+            if i < len(keys) and result is not None:
+                cache.set(keys[i], result)
 
         return result
 
-    def run(self, graph, universe=None, in_place=True):
+    def run(self, graph, universe=None, in_place=True, processes=None, cache=None, profiler=None, cancel_event=None,
+            budget=None, started=None, fingerprint=None):
         """Runs the contained protocol on a seed graph
 
         :param pybel.BELGraph graph: The seed BEL graph
         :param pybel.BELGraph universe: Allows just-in-time setting of the universe in case it wasn't set before.
                                         Defaults to the given network.
-        :param bool in_place: Should the graph be copied before applying the algorithm?
+        :param bool in_place: Should the graph be copied before applying the algorithm? The copy is copy-on-write,
+                              so steps that only remove nodes and edges don't copy what they remove.
+        :param Optional[int] processes: If given, runs the diverging branches of union and intersection entries and
+                                        the strata of split entries concurrently in this many worker processes. Use
+                                        0 for the number of CPUs.
+        :param Optional[pybel_tools.cache.GraphCache] cache: If given, stores the result of each prefix of the
+                                        protocol, keyed by the fingerprints of the graph and universe, and resumes
+                                        from the longest prefix that's already stored. A cached result is loaded
+                                        instead of modifying the given graph, so use the return value.
+        :param Optional[pybel_tools.profiling.PipelineProfiler] profiler: If given, records the wall time, CPU time,
+                                        peak memory, and graph size before and after each step.
+        :param cancel_event: If given, an event like :class:`threading.Event` or :class:`multiprocessing.Event` that
+                                        is checked before each step run in this process. Once it's set, running stops
+                                        with a :class:`PipelineCancelledError`.
+        :param Optional[pybel_tools.budget.Budget] budget: If given, checks the time spent before each step run in
+                                        this process and the size of the graph after it
+        :param Optional[float] started: When running started for the time budget, from :func:`time.time`. Defaults to
+                                        now.
+        :param Optional[str] fingerprint: If given with a cache, keys the cache with this instead of hashing the
+                                        contents of the graph and universe with :func:`pybel_tools.cache.hash_graph`,
+                                        which serializes all of them on every run. It must change whenever the
+                                        contents do, like the sorted identifiers of the database networks the graph
+                                        was built from and how it was seeded.
         :return: The new graph is returned if not applied in-place
         :rtype: pybel.BELGraph
+        :raises: PipelineCancelledError
+        :raises: pybel_tools.budget.BudgetExceededError
         """
         self.universe = graph if universe is None else universe
+        self._cancel_event = cancel_event
 
-        result = graph if in_place else graph.copy()
-        result = self._run_helper(result, self.protocol)
-        return result
+        if budget is not None:
+            self._budget = budget
+            self._started = time.time() if started is None else started
+
+        if processes is not None and any('meta' in entry or 'split' in entry for entry in self.protocol):
+            self._pool = _make_branch_pool(self.universe, processes)
+            self._processes = processes or os.cpu_count()
+
+        if profiler is not None:
+            self._profiler = profiler
+            self._profiler.start()
+
+        try:
+            if cache is not None:
+                result = self._run_cached(graph, in_place, cache, fingerprint=fingerprint)
+            else:
+                result = graph if in_place else copy_on_write(graph)
+                result = self._run_helper(result, self.protocol)
+
+            # the copy shares its contents with the seed graph until it's modified, so it's materialized before it's
+            # given back and the seed graph can be modified again
+            if isinstance(result, CopyOnWriteGraph):
+                result = result.to_bel_graph()
+
+            return result
+
+        finally:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool = None
+                self._processes = None
+
+            if self._profiler is not None:
+                self._profiler.stop()
+                self._profiler = None
+
+            self._cancel_event = None
+            self._budget = None
+            self._started = None
+
+    def map(self, graphs_or_paths, n_jobs=None, output_directory=None, summarize=None, universe=None):
+        """Runs this pipeline on many graphs in worker processes, giving back each result as soon as it's done
+
+        Each graph is run on a copy, so the given graphs aren't modified, and the next one is only sent once a result
+        has come back, so at most one graph per worker is held in memory at once. Giving paths instead of graphs lets
+        the workers load them.
+
+        >>> from pybel_tools.io import iter_pickle_paths_from_directory
+        >>> pipeline = Pipeline()
+        >>> pipeline.append('infer_central_dogma')
+        >>> paths = iter_pickle_paths_from_directory('networks')
+        >>> for path, output_path in pipeline.map(paths, n_jobs=4, output_directory='results'):
+        ...     print(path, 'was written to', output_path)
+
+        :param graphs_or_paths: BEL graphs or paths to pickles of BEL graphs
+        :type graphs_or_paths: iter[pybel.BELGraph or str]
+        :param Optional[int] n_jobs: The number of worker processes. Defaults to the number of CPUs. If 1, runs each
+                                     graph in this process instead.
+        :param Optional[str] output_directory: If given, each result is pickled in this directory by the worker
+                                               instead of being sent back. A result is named after the pickle it came
+                                               from, or by the position of its graph otherwise. If two pickles have the
+                                               same name, the position of the later one is added to its result's name.
+        :param summarize: If given, a function that can be pickled, like one defined at the top level of a module,
+                          that each result is given to by the worker. Only its return value is sent back.
+        :type summarize: Optional[(pybel.BELGraph) -> Any]
+        :param Optional[pybel.BELGraph] universe: The universe for all graphs. Defaults to this pipeline's universe,
+                                                  and each graph is its own universe if neither is set.
+        :return: An iterator over pairs of the path, or the position of the graph if it wasn't given by path, and the
+                 result, the path it was written to, or its summary, in the order they finish
+        :rtype: iter[tuple[str or int,Any]]
+        """
+        universe = self.universe if universe is None else universe
+
+        if output_directory is not None:
+            os.makedirs(output_directory, exist_ok=True)
+
+        tasks = _iter_map_tasks(graphs_or_paths, self.protocol, output_directory, summarize)
+
+        # graphs sent to workers are already copies, so only the ones run in this process are copied
+        if n_jobs == 1:
+            for task in tasks:
+                yield _run_map_task(task, universe, in_place=False)
+            return
+
+        n_jobs = n_jobs or os.cpu_count()
+        pool = _make_branch_pool(universe, n_jobs)
+
+        try:
+            yield from iter_unordered_bounded(pool, _run_map_task_in_worker, tasks, n_jobs)
+        finally:
+            pool.terminate()
 
-    def __call__(self, graph, universe=None, in_place=True):
+    def __call__(self, graph, universe=None, in_place=True, processes=None, cache=None, profiler=None,
+                 cancel_event=None, budget=None, fingerprint=None):
         """Calls :meth:`Pipeline.run`
 
         :param pybel.BELGraph graph: The seed BEL graph
         :param pybel.BELGraph universe: Allows just-in-time setting of the universe in case it wasn't set before.
                                         Defaults to the given network.
         :param bool in_place: Should the graph be copied before applying the algorithm?
+        :param Optional[int] processes: If given, runs the diverging branches of union and intersection entries and
+                                        the strata of split entries concurrently in this many worker processes. Use
+                                        0 for the number of CPUs.
+        :param Optional[pybel_tools.cache.GraphCache] cache: If given, stores and re-uses the results of each prefix
+                                        of the protocol.
+        :param Optional[pybel_tools.profiling.PipelineProfiler] profiler: If given, records measurements of each step.
+        :param cancel_event: If given, an event that stops running before the next step once it's set
+        :param Optional[pybel_tools.budget.Budget] budget: If given, limits the graph after each step and the time spent
+        :param Optional[str] fingerprint: If given with a cache, keys the cache with this instead of hashing the graph
         :return: The new graph is returned if not applied in-place
         :rtype: pybel.BELGraph
 
@@ -362,7 +1421,8 @@ class Pipeline(object):
         >>> graph = BELGraph() ...
         >>> new_graph = pipe(graph)
         """
-        return self.run(graph=graph, universe=universe, in_place=in_place)
+        return self.run(graph=graph, universe=universe, in_place=in_place, processes=processes, cache=cache,
+                        profiler=profiler, cancel_event=cancel_event, budget=budget, fingerprint=fingerprint)
 
     def wrap_universe(self, f):
         """Takes a function that needs a universe graph as the first argument and returns a wrapped one"""
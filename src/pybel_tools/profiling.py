@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+
+"""This module records how long each step of a :class:`pybel_tools.pipeline.Pipeline` takes, how much memory it
+allocates, and how it changes the size of the graph.
+
+>>> from pybel_tools.pipeline import Pipeline
+>>> from pybel_tools.profiling import PipelineProfiler
+>>> network = ...
+>>> pipeline = Pipeline()
+>>> pipeline.append('infer_central_dogma')
+>>> pipeline.append('expand_periphery')
+>>> profiler = PipelineProfiler()
+>>> result = pipeline.run(network, profiler=profiler)
+>>> with open('trace.json', 'w') as file:
+...     profiler.dump_chrome_trace(file)
+
+The trace file can be opened in ``chrome://tracing``. Steps inside the branches of union and intersection entries are
+nested under them. Branches that are run in worker processes aren't recorded.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+
+__all__ = [
+    'StepProfile',
+    'PipelineProfiler',
+]
+
+
+def _get_size(graph):
+    """Gets the number of nodes and edges in a graph, if there is one
+
+    :param Optional[pybel.BELGraph] graph: A BEL graph
+    :rtype: tuple[Optional[int],Optional[int]]
+    """
+    if graph is None:
+        return None, None
+
+    return graph.number_of_nodes(), graph.number_of_edges()
+
+
+def _reset_peak():
+    """Resets the peak of the traced memory to the current traced memory
+
+    Before Python 3.9, the peak can only be reset by clearing the traces, which also sets the traced memory back to
+    zero and stops the blocks allocated before from being counted when they're freed.
+
+    :return: How much the traced memory went down by
+    :rtype: int
+    """
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+        return 0
+
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.clear_traces()
+    return current
+
+
+def _get_entry_name(entry):
+    """Gets the function name of a protocol entry, the type of a meta entry, or the splitter of a split entry
+
+    :param dict entry: A protocol entry
+    :rtype: str
+    """
+    if 'split' in entry:
+        return 'split:{}'.format(entry['split']['function'])
+
+    return entry.get('function') or entry['meta']
+
+
+class StepProfile(object):
+    """The measurements for running a single protocol entry"""
+
+    def __init__(self, index, parent, entry, start, nodes_before, edges_before):
+        """
+        :param int index: The position of this step in the order steps were started
+        :param Optional[int] parent: The index of the meta entry this step was run in
+        :param dict entry: The protocol entry
+        :param float start: The wall time the step started, in seconds since the profiler started
+        :param Optional[int] nodes_before: The number of nodes in the graph given to the step
+        :param Optional[int] edges_before: The number of edges in the graph given to the step
+        """
+        self.index = index
+        self.parent = parent
+        self.entry = entry
+        self.name = _get_entry_name(entry)
+        self.start = start
+        self.nodes_before = nodes_before
+        self.edges_before = edges_before
+
+        self.wall_time = None
+        self.cpu_time = None
+        self.memory_peak = None
+        self.nodes_after = None
+        self.edges_after = None
+        self.failed = False
+
+    def to_json(self):
+        """Gives this step's measurements as a JSON dictionary
+
+        :rtype: dict
+        """
+        return {
+            'index': self.index,
+            'parent': self.parent,
+            'name': self.name,
+            'entry': json.loads(json.dumps(self.entry, default=repr)),
+            'start': self.start,
+            'wall_time': self.wall_time,
+            'cpu_time': self.cpu_time,
+            'memory_peak': self.memory_peak,
+            'nodes_before': self.nodes_before,
+            'edges_before': self.edges_before,
+            'nodes_after': self.nodes_after,
+            'edges_after': self.edges_after,
+            'failed': self.failed,
+        }
+
+    def to_trace_event(self, pid):
+        """Gives this step as a complete event in the Chrome trace event format
+
+        :param int pid: The process identifier to show
+        :rtype: dict
+        """
+        return {
+            'name': self.name,
+            'cat': 'pipeline',
+            'ph': 'X',
+            'ts': self.start * 1e6,
+            'dur': self.wall_time * 1e6,
+            'pid': pid,
+            'tid': 0,
+            'args': {
+                key: value
+                for key, value in self.to_json().items()
+                if key not in {'name', 'start', 'wall_time'}
+            },
+        }
+
+
+class PipelineProfiler(object):
+    """Records the measurements of each step while running a pipeline with :meth:`Pipeline.run`"""
+
+    def __init__(self, trace_memory=True):
+        """
+        :param bool trace_memory: Should the peak memory allocated by each step be measured with :mod:`tracemalloc`?
+                                  This slows down the steps, and before Python 3.9, clears the traces at the start of each
+                                  step.
+        """
+        self.trace_memory = trace_memory
+
+        #: The steps, in the order they were started
+        self.steps = []
+
+        self._stack = []
+        self._started_tracing = False
+        self._origin = None
+
+    def start(self):
+        """Starts the clock, and tracing memory allocations if it's enabled"""
+        self._origin = time.perf_counter()
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self):
+        """Stops tracing memory allocations, if this profiler started it"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def begin_step(self, entry, graph):
+        """Records the start of a step
+
+        :param dict entry: The protocol entry
+        :param Optional[pybel.BELGraph] graph: The graph given to the step
+        :rtype: StepProfile
+        """
+        nodes_before, edges_before = _get_size(graph)
+
+        step = StepProfile(
+            index=len(self.steps),
+            parent=self._stack[-1][0].index if self._stack else None,
+            entry=entry,
+            start=time.perf_counter() - self._origin,
+            nodes_before=nodes_before,
+            edges_before=edges_before,
+        )
+        self.steps.append(step)
+
+        memory_start = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            shift = _reset_peak()
+
+            # resetting the peak for this step loses the enclosing steps' peaks so far, so they're kept in their frames,
+            # and their memory at the start is moved by as much as the traced memory was
+            for frame in self._stack:
+                frame[4] = max(frame[4], peak - frame[3])
+                frame[3] -= shift
+
+            memory_start = current - shift
+
+        # the frame keeps the clocks, the memory at the start, and the highest peak above it seen before nested steps
+        self._stack.append([step, time.perf_counter(), time.process_time(), memory_start, 0])
+
+        return step
+
+    def end_step(self, step, result, failed=False):
+        """Records the end of a step
+
+        :param StepProfile step: The step from :meth:`begin_step`
+        :param Optional[pybel.BELGraph] result: The graph returned by the step
+        :param bool failed: Did the step raise an exception?
+        """
+        frame = self._stack.pop()
+        assert frame[0] is step
+
+        _, wall_start, cpu_start, memory_start, nested_peak = frame
+
+        step.wall_time = time.perf_counter() - wall_start
+        step.cpu_time = time.process_time() - cpu_start
+        step.nodes_after, step.edges_after = _get_size(result)
+        step.failed = failed
+
+        if memory_start is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            step.memory_peak = max(0, peak - memory_start, nested_peak)
+
+            if self._stack:
+                self._stack[-1][4] = max(self._stack[-1][4], peak - self._stack[-1][3])
+
+    def to_json(self):
+        """Gives the measurements of all steps as a list of JSON dictionaries
+
+        :rtype: list[dict]
+        """
+        return [step.to_json() for step in self.steps]
+
+    def dump_json(self, file):
+        """Dumps the measurements of all steps to a file in JSON
+
+        :param file: A file or file-like to pass to :func:`json.dump`
+        """
+        json.dump(self.to_json(), file, indent=2)
+
+    def to_chrome_trace(self):
+        """Gives the steps in the Chrome trace event format, for viewing in ``chrome://tracing``
+
+        :rtype: dict
+        """
+        pid = os.getpid()
+
+        return {
+            'traceEvents': [
+                step.to_trace_event(pid)
+                for step in self.steps
+                if step.wall_time is not None
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def dump_chrome_trace(self, file):
+        """Dumps the steps to a file in the Chrome trace event format
+
+        :param file: A file or file-like to pass to :func:`json.dump`
+        """
+        json.dump(self.to_chrome_trace(), file)
@@ -2,6 +2,7 @@
 
 import json
 import logging
+import time
 from collections import Iterable
 
 import numpy as np
@@ -10,8 +11,10 @@ from pybel.dsl.nodes import BaseEntity
 from pybel.manager.models import Node
 from pybel.struct import union
 from pybel.utils import list2tuple
-from .pipeline import Pipeline
+from .estimation import estimate_query
+from .pipeline import Pipeline, PipelineCancelledError
 from .selection import get_subgraph
+from .selection.database import PUSHDOWN_SEED_TYPES, get_subgraph_from_database, has_edge_store
 from .selection.induce_subgraph import (
     NONNODE_SEED_TYPES, SEED_TYPE_ANNOTATION, SEED_TYPE_INDUCTION, SEED_TYPE_NEIGHBORS, SEED_TYPE_SAMPLE,
 )
@@ -49,6 +52,40 @@ def _handle_nodes(nodes):
     return [_handle_node(node) for node in nodes]
 
 
+def _check_cancelled(cancel_event):
+    """Stops running a query if the given event is set
+
+    :param cancel_event: An event, or None
+    :raises: PipelineCancelledError
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise PipelineCancelledError('query was cancelled')
+
+
+def _check_time(budget, started, seed):
+    """Stops running a query before a seed if it's run out of time
+
+    :param Optional[pybel_tools.budget.Budget] budget: A budget, or None
+    :param float started: When running started, from :func:`time.time`
+    :param dict seed: A seed, as JSON
+    :raises: pybel_tools.budget.BudgetExceededError
+    """
+    if budget is not None:
+        budget.check_time(started, 'seeding by {}'.format(seed[SEED_METHOD]))
+
+
+def _check_graph(budget, graph, description):
+    """Stops running a query if a graph is too big
+
+    :param Optional[pybel_tools.budget.Budget] budget: A budget, or None
+    :param pybel.BELGraph graph: A BEL graph
+    :param str description: What the graph is, for the error message
+    :raises: pybel_tools.budget.BudgetExceededError
+    """
+    if budget is not None:
+        budget.check_graph(graph, description)
+
+
 class Query:
     """Wraps a query over the network store"""
 
@@ -141,21 +178,93 @@ class Query:
         """
         return self.pipeline.append(name, *args, **kwargs)
 
-    def __call__(self, manager, in_place=True):
+    def __call__(self, manager, in_place=True, universe_cache=None, pushdown=False, cancel_event=None, budget=None):
         """Runs this query and returns the resulting BEL graph with :meth:`Query.run`
 
         :param pybel.manager.Manager manager: A cache manager
         :param bool in_place: Should the graph be copied before applying the algorithm?
+        :param Optional[pybel_tools.cache.UniverseCache] universe_cache: A cache of universes to re-use
+        :param bool pushdown: Should the seeding be run against the edge store when possible?
+        :param cancel_event: If given, an event that stops running before the next step once it's set
+        :param Optional[pybel_tools.budget.Budget] budget: If given, limits the graph after each step and the time spent
+        :rtype: Optional[pybel.BELGraph]
+        """
+        return self.run(manager, in_place=in_place, universe_cache=universe_cache, pushdown=pushdown,
+                        cancel_event=cancel_event, budget=budget)
+
+    def can_push_down(self, manager):
+        """Checks if the seeding of this query can be run against the manager's edge store instead of loading the
+        whole networks
+
+        This needs all seeds to be one of :data:`pybel_tools.selection.database.PUSHDOWN_SEED_TYPES` and none of the
+        steps in the pipeline to need the universe.
+
+        :param pybel.manager.Manager manager: A cache manager
+        :rtype: bool
+        """
+        return (
+            has_edge_store(manager) and
+            bool(self.seeding) and
+            all(seed[SEED_METHOD] in PUSHDOWN_SEED_TYPES for seed in self.seeding) and
+            not self.pipeline.uses_universe()
+        )
+
+    def _run_pushdown(self, manager, in_place=True, cancel_event=None, budget=None, started=None):
+        """Runs this query by seeding from the manager's edge store
+
+        :param pybel.manager.Manager manager: A cache manager
+        :param bool in_place: Should the graph be copied before applying the algorithm?
+        :param cancel_event: If given, an event that stops running before the next step once it's set
+        :param Optional[pybel_tools.budget.Budget] budget: If given, limits the graph after each step and the time spent
+        :param Optional[float] started: When running started, from :func:`time.time`
         :rtype: Optional[pybel.BELGraph]
         """
-        return self.run(manager, in_place=in_place)
+        subgraphs = []
 
-    def run(self, manager, in_place=True):
+        for seed in self.seeding:
+            _check_cancelled(cancel_event)
+            _check_time(budget, started, seed)
+            seed_method, seed_data = seed[SEED_METHOD], seed[SEED_DATA]
+
+            log.debug('seeding from the edge store with %s: %s', seed_method, seed_data)
+            subgraph = get_subgraph_from_database(manager, self.network_ids, seed_method, seed_data)
+
+            if subgraph is None:
+                log.debug('seed returned empty graph: %s', seed)
+                continue
+
+            subgraphs.append(subgraph)
+
+        if not subgraphs:
+            log.debug('no subgraphs returned')
+            return
+
+        graph = union(subgraphs)
+        _check_graph(budget, graph, 'the seeded graph')
+
+        return self.pipeline.run(graph, in_place=in_place, cancel_event=cancel_event, budget=budget, started=started)
+
+    def run(self, manager, in_place=True, universe_cache=None, pushdown=False, cancel_event=None, budget=None):
         """Runs this query and returns the resulting BEL graph
 
         :param pybel.manager.Manager manager: A cache manager
         :param bool in_place: Should the graph be copied before applying the algorithm?
+        :param Optional[pybel_tools.cache.UniverseCache] universe_cache: If given, gets the universe from this cache
+                                        instead of building it from the database every time. A cached universe is
+                                        never modified, even if in place, since the pipeline is then run on a
+                                        copy-on-write copy of the universe or of the graph seeded from it.
+        :param bool pushdown: If true and :meth:`can_push_down` allows it, seeds from the edge store and only loads
+                                        the matching edges instead of the whole networks. Otherwise, seeds in memory.
+        :param cancel_event: If given, an event like :class:`threading.Event` that is checked before seeding and
+                                        between the steps of the pipeline. Once it's set, running stops with a
+                                        :class:`pybel_tools.pipeline.PipelineCancelledError`.
+        :param Optional[pybel_tools.budget.Budget] budget: If given, checks the time spent before seeding and before
+                                        each step of the pipeline, and the size of the graph after seeding and after
+                                        each step. Running stops with a :class:`pybel_tools.budget.BudgetExceededError`
+                                        once either is too big. Use :meth:`explain` to check before running.
         :rtype: Optional[pybel.BELGraph]
+        :raises: pybel_tools.pipeline.PipelineCancelledError
+        :raises: pybel_tools.budget.BudgetExceededError
         """
         log.debug('query universe consists of networks: %s', self.network_ids)
 
@@ -163,7 +272,20 @@ class Query:
             log.debug('can not run query without network identifiers')
             return
 
-        universe = manager.get_graph_by_ids(self.network_ids)
+        started = time.time()
+
+        if pushdown and self.can_push_down(manager):
+            return self._run_pushdown(manager, in_place=in_place, cancel_event=cancel_event, budget=budget,
+                                      started=started)
+
+        if universe_cache is None:
+            universe = manager.get_graph_by_ids(self.network_ids)
+        else:
+            universe = universe_cache.get(manager, self.network_ids)
+
+        # the cached universe is shared with later queries. The seeded graph shares its node and edge data with the
+        # universe too, so either way the pipeline is run on a copy-on-write copy that copies the data it changes.
+        in_place = in_place and universe_cache is None
 
         log.debug(
             'query universe has %d nodes/%d edges',
@@ -174,13 +296,19 @@ class Query:
         # parse seeding stuff
 
         if not self.seeding:
-            return self.pipeline.run(universe, universe=universe, in_place=in_place)
+            _check_graph(budget, universe, 'the universe')
+
+            return self.pipeline.run(universe, universe=universe, in_place=in_place, cancel_event=cancel_event,
+                                     budget=budget, started=started)
 
         subgraphs = []
 
         for seed in self.seeding:
             seed_method, seed_data = seed[SEED_METHOD], seed[SEED_DATA]
 
+            _check_cancelled(cancel_event)
+            _check_time(budget, started, seed)
+
             log.debug('seeding with %s: %s', seed_method, seed_data)
             subgraph = get_subgraph(universe, seed_method=seed_method, seed_data=seed_data)
 
@@ -195,8 +323,40 @@ class Query:
             return
 
         graph = union(subgraphs)
+        _check_graph(budget, graph, 'the seeded graph')
+
+        return self.pipeline.run(graph, universe=universe, in_place=in_place, cancel_event=cancel_event, budget=budget,
+                                 started=started)
+
+    def explain(self, manager, budget=None, universe_cache=None):
+        """Estimates the size of the graph after seeding and after each step of the pipeline without running this query
+
+        >>> estimate = query.explain(manager)
+        >>> print(estimate)
+        universe: 51204 nodes / 189023 edges
+        1. seed by dneighbors: ~14822 nodes / ~14790 edges
+        2. expand_all_node_neighborhoods(): ~51204 nodes / ~189023 edges
+
+        :param pybel.manager.Manager manager: A cache manager. If it has an edge store, the universe is counted
+                                              there without being loaded.
+        :param Optional[pybel_tools.budget.Budget] budget: If given, checks the estimates fit in its sizes
+        :param Optional[pybel_tools.cache.UniverseCache] universe_cache: A cache to get the universe from if it has to
+                                                                         be loaded
+        :rtype: pybel_tools.estimation.QueryEstimate
+        :raises: pybel_tools.budget.BudgetExceededError
+        """
+        estimate = estimate_query(
+            manager,
+            self.network_ids,
+            [(seed[SEED_METHOD], seed[SEED_DATA]) for seed in self.seeding],
+            self.pipeline.protocol,
+            universe_cache=universe_cache,
+        )
+
+        if budget is not None:
+            estimate.check(budget)
 
-        return self.pipeline.run(graph, universe=universe, in_place=in_place)
+        return estimate
 
     def seeding_to_jsons(self):
         """Returns seeding JSON as a string
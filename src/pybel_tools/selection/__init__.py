@@ -2,6 +2,7 @@
 
 """This module contains functions to help select data from networks"""
 
+from . import database
 from . import group_nodes
 from . import induce_subgraph
 from . import leaves
@@ -9,6 +10,7 @@ from . import metapaths
 from . import paths
 from . import search
 from . import utils
+from .database import *
 from .group_nodes import *
 from .induce_subgraph import *
 from .leaves import *
@@ -18,6 +20,7 @@ from .search import *
 from .utils import *
 
 __all__ = (
+    database.__all__ +
     group_nodes.__all__ +
     induce_subgraph.__all__ +
     leaves.__all__ +
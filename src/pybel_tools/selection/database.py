@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+"""This module seeds subgraphs with queries against the edge store of a PyBEL manager, so only the matching edges and
+their nodes are loaded instead of whole networks.
+
+The seed types in :data:`PUSHDOWN_SEED_TYPES` are supported. The edge data comes from the edge store, so it only has
+the relation, annotations, citation, evidence, and subject and object modifiers.
+"""
+
+import logging
+
+from sqlalchemy import and_, func, or_, select
+
+from pybel import BELGraph
+from pybel.constants import CITATION_TYPE_PUBMED, RELATION, unqualified_edge_code
+from pybel.manager.models import (
+    Annotation, AnnotationEntry, Author, Citation, Edge, Evidence, Node, author_citation, edge_annotation, network_edge,
+    network_node,
+)
+from pybel.utils import hash_node
+from .induce_subgraph import (
+    SEED_TYPE_ANNOTATION, SEED_TYPE_AUTHOR, SEED_TYPE_INDUCTION, SEED_TYPE_NEIGHBORS, SEED_TYPE_PUBMED,
+)
+from ..utils import safe_add_edge
+
+log = logging.getLogger(__name__)
+
+__all__ = [
+    'PUSHDOWN_SEED_TYPES',
+    'EDGE_SEED_TYPES',
+    'has_edge_store',
+    'get_subgraph_from_database',
+    'count_universe_in_database',
+    'get_node_degrees_in_database',
+    'count_seed_edges_in_database',
+]
+
+#: The seed types that can be run against the edge store
+PUSHDOWN_SEED_TYPES = {
+    SEED_TYPE_INDUCTION,
+    SEED_TYPE_NEIGHBORS,
+    SEED_TYPE_PUBMED,
+    SEED_TYPE_AUTHOR,
+    SEED_TYPE_ANNOTATION,
+}
+
+#: The seed types that select edges instead of nodes, so their size can be counted in the edge store
+EDGE_SEED_TYPES = {
+    SEED_TYPE_PUBMED,
+    SEED_TYPE_AUTHOR,
+    SEED_TYPE_ANNOTATION,
+}
+
+
+def has_edge_store(manager):
+    """Checks if the networks of a manager are in its database's edge store, so they can be queried there
+
+    Managers that keep their graphs somewhere else can say so with a ``has_edge_store`` attribute.
+
+    :param pybel.manager.Manager manager: A cache manager
+    :rtype: bool
+    """
+    return hasattr(manager, 'session') and getattr(manager, 'has_edge_store', True)
+
+
+def _query_network_edges(manager, network_ids):
+    """Builds a query for the edges in any of the given networks
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param list[int] network_ids: Database network identifiers
+    :rtype: sqlalchemy.orm.query.Query
+    """
+    return manager.session.query(Edge) \
+        .join(network_edge, network_edge.c.edge_id == Edge.id) \
+        .filter(network_edge.c.network_id.in_(network_ids)) \
+        .distinct()
+
+
+def _get_network_nodes(manager, network_ids, nodes):
+    """Gets the database models of the given nodes that are in any of the given networks
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param list[int] network_ids: Database network identifiers
+    :param iter[tuple] nodes: BEL nodes
+    :rtype: list[Node]
+    """
+    node_hashes = {hash_node(node) for node in nodes}
+
+    return manager.session.query(Node) \
+        .join(network_node, network_node.c.node_id == Node.id) \
+        .filter(network_node.c.network_id.in_(network_ids), Node.sha512.in_(node_hashes)) \
+        .distinct() \
+        .all()
+
+
+def _build_graph(edges, nodes=None):
+    """Builds a BEL graph from models in the edge store
+
+    :param iter[Edge] edges: Edges
+    :param Optional[iter[Node]] nodes: Nodes to add even if they aren't in any of the edges
+    :rtype: pybel.BELGraph
+    """
+    graph = BELGraph()
+    node_tuples = {}
+
+    def add_node(node):
+        """Adds a node without its implied parents or members, like the subgraphs made in memory"""
+        if node.id not in node_tuples:
+            data = node.to_json()
+            node_tuples[node.id] = node.to_tuple()
+            graph.add_node(node_tuples[node.id], attr_dict=data)
+
+        return node_tuples[node.id]
+
+    for node in nodes or []:
+        add_node(node)
+
+    for edge in edges:
+        u = add_node(edge.source)
+        v = add_node(edge.target)
+        data = edge.get_data_json()
+        safe_add_edge(graph, u, v, unqualified_edge_code.get(data[RELATION], 0), data)
+
+    return graph
+
+
+def _seed_by_induction(manager, network_ids, nodes):
+    node_models = _get_network_nodes(manager, network_ids, nodes)
+
+    if not node_models:
+        return
+
+    node_ids = [node.id for node in node_models]
+    edges = _query_network_edges(manager, network_ids) \
+        .filter(Edge.source_id.in_(node_ids), Edge.target_id.in_(node_ids))
+
+    return _build_graph(edges, nodes=node_models)
+
+
+def _seed_by_neighbors(manager, network_ids, nodes):
+    node_models = _get_network_nodes(manager, network_ids, nodes)
+
+    if not node_models:
+        return
+
+    node_ids = [node.id for node in node_models]
+    edges = _query_network_edges(manager, network_ids) \
+        .filter(or_(Edge.source_id.in_(node_ids), Edge.target_id.in_(node_ids)))
+
+    return _build_graph(edges)
+
+
+def _query_pubmed_edges(manager, network_ids, pubmed_identifiers):
+    if isinstance(pubmed_identifiers, str):
+        pubmed_identifiers = [pubmed_identifiers]
+
+    return _query_network_edges(manager, network_ids) \
+        .join(Evidence, Edge.evidence_id == Evidence.id) \
+        .join(Citation, Evidence.citation_id == Citation.id) \
+        .filter(Citation.type == CITATION_TYPE_PUBMED, Citation.reference.in_(pubmed_identifiers))
+
+
+def _query_author_edges(manager, network_ids, authors):
+    if isinstance(authors, str):
+        authors = [authors]
+
+    return _query_network_edges(manager, network_ids) \
+        .join(Evidence, Edge.evidence_id == Evidence.id) \
+        .join(author_citation, author_citation.c.citation_id == Evidence.citation_id) \
+        .join(Author, Author.id == author_citation.c.author_id) \
+        .filter(Author.name.in_(authors))
+
+
+def _select_annotated_edge_ids(annotation, values):
+    """Builds a subquery for the identifiers of the edges that have any of the given values for the annotation
+
+    :param str annotation: An annotation keyword
+    :param iter[str] values: The values of the annotation
+    :rtype: sqlalchemy.sql.expression.Select
+    """
+    return select([edge_annotation.c.edge_id]) \
+        .select_from(edge_annotation.join(AnnotationEntry).join(Annotation)) \
+        .where(and_(Annotation.keyword == annotation, AnnotationEntry.name.in_(list(values))))
+
+
+def _query_annotated_edges(manager, network_ids, seed_data):
+    clauses = [
+        Edge.id.in_(_select_annotated_edge_ids(annotation, values))
+        for annotation, values in seed_data['annotations'].items()
+    ]
+
+    match_any = seed_data.get('or')
+
+    return _query_network_edges(manager, network_ids) \
+        .filter(or_(*clauses) if (match_any is None or match_any) else and_(*clauses))
+
+
+#: Builds the query for the edges selected by each of the :data:`EDGE_SEED_TYPES`
+_edge_seed_queries = {
+    SEED_TYPE_PUBMED: _query_pubmed_edges,
+    SEED_TYPE_AUTHOR: _query_author_edges,
+    SEED_TYPE_ANNOTATION: _query_annotated_edges,
+}
+
+
+def get_subgraph_from_database(manager, network_ids, seed_method, seed_data):
+    """Seeds a subgraph from the edges of the given networks in the edge store, like :func:`get_subgraph` does from a
+    graph of the whole networks
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param iter[int] network_ids: Database network identifiers
+    :param str seed_method: One of :data:`PUSHDOWN_SEED_TYPES`
+    :param seed_data: The argument for the seed method
+    :return: The subgraph, or none if seeding by nodes and none of them are in the networks
+    :rtype: Optional[pybel.BELGraph]
+    :raises: ValueError
+    """
+    network_ids = list(network_ids)
+
+    if seed_method == SEED_TYPE_INDUCTION:
+        result = _seed_by_induction(manager, network_ids, seed_data)
+
+    elif seed_method == SEED_TYPE_NEIGHBORS:
+        result = _seed_by_neighbors(manager, network_ids, seed_data)
+
+    elif seed_method in _edge_seed_queries:
+        result = _build_graph(_edge_seed_queries[seed_method](manager, network_ids, seed_data))
+
+    else:
+        raise ValueError('Seed method can not be run against the edge store: {}'.format(seed_method))
+
+    if result is not None:
+        log.debug('seeded %d nodes and %d edges from the edge store with %s', result.number_of_nodes(),
+                  result.number_of_edges(), seed_method)
+
+    return result
+
+
+def count_universe_in_database(manager, network_ids):
+    """Counts the nodes and edges in the union of the given networks without loading them
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param iter[int] network_ids: Database network identifiers
+    :rtype: tuple[int,int]
+    """
+    network_ids = list(network_ids)
+
+    number_nodes = manager.session.query(func.count(network_node.c.node_id.distinct())) \
+        .filter(network_node.c.network_id.in_(network_ids)) \
+        .scalar()
+
+    number_edges = manager.session.query(func.count(network_edge.c.edge_id.distinct())) \
+        .filter(network_edge.c.network_id.in_(network_ids)) \
+        .scalar()
+
+    return number_nodes, number_edges
+
+
+def _count_edges_by(manager, network_ids, column, node_ids):
+    """Counts the edges in the given networks by their source or target
+
+    :rtype: dict[int,int]
+    """
+    counts = manager.session.query(column, func.count(Edge.id.distinct())) \
+        .join(network_edge, network_edge.c.edge_id == Edge.id) \
+        .filter(network_edge.c.network_id.in_(network_ids), column.in_(node_ids)) \
+        .group_by(column) \
+        .all()
+
+    return dict(counts)
+
+
+def get_node_degrees_in_database(manager, network_ids, nodes):
+    """Gets the degrees of the given nodes in the union of the given networks without loading them
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param iter[int] network_ids: Database network identifiers
+    :param iter[tuple] nodes: BEL nodes
+    :return: A dictionary from the nodes that are in the networks to their degrees
+    :rtype: dict[tuple,int]
+    """
+    network_ids = list(network_ids)
+    node_models = _get_network_nodes(manager, network_ids, nodes)
+
+    if not node_models:
+        return {}
+
+    node_ids = [node.id for node in node_models]
+    out_degrees = _count_edges_by(manager, network_ids, Edge.source_id, node_ids)
+    in_degrees = _count_edges_by(manager, network_ids, Edge.target_id, node_ids)
+
+    return {
+        node.to_tuple(): out_degrees.get(node.id, 0) + in_degrees.get(node.id, 0)
+        for node in node_models
+    }
+
+
+def count_seed_edges_in_database(manager, network_ids, seed_method, seed_data):
+    """Counts the edges a seed selects from the given networks without loading them
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param iter[int] network_ids: Database network identifiers
+    :param str seed_method: One of :data:`EDGE_SEED_TYPES`
+    :param seed_data: The argument for the seed method
+    :rtype: int
+    :raises: ValueError
+    """
+    if seed_method not in _edge_seed_queries:
+        raise ValueError('Can not count the edges of seed method: {}'.format(seed_method))
+
+    return _edge_seed_queries[seed_method](manager, list(network_ids), seed_data).count()
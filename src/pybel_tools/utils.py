@@ -7,6 +7,7 @@ import itertools as itt
 import json
 import logging
 import os
+import queue
 from collections import Counter, defaultdict
 from operator import itemgetter
 
@@ -377,3 +378,42 @@ def get_version():
     :rtype: str
     """
     return VERSION
+
+
+def iter_unordered_bounded(pool, func, tasks, window):
+    """Applies a function to each task in a process pool like :meth:`multiprocessing.pool.Pool.imap_unordered`, but
+    only takes the next task from the iterable once a result has come back, so at most ``window`` tasks and results are
+    held at once
+
+    :param multiprocessing.pool.Pool pool: A process pool
+    :param func: A function that can be pickled, like one defined at the top level of a module
+    :param iter tasks: The argument to call the function with for each task
+    :param int window: The maximum number of tasks running or waiting to be collected
+    :return: An iterator over the results, in the order the tasks finish
+    :rtype: iter
+    :raises: Any exception raised by the function, once its task finishes
+    """
+    tasks = iter(tasks)
+    finished = queue.Queue()
+    in_flight = 0
+
+    while True:
+        for task in itt.islice(tasks, window - in_flight):
+            pool.apply_async(
+                func,
+                (task,),
+                callback=lambda result: finished.put((True, result)),
+                error_callback=lambda exception: finished.put((False, exception)),
+            )
+            in_flight += 1
+
+        if not in_flight:
+            return
+
+        succeeded, value = finished.get()
+        in_flight -= 1
+
+        if not succeeded:
+            raise value
+
+        yield value
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+from pybel import BELGraph, union
+from pybel.constants import CITATION, CITATION_REFERENCE, INCREASES, RELATION
+from pybel.dsl import pmod, protein, protein_fusion
+from pybel.examples import egf_graph, sialic_acid_graph
+from pybel_tools.columnar import from_columnar, to_columnar
+from pybel_tools.io import from_columnars
+
+
+class TestColumnar(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, graph, name='graph'):
+        path = os.path.join(self.directory.name, '{}.bgraph'.format(name))
+        to_columnar(graph, path)
+        return path
+
+    def test_round_trip(self):
+        graph = from_columnar(self.write(sialic_acid_graph)).to_bel_graph()
+
+        self.assertEqual(sialic_acid_graph.document, graph.document)
+        self.assertEqual(dict(sialic_acid_graph.node), dict(graph.node))
+        self.assertEqual(
+            sorted(sialic_acid_graph.edges_iter(keys=True, data=True)),
+            sorted(graph.edges_iter(keys=True, data=True))
+        )
+
+    def test_arrays(self):
+        """Tests the arrays can be used without building the graph"""
+        columnar_graph = from_columnar(self.write(sialic_acid_graph))
+
+        self.assertEqual(sialic_acid_graph.number_of_nodes(), columnar_graph.number_of_nodes())
+        self.assertEqual(sialic_acid_graph.number_of_edges(), columnar_graph.number_of_edges())
+
+        self.assertEqual(
+            Counter(data[RELATION] for _, _, data in sialic_acid_graph.edges_iter(data=True)),
+            columnar_graph.count_relations()
+        )
+
+        out_degrees, in_degrees = columnar_graph.get_degrees()
+        for index in range(columnar_graph.number_of_nodes()):
+            node = columnar_graph.get_node(index)
+            self.assertEqual(sialic_acid_graph.out_degree(node), out_degrees[index])
+            self.assertEqual(sialic_acid_graph.in_degree(node), in_degrees[index])
+
+    def test_edge_data(self):
+        """Tests the data of each edge is the same in the built graph"""
+        columnar_graph = from_columnar(self.write(sialic_acid_graph))
+        graph = columnar_graph.to_bel_graph()
+        sources = columnar_graph.get_edge_sources()
+
+        for index in range(columnar_graph.number_of_edges()):
+            u = columnar_graph.get_node(sources[index])
+            v = columnar_graph.get_node(columnar_graph.edge_targets[index])
+            key = int(columnar_graph.edge_keys[index])
+            self.assertEqual(graph.edge[u][v][key], columnar_graph.get_edge_data(index))
+
+    def test_round_trip_variants(self):
+        """Tests nodes with variants and fusions, and tuples in node data, come back the same"""
+        graph = BELGraph()
+        akt1 = graph.add_node_from_data(protein('HGNC', 'AKT1', variants=[pmod('Ph', code='Ser', position=473)]))
+        bcr_abl1 = graph.add_node_from_data(protein_fusion(protein('HGNC', 'BCR'), protein('HGNC', 'ABL1')))
+        graph.add_qualified_edge(bcr_abl1, akt1, INCREASES, evidence='Some evidence', citation='1234')
+        graph.node[akt1]['weights'] = (1, (2, 3), [4])
+
+        result = from_columnar(self.write(graph)).to_bel_graph()
+
+        self.assertEqual(dict(graph.node), dict(result.node))
+        self.assertEqual(tuple, type(result.node[akt1]['weights']))
+        self.assertEqual(
+            {(u, v, k): data for u, v, k, data in graph.edges_iter(keys=True, data=True)},
+            {(u, v, k): data for u, v, k, data in result.edges_iter(keys=True, data=True)}
+        )
+
+    def test_independent_graphs(self):
+        """Tests each edge gets its own citation and each call builds a new graph, so changing one changes nothing else"""
+        columnar_graph = from_columnar(self.write(sialic_acid_graph))
+        graph = columnar_graph.to_bel_graph()
+        self.assertIsNot(graph, columnar_graph.to_bel_graph())
+
+        citations = [data[CITATION] for _, _, data in graph.edges_iter(data=True) if CITATION in data]
+        citations[0][CITATION_REFERENCE] = 'changed'
+        self.assertTrue(all(citation[CITATION_REFERENCE] != 'changed' for citation in citations[1:]))
+        self.assertTrue(all(
+            data[CITATION][CITATION_REFERENCE] != 'changed'
+            for _, _, data in columnar_graph.to_bel_graph().edges_iter(data=True)
+            if CITATION in data
+        ))
+
+    def test_empty(self):
+        columnar_graph = from_columnar(self.write(BELGraph()))
+        self.assertEqual(0, columnar_graph.number_of_nodes())
+        self.assertEqual(0, columnar_graph.to_bel_graph().number_of_edges())
+
+    def test_not_columnar(self):
+        path = os.path.join(self.directory.name, 'wrong.bgraph')
+        with open(path, 'wb') as file:
+            file.write(b'not a graph')
+
+        with self.assertRaises(ValueError):
+            from_columnar(path)
+
+    def test_from_columnars(self):
+        paths = [self.write(sialic_acid_graph, 'sialic'), self.write(egf_graph, 'egf')]
+        graph = from_columnars(paths)
+
+        self.assertEqual(union([sialic_acid_graph, egf_graph]).number_of_edges(), graph.number_of_edges())
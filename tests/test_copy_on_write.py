@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import unittest
+
+from networkx import NetworkXError
+
+from pybel import BELGraph
+from pybel.examples import egf_example
+from pybel_tools.copy_on_write import CopyOnWriteGraph, copy_on_write
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    def setUp(self):
+        self.graph = egf_example.egf_graph.copy()
+        self.nodes = self.graph.nodes()
+        self.edges = self.graph.edges(keys=True)
+
+    def check_parent_unchanged(self):
+        self.assertEqual(set(self.nodes), set(self.graph.nodes()))
+        self.assertEqual(set(self.edges), set(self.graph.edges(keys=True)))
+
+    def test_remove_node(self):
+        """Tests removing a node doesn't materialize the copy or change the parent"""
+        node = self.nodes[0]
+        incident = {
+            (u, v, k)
+            for u, v, k in self.edges
+            if node in (u, v)
+        }
+
+        result = copy_on_write(self.graph)
+        result.remove_node(node)
+
+        self.assertFalse(result.is_materialized)
+        self.assertNotIn(node, result)
+        self.assertEqual(len(self.nodes) - 1, result.number_of_nodes())
+        self.assertEqual(len(self.edges) - len(incident), result.number_of_edges())
+        self.assertEqual(set(self.edges) - incident, set(result.edges(keys=True)))
+
+        with self.assertRaises(NetworkXError):
+            result.remove_node(node)
+
+        self.check_parent_unchanged()
+
+    def test_remove_edge(self):
+        u, v, k = self.edges[0]
+
+        result = copy_on_write(self.graph)
+        result.remove_edge(u, v, k)
+
+        self.assertFalse(result.is_materialized)
+        self.assertFalse(result.has_edge(u, v, k))
+        self.assertEqual(len(self.edges) - 1, result.number_of_edges())
+
+        with self.assertRaises(NetworkXError):
+            result.remove_edge(u, v, k)
+
+        self.check_parent_unchanged()
+
+    def test_modify_node_data(self):
+        """Tests modifying a node's data only copies that node's data"""
+        node = self.nodes[0]
+
+        result = copy_on_write(self.graph)
+        result.node[node]['test'] = 1
+
+        self.assertFalse(result.is_materialized)
+        self.assertEqual(1, result.node[node]['test'])
+        self.assertNotIn('test', self.graph.node[node])
+
+    def test_edge_data_read_only(self):
+        result = copy_on_write(self.graph)
+
+        for _, _, data in result.edges_iter(data=True):
+            with self.assertRaises(TypeError):
+                data['test'] = 1
+
+    def test_materialize(self):
+        """Tests that modifying the structure copies what hasn't been removed, and keeps the parent unchanged"""
+        u, v, k = self.edges[0]
+        node = self.nodes[-1]
+
+        result = copy_on_write(self.graph)
+        result.remove_node(node)
+        result.edge[u][v][k]['test'] = 1
+
+        self.assertTrue(result.is_materialized)
+        self.assertNotIn(node, result)
+        self.assertIs(result.succ[u][v], result.pred[v][u])
+        self.assertEqual(1, result.edge[u][v][k]['test'])
+        self.assertNotIn('test', self.graph.edge[u][v][k])
+
+        result.add_edge(u, node)
+        self.assertIn(node, result)
+        self.check_parent_unchanged()
+
+    def test_nested_copy(self):
+        """Tests a copy of an unmaterialized copy overlays the same parent and keeps its removals"""
+        node = self.nodes[0]
+
+        first = copy_on_write(self.graph)
+        first.remove_node(node)
+
+        second = first.copy()
+        self.assertIsInstance(second, CopyOnWriteGraph)
+        self.assertIs(self.graph, second._cow_base)
+        self.assertNotIn(node, second)
+
+        second.remove_node(self.nodes[1])
+        self.assertIn(self.nodes[1], first)
+
+    def test_to_bel_graph(self):
+        node = self.nodes[0]
+
+        result = copy_on_write(self.graph)
+        result.remove_node(node)
+
+        for graph in (pickle.loads(pickle.dumps(result)), result.to_bel_graph()):
+            self.assertIs(BELGraph, type(graph))
+            self.assertEqual(set(self.nodes) - {node}, set(graph))
+            self.assertEqual(self.graph.document, graph.document)
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import threading
+import unittest
+
+from pybel.examples import egf_graph, sialic_acid_graph
+from pybel.examples.sialic_acid_example import trem2
+from pybel_tools.daemon import DaemonError, FORMAT_JSON, FORMAT_PICKLE, QueryDaemon, query_daemon
+from pybel_tools.mutation import infer_central_dogma
+from pybel_tools.query import Query
+from tests.test_executor import make_manager
+
+
+class TestQueryDaemon(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.directory.name, 'test.sock')
+        cls.daemon = QueryDaemon(make_manager, universes=[[0]], path=cls.path, processes=2)
+        cls.thread = threading.Thread(target=cls.daemon.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.daemon.stop()
+        cls.thread.join()
+        cls.daemon.close()
+        cls.directory.cleanup()
+
+    def test_universe_loaded(self):
+        self.assertIn([0], self.daemon.universe_cache)
+
+    def test_query(self):
+        query = Query(network_ids=[0])
+        query.append_seeding_neighbors([trem2])
+        query.append_pipeline(infer_central_dogma)
+
+        expected = query.run(make_manager())
+
+        for result_format in (FORMAT_PICKLE, FORMAT_JSON):
+            with self.subTest(result_format=result_format):
+                result = query_daemon(query, path=self.path, result_format=result_format)
+                self.assertEqual(set(expected.nodes()), set(result.nodes()))
+                self.assertEqual(expected.number_of_edges(), result.number_of_edges())
+
+    def test_query_universe(self):
+        result = query_daemon(Query(network_ids=[0]), path=self.path)
+        self.assertEqual(sialic_acid_graph.number_of_nodes(), result.number_of_nodes())
+
+    def test_empty(self):
+        query = Query(network_ids=[0])
+        query.append_seeding_induction(egf_graph.nodes()[:2])
+        self.assertIsNone(query_daemon(query, path=self.path))
+
+    def test_error(self):
+        with self.assertRaises(DaemonError):
+            query_daemon({'seeding': []}, path=self.path)
+
+    def test_already_running(self):
+        with self.assertRaises(OSError):
+            QueryDaemon(make_manager, path=self.path)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import tempfile
+import unittest
+
+from pybel.examples import egf_graph, homology_graph, sialic_acid_graph
+from pybel.examples.sialic_acid_example import trem2
+from pybel.utils import hash_node
+from pybel_tools.dict_manager import DictManager
+from pybel_tools.mutation import infer_central_dogma
+from pybel_tools.query import Query
+
+
+class TestDictManager(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.graphs = [sialic_acid_graph, egf_graph, homology_graph]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_manager(self, **kwargs):
+        manager = DictManager(connection='sqlite://', directory=self.directory.name, **kwargs)
+
+        network_ids = [
+            manager.insert_graph(graph).id
+            for graph in self.graphs
+        ]
+
+        return manager, network_ids
+
+    def test_evict_and_load(self):
+        manager, network_ids = self.make_manager(max_networks=2)
+
+        self.assertEqual(3, manager.count_networks())
+        self.assertEqual(network_ids[1:], list(manager.networks), msg='the first network should be evicted')
+
+        graph = manager.get_graph_by_id(network_ids[0])
+
+        self.assertEqual(set(sialic_acid_graph.nodes()), set(graph.nodes()))
+        self.assertEqual(sialic_acid_graph.number_of_edges(), graph.number_of_edges())
+        self.assertEqual([network_ids[2], network_ids[0]], list(manager.networks))
+
+    def test_max_edges(self):
+        manager, network_ids = self.make_manager(max_edges=egf_graph.number_of_edges())
+        self.assertEqual([network_ids[2]], list(manager.networks), msg='the latest network should always be kept')
+
+        manager.get_graph_by_id(network_ids[1])
+        self.assertEqual([network_ids[1]], list(manager.networks))
+
+    def test_hash_to_node(self):
+        manager, _ = self.make_manager(max_networks=1)
+
+        for graph in self.graphs:
+            for node in graph:
+                self.assertEqual(node, manager.get_node_tuple_by_hash(hash_node(node)))
+
+    def test_missing(self):
+        manager, _ = self.make_manager()
+
+        with self.assertRaises(KeyError):
+            manager.get_graph_by_id(5)
+
+    def test_query(self):
+        """Tests queries are run on the graphs instead of the database"""
+        manager, network_ids = self.make_manager(max_networks=1)
+
+        query = Query(network_ids=network_ids[:2])
+        query.append_seeding_neighbors([trem2])
+
+        self.assertFalse(query.can_push_down(manager))
+
+        result = query.run(manager)
+        self.assertIn(trem2.as_tuple(), result)
+
+    def test_query_in_place(self):
+        """Tests running a query in place doesn't modify the stored graphs"""
+        manager, network_ids = self.make_manager(max_networks=1)
+
+        for query_network_ids in ([network_ids[0]], network_ids[:2]):
+            stored = manager.get_graph_by_id(network_ids[0])
+            number_nodes = stored.number_of_nodes()
+
+            query = Query(network_ids=query_network_ids)
+            query.append_pipeline(infer_central_dogma)
+            result = query.run(manager, in_place=True)
+
+            self.assertLess(number_nodes, result.number_of_nodes())
+            self.assertEqual(number_nodes, stored.number_of_nodes())
+            self.assertEqual(number_nodes, manager.get_graph_by_id(network_ids[0]).number_of_nodes())
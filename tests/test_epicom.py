@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from pybel import BELGraph
+from pybel.constants import ANNOTATIONS, INCREASES, RELATION
+from pybel.dsl import gene
+from pybel.manager import Manager
+
+try:
+    import bio2bel_drugbank
+except ImportError:
+    bio2bel_drugbank = None
+else:
+    from pybel_tools.analysis.epicom.algorithm import (
+        CHECKPOINT_MANIFEST_FILE, CHECKPOINT_SCORES_FILE, get_completed_work_units, get_epicom_score_matrix,
+        run_epicom, run_epicom_checkpointed,
+    )
+    from pybel_tools.analysis.epicom.build import bulk_insert_scores
+    from pybel_tools.analysis.epicom.models import Score
+
+HGNC = 'HGNC'
+
+
+def make_epicom_graph(name, subgraphs):
+    """Makes a graph of genes connected in a chain for each subgraph
+
+    :param str name: The name of the graph
+    :param dict[str,str] subgraphs: A dictionary from subgraph names to the gene names in them
+    :rtype: pybel.BELGraph
+    """
+    graph = BELGraph(name=name, version='1.0.0')
+
+    for subgraph_name, names in sorted(subgraphs.items()):
+        nodes = [graph.add_node_from_data(gene(namespace=HGNC, name=name)) for name in names]
+
+        for u, v in zip(nodes, nodes[1:]):
+            graph.add_edge(u, v, attr_dict={
+                RELATION: INCREASES,
+                ANNOTATIONS: {'Subgraph': {subgraph_name: True}},
+            })
+
+    return graph
+
+
+def make_dtis():
+    return {
+        'drug1': [gene(namespace=HGNC, name=name).as_tuple() for name in 'ab'],
+        'drug2': [gene(namespace=HGNC, name=name).as_tuple() for name in 'gh'],
+        'drug3': [gene(namespace=HGNC, name=name).as_tuple() for name in 'ajm'],
+    }
+
+
+def read_run_epicom_scores(graph, directory):
+    """Reads the scores written by :func:`run_epicom` with the names of the drugs and subgraphs
+
+    :rtype: dict[tuple[str,tuple[str,str]],float]
+    """
+    names = {}
+    for table in ('subgraphs', 'drugs'):
+        with open(os.path.join(directory, '{}.tsv'.format(table))) as file:
+            next(file)
+            names[table] = dict(line.rstrip('\n').split('\t') for line in file)
+
+    with open(os.path.join(directory, 'scores.tsv')) as file:
+        next(file)
+        return {
+            (names['drugs'][drug_id], (graph.name, names['subgraphs'][subgraph_id])): float(score)
+            for subgraph_id, drug_id, score in (line.rstrip('\n').split('\t') for line in file)
+        }
+
+
+@unittest.skipIf(bio2bel_drugbank is None, 'bio2bel_drugbank is not installed')
+class TestCheckpointed(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint_directory = os.path.join(self.directory.name, 'checkpoint')
+        self.dtis = make_dtis()
+        self.graphs = [
+            make_epicom_graph('first', {'A': 'abcdef', 'B': 'ghijkl'}),
+            make_epicom_graph('second', {'C': 'abgh', 'D': 'mnop'}),
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume(self):
+        """Tests an interrupted run skips the finished work units when it's resumed and gives the same scores as
+        :func:`run_epicom`"""
+        self.assertEqual(2, run_epicom_checkpointed(self.graphs[:1], self.checkpoint_directory, dtis=self.dtis,
+                                                    processes=1))
+
+        # the run is interrupted after finishing one work unit and writing part of the scores of another
+        manifest_path = os.path.join(self.checkpoint_directory, CHECKPOINT_MANIFEST_FILE)
+        with open(manifest_path) as file:
+            first_unit = file.readline()
+        with open(manifest_path, 'w') as file:
+            file.write(first_unit)
+
+        with open(os.path.join(self.checkpoint_directory, CHECKPOINT_SCORES_FILE), 'a') as file:
+            print('second', 'C', 'drug9', 0.5, sep='\t', file=file)
+
+        self.assertEqual(3, run_epicom_checkpointed(self.graphs, self.checkpoint_directory, dtis=self.dtis,
+                                                    processes=1))
+        self.assertEqual(
+            {('first', 'A'), ('first', 'B'), ('second', 'C'), ('second', 'D')},
+            get_completed_work_units(self.checkpoint_directory)
+        )
+        self.assertEqual(0, run_epicom_checkpointed(self.graphs, self.checkpoint_directory, dtis=self.dtis,
+                                                    processes=1))
+
+        expected = {}
+        for graph in self.graphs:
+            directory = os.path.join(self.directory.name, graph.name)
+            run_epicom(graph, directory, dtis=self.dtis)
+            expected.update(read_run_epicom_scores(graph, directory))
+
+        matrix, drugs, subgraphs = get_epicom_score_matrix(self.checkpoint_directory)
+
+        self.assertEqual(sorted({drug for drug, _ in expected}), drugs)
+        self.assertEqual([('first', 'A'), ('first', 'B'), ('second', 'C'), ('second', 'D')], subgraphs)
+
+        for i, drug in enumerate(drugs):
+            for j, subgraph in enumerate(subgraphs):
+                self.assertAlmostEqual(expected.get((drug, subgraph), 0.0), matrix[i, j])
+
+
+@unittest.skipIf(bio2bel_drugbank is None, 'bio2bel_drugbank is not installed')
+class TestBulkInsert(unittest.TestCase):
+    def setUp(self):
+        self.manager = Manager(connection='sqlite://')
+        self.manager.create_all()
+
+    def test_bulk_insert_scores(self):
+        """Tests the rows are all inserted when they're split across several transactions"""
+        rows = [
+            {'network_id': 1, 'annotation_id': i % 3, 'drug_id': i, 'score': i / 10}
+            for i in range(7)
+        ]
+
+        self.assertEqual(7, bulk_insert_scores(self.manager, iter(rows), batch_size=3))
+
+        scores = self.manager.session.query(Score).order_by(Score.drug_id).all()
+        self.assertEqual(
+            [(row['network_id'], row['annotation_id'], row['drug_id'], row['score']) for row in rows],
+            [(score.network_id, score.annotation_id, score.drug_id, score.score) for score in scores]
+        )
+
+    def test_bulk_insert_nothing(self):
+        self.assertEqual(0, bulk_insert_scores(self.manager, iter([])))
+        self.assertEqual(0, self.manager.session.query(Score).count())
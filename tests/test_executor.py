@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+import unittest
+
+from pybel.examples import egf_graph, sialic_acid_graph
+from pybel.examples.sialic_acid_example import trem2
+from pybel_tools.executor import AsyncQueryExecutor
+from pybel_tools.mutation import infer_central_dogma
+from pybel_tools.pipeline import Pipeline, PipelineCancelledError
+from pybel_tools.query import Query
+from tests.mocks import MockQueryManager
+
+
+def make_manager():
+    """Makes a manager with the sialic acid network as 0 and the EGF network as 1 in each worker
+
+    :rtype: MockQueryManager
+    """
+    return MockQueryManager(graphs=[sialic_acid_graph.copy(), egf_graph.copy()])
+
+
+class TestCancellation(unittest.TestCase):
+    def test_cancel_pipeline(self):
+        event = threading.Event()
+        event.set()
+
+        pipeline = Pipeline()
+        pipeline.append(infer_central_dogma)
+
+        with self.assertRaises(PipelineCancelledError):
+            pipeline.run(sialic_acid_graph.copy(), cancel_event=event)
+
+        self.assertIsNone(pipeline._cancel_event)
+
+    def test_cancel_query(self):
+        event = threading.Event()
+        event.set()
+
+        query = Query(network_ids=[0])
+        query.append_seeding_neighbors([trem2])
+
+        with self.assertRaises(PipelineCancelledError):
+            query.run(make_manager(), cancel_event=event)
+
+
+class TestAsyncQueryExecutor(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = AsyncQueryExecutor(make_manager, processes=2)
+        cls.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(cls.loop)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.close()
+        cls.loop.close()
+        asyncio.set_event_loop(None)
+
+    def make_query(self):
+        query = Query(network_ids=[0])
+        query.append_seeding_neighbors([trem2])
+        query.append_pipeline(infer_central_dogma)
+        return query
+
+    def test_run(self):
+        query = self.make_query()
+        expected = query.run(make_manager())
+
+        result = self.loop.run_until_complete(self.executor.run(query))
+
+        self.assertEqual(set(expected.nodes()), set(result.nodes()))
+        self.assertEqual(expected.number_of_edges(), result.number_of_edges())
+        self.assertEqual(0, self.executor.number_in_flight())
+
+    def test_deduplicate(self):
+        """Tests identical queries requested at the same time share one computation"""
+        first, second, other = self.loop.run_until_complete(asyncio.gather(
+            self.executor.run(self.make_query()),
+            self.executor.run(self.make_query()),
+            self.executor.run(Query(network_ids=[1])),
+        ))
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(egf_graph.number_of_nodes(), other.number_of_nodes())
+
+    def test_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            self.loop.run_until_complete(self.executor.run(self.make_query(), timeout=0.0001))
+
+        self.assertEqual(0, self.executor.number_in_flight())
+
+    def test_run_pipeline(self):
+        graph = sialic_acid_graph.copy()
+
+        pipeline = Pipeline()
+        pipeline.append(infer_central_dogma)
+
+        result = self.loop.run_until_complete(self.executor.run_pipeline(pipeline, graph))
+
+        self.assertEqual(sialic_acid_graph.number_of_nodes(), graph.number_of_nodes(), msg='should not be modified')
+        self.assertLess(graph.number_of_nodes(), result.number_of_nodes())
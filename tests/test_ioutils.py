@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from pybel import from_pickle
+from pybel.examples import sialic_acid_graph
+from pybel_tools.columnar import from_columnar
+from pybel_tools.ioutils import convert_paths, subgraphs_to_pickles
+from pybel_tools.selection import get_subgraph_by_annotation_value
+
+TEMPLATE = """SET DOCUMENT Name = "{name}"
+SET DOCUMENT Version = "1.0.0"
+SET DOCUMENT Description = "A test document"
+SET DOCUMENT Authors = "PyBEL Tools"
+SET DOCUMENT ContactInfo = "pybel@example.com"
+
+DEFINE NAMESPACE HGNC AS PATTERN ".*"
+
+SET Citation = {{"PubMed", "12345"}}
+SET Evidence = "Some evidence"
+p(HGNC:{source}) increases p(HGNC:{target})
+"""
+
+
+class TestConvertPaths(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = 'sqlite:///{}'.format(os.path.join(self.directory.name, 'cache.db'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_paths(self, name):
+        """Writes two BEL scripts in their own directory and returns their paths with one that can't be parsed
+
+        :param str name: The name of the directory
+        :rtype: list[str]
+        """
+        directory = os.path.join(self.directory.name, name)
+        os.makedirs(directory)
+
+        paths = []
+        for source, target in (('AKT1', 'EGFR'), ('EGFR', 'MAPK1')):
+            path = os.path.join(directory, '{}.bel'.format(source))
+            with open(path, 'w') as file:
+                file.write(TEMPLATE.format(name=source, source=source, target=target))
+            paths.append(path)
+
+        paths.append(os.path.join(directory, 'wrong_extension.txt'))
+
+        return paths
+
+    def help_test_convert(self, n_jobs):
+        paths = self.make_paths('jobs_{}'.format(n_jobs))
+        successes, failures = convert_paths(paths, connection=self.connection, n_jobs=n_jobs, infer_central_dogma=False)
+
+        self.assertEqual(set(paths[:2]), set(successes))
+        self.assertEqual([paths[2]], [path for path, _ in failures])
+        self.assertIsInstance(failures[0][1], ValueError)
+
+        for path in paths[:2]:
+            self.assertEqual(1, successes[path].number_of_edges())
+            self.assertTrue(os.path.exists(path[:-len('.bel')] + '.gpickle'))
+
+    def test_serial(self):
+        self.help_test_convert(None)
+
+    def test_parallel(self):
+        self.help_test_convert(2)
+
+
+class TestSubgraphsToPickles(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def help_test_split(self, **kwargs):
+        paths = subgraphs_to_pickles(sialic_acid_graph, 'Confidence', directory=self.directory.name, **kwargs)
+        self.assertEqual(2, len(paths))
+
+        for value in ('High', 'Low'):
+            path = os.path.join(self.directory.name, 'Confidence_{}{}'.format(
+                value, '.bgraph' if kwargs.get('columnar') else '.gpickle'))
+            self.assertIn(path, paths)
+
+            subgraph = from_columnar(path).to_bel_graph() if kwargs.get('columnar') else from_pickle(path)
+            expected = get_subgraph_by_annotation_value(sialic_acid_graph, 'Confidence', value)
+
+            self.assertEqual(set(expected.edges()), set(subgraph.edges()))
+            self.assertEqual(sialic_acid_graph.document, subgraph.document)
+
+    def test_split(self):
+        self.help_test_split()
+
+    def test_split_parallel(self):
+        self.help_test_split(processes=2)
+
+    def test_split_columnar(self):
+        self.help_test_split(processes=2, columnar=True)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+import unittest
+
+from pybel import BELGraph
+from pybel.constants import CITATION, CITATION_AUTHORS
+from pybel.examples import egf_example
+from pybel_tools.journal import JournaledGraph
+from pybel_tools.mutation import infer_central_dogma
+
+
+def get_contents(graph):
+    """Gets the nodes, edges, and their data as plain dictionaries for comparing graphs
+
+    :param pybel.BELGraph graph: A BEL graph
+    :rtype: tuple[dict,dict]
+    """
+    nodes = {
+        node: pickle.loads(pickle.dumps(data))
+        for node, data in graph.nodes_iter(data=True)
+    }
+    edges = {
+        (u, v, key): pickle.loads(pickle.dumps(data))
+        for u, v, key, data in graph.edges_iter(keys=True, data=True)
+    }
+    return nodes, edges
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        self.network = egf_example.egf_graph.copy()
+        self.graph = JournaledGraph(self.network)
+        self.expected = get_contents(self.network)
+
+    def test_rollback(self):
+        """Tests adding, removing, and changing nodes and edges is undone"""
+        savepoint = self.graph.savepoint()
+
+        infer_central_dogma(self.graph)
+
+        u, v, key, data = next(self.graph.edges_iter(keys=True, data=True))
+        data[CITATION][CITATION_AUTHORS] = 'Author'
+        self.graph.node[u]['extra'] = 1
+
+        self.graph.remove_node(v)
+        self.graph.remove_edges_from(self.graph.edges(keys=True)[:3])
+
+        self.assertNotEqual(self.expected, get_contents(self.graph))
+        self.assertLess(0, self.graph.number_of_changes())
+
+        self.graph.rollback(savepoint)
+
+        self.assertEqual(self.expected, get_contents(self.graph))
+        self.assertEqual(self.expected, get_contents(self.network), msg='the wrapped graph should be restored too')
+        self.assertEqual(0, self.graph.number_of_changes())
+
+    def test_nested_savepoints(self):
+        outer = self.graph.savepoint()
+        node = self.graph.nodes()[0]
+        self.graph.remove_node(node)
+        after_remove = get_contents(self.graph)
+
+        self.graph.savepoint()
+        infer_central_dogma(self.graph)
+        self.graph.rollback()
+
+        self.assertEqual(after_remove, get_contents(self.graph))
+
+        self.graph.rollback(outer)
+        self.assertEqual(self.expected, get_contents(self.graph))
+
+    def test_release(self):
+        """Tests changes aren't recorded once all savepoints are released"""
+        self.graph.savepoint()
+        infer_central_dogma(self.graph)
+        self.graph.release()
+
+        self.assertEqual(0, self.graph.number_of_changes())
+
+        with self.assertRaises(ValueError):
+            self.graph.rollback()
+
+    def test_pickle(self):
+        """Tests pickles and copies are plain BEL graphs"""
+        for result in (pickle.loads(pickle.dumps(self.graph)), self.graph.copy()):
+            self.assertIs(BELGraph, type(result))
+            self.assertEqual(self.expected, get_contents(result))
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from pybel import to_pickle, union
+from pybel.constants import CITATION
+from pybel.examples import egf_graph, homology_graph, sialic_acid_graph
+from pybel_tools.io import from_directory_pickles, from_pickles
+from pybel_tools.merge import streaming_union
+
+
+class TestStreamingUnion(unittest.TestCase):
+    def setUp(self):
+        self.graphs = [sialic_acid_graph, egf_graph, homology_graph, sialic_acid_graph]
+        self.expected = union(self.graphs)
+
+    def assert_same(self, graph):
+        self.assertEqual(set(self.expected.nodes()), set(graph.nodes()))
+        self.assertEqual(self.expected.number_of_edges(), graph.number_of_edges())
+        self.assertEqual(sialic_acid_graph.document, graph.document)
+
+    def test_union(self):
+        self.assert_same(streaming_union(iter(self.graphs)))
+
+    def test_share_data(self):
+        graph = streaming_union(iter(self.graphs))
+
+        citations = [data[CITATION] for _, _, data in graph.edges_iter(data=True) if CITATION in data]
+        shared = {id(citation) for citation in citations}
+
+        self.assertEqual(len({tuple(sorted(citation.items())) for citation in citations}), len(shared))
+        self.assertLess(len(shared), len(citations))
+
+    def test_inputs_unchanged(self):
+        number_edges = sialic_acid_graph.number_of_edges()
+        streaming_union(iter(self.graphs))
+        self.assertEqual(number_edges, sialic_acid_graph.number_of_edges())
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            streaming_union(iter([]))
+
+    def test_pickles(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+
+            for i, graph in enumerate(self.graphs):
+                path = os.path.join(directory, '{}.gpickle'.format(i))
+                to_pickle(graph, path)
+                paths.append(path)
+
+            self.assert_same(from_pickles(sorted(paths), ahead=2))
+            self.assertEqual(self.expected.number_of_edges(), from_directory_pickles(directory).number_of_edges())
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from pybel.constants import RELATION
+from pybel.examples import egf_graph, homology_graph, sialic_acid_graph
+from pybel.examples.sialic_acid_example import trem2
+from pybel.utils import hash_node
+from pybel_tools.dict_manager import DictManager
+from pybel_tools.network_index import NetworkIndex
+
+
+def _first_edge(graph):
+    u, v, data = next(iter(graph.edges_iter(data=True)))
+    return u, v, data[RELATION]
+
+
+class TestNetworkIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'index.pickle')
+        self.index = NetworkIndex(self.path)
+        self.manager = DictManager(connection='sqlite://', index=self.index)
+
+        self.network_ids = [
+            self.manager.insert_graph(graph).id
+            for graph in (sialic_acid_graph, egf_graph, homology_graph)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_nodes(self):
+        sialic_id, egf_id, _ = self.network_ids
+
+        self.assertEqual({sialic_id}, self.index.get_network_ids_by_node(trem2.as_tuple()))
+        self.assertEqual({sialic_id}, self.index.get_network_ids_by_node_hash(hash_node(trem2.as_tuple())))
+
+        egf_node = next(iter(egf_graph))
+        self.assertEqual({sialic_id, egf_id}, self.index.get_network_ids_by_nodes(
+            [trem2.as_tuple(), egf_node], match_all=False))
+        self.assertEqual(set(), self.index.get_network_ids_by_nodes([trem2.as_tuple(), egf_node]))
+
+    def test_edges(self):
+        sialic_id, egf_id, _ = self.network_ids
+        sialic_edge, egf_edge = _first_edge(sialic_acid_graph), _first_edge(egf_graph)
+
+        self.assertEqual({sialic_id}, self.index.get_network_ids_by_edge(*sialic_edge))
+        self.assertEqual({sialic_id, egf_id}, self.index.get_network_ids_by_edges(
+            [sialic_edge, egf_edge], match_all=False))
+        self.assertEqual(set(), self.index.get_network_ids_by_edges([sialic_edge, egf_edge]))
+
+    def test_shared(self):
+        sialic_id, egf_id, _ = self.network_ids
+
+        self.assertEqual(sialic_acid_graph.number_of_nodes(), self.index.count_shared_nodes([sialic_id]))
+        self.assertEqual(
+            sialic_acid_graph.number_of_nodes() + egf_graph.number_of_nodes() - self.index.count_shared_nodes(
+                [sialic_id, egf_id]),
+            self.index.count_shared_nodes([sialic_id, egf_id], match_all=False)
+        )
+
+    def test_remove(self):
+        sialic_id = self.network_ids[0]
+        self.index.remove_network(sialic_id)
+
+        self.assertNotIn(sialic_id, self.index)
+        self.assertEqual(set(), self.index.get_network_ids_by_node(trem2.as_tuple()))
+
+        self.index.add_graph(7, sialic_acid_graph)
+        self.assertEqual({7}, self.index.get_network_ids_by_node(trem2.as_tuple()))
+
+    def test_persist(self):
+        """Tests the index is read back from its file, before and after compaction"""
+        self.index.remove_network(self.network_ids[1])
+
+        for _ in range(2):
+            index = NetworkIndex(self.path)
+
+            self.assertEqual(self.index.get_network_ids(), index.get_network_ids())
+            self.assertEqual({self.network_ids[0]}, index.get_network_ids_by_node(trem2.as_tuple()))
+            self.assertEqual(set(), index.get_network_ids_by_edge(*_first_edge(egf_graph)))
+
+            self.index.compact()
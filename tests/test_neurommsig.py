@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from pybel import BELGraph
+from pybel.constants import ANNOTATIONS, INCREASES, RELATION
+from pybel.dsl import gene
+from pybel_tools.analysis.neurommsig import (
+    get_neurommsig_score, get_neurommsig_significance, get_neurommsig_significance_prestratified,
+)
+from pybel_tools.grouping import get_subgraphs_by_annotation
+
+HGNC = 'HGNC'
+
+
+def make_gene_graph():
+    """Makes a graph with two subgraphs of genes connected in chains"""
+    graph = BELGraph()
+
+    for subgraph_name, names in (('A', 'abcdef'), ('B', 'ghijkl')):
+        nodes = [gene(namespace=HGNC, name=name).as_tuple() for name in names]
+
+        for node in nodes:
+            graph.add_node_from_data(gene(namespace=HGNC, name=node[2]))
+
+        for u, v in zip(nodes, nodes[1:]):
+            graph.add_edge(u, v, attr_dict={
+                RELATION: INCREASES,
+                ANNOTATIONS: {'Subgraph': {subgraph_name: True}},
+            })
+
+    return graph
+
+
+class TestNeuroMMSigSignificance(unittest.TestCase):
+    def setUp(self):
+        self.graph = make_gene_graph()
+        self.genes = [gene(namespace=HGNC, name=name).as_tuple() for name in 'abc']
+
+    def test_observed_score_matches(self):
+        """Tests the vectorized kernels give the same score as :func:`get_neurommsig_score`"""
+        results = get_neurommsig_significance(self.graph, self.genes, n_permutations=10, seed=0)
+
+        self.assertEqual({'A', 'B'}, set(results))
+
+        subgraphs = get_subgraphs_by_annotation(self.graph, 'Subgraph')
+
+        for subgraph_name, (score, p_value) in results.items():
+            self.assertAlmostEqual(get_neurommsig_score(subgraphs[subgraph_name], self.genes), score)
+
+            self.assertLess(0.0, p_value)
+            self.assertGreaterEqual(1.0, p_value)
+
+    def test_observed_score_matches_hubs(self):
+        """Tests the hub score has the same denominator as :func:`get_neurommsig_score` when some of the hubs aren't
+        in the background or the query"""
+        graph = BELGraph()
+        nodes = [graph.add_node_from_data(gene(namespace=HGNC, name='g{}'.format(i))) for i in range(40)]
+
+        for u, v in zip(nodes, nodes[1:]):
+            graph.add_edge(u, v, attr_dict={RELATION: INCREASES})
+
+        genes = [nodes[0], nodes[1], nodes[20]]
+        background = genes + nodes[2:6]
+
+        results = get_neurommsig_significance_prestratified([('A', graph)], genes, background, top=0.1,
+                                                            n_permutations=10, seed=0)
+
+        self.assertAlmostEqual(get_neurommsig_score(graph, genes, top=0.1), results['A'][0])
+
+    def test_seeded(self):
+        """Tests the same seed gives the same p-values"""
+        first = get_neurommsig_significance(self.graph, self.genes, n_permutations=50, seed=5, batch_size=7)
+        second = get_neurommsig_significance(self.graph, self.genes, n_permutations=50, seed=5, batch_size=7)
+        self.assertEqual(first, second)
+
+    def test_enriched(self):
+        """Tests that the subgraph containing all of the query is more significant than the one containing none"""
+        results = get_neurommsig_significance(self.graph, self.genes, n_permutations=200, seed=0)
+        self.assertLess(results['A'][1], results['B'][1])
+
+    def test_background_too_small(self):
+        with self.assertRaises(ValueError):
+            get_neurommsig_significance_prestratified([('A', self.graph)], self.genes, self.genes[:1])
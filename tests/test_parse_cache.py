@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+
+from pybel import to_pickle
+from pybel_tools.io import from_path_ensure_pickle
+from pybel_tools.parse_cache import ParseCache
+from tests.test_ioutils import TEMPLATE
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = 'sqlite:///{}'.format(os.path.join(self.directory.name, 'cache.db'))
+        self.cache = ParseCache(os.path.join(self.directory.name, 'parse_cache'))
+        self.path = os.path.join(self.directory.name, 'test.bel')
+        self.write('EGFR')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, target):
+        with open(self.path, 'w') as file:
+            file.write(TEMPLATE.format(name='Test', source='AKT1', target=target))
+
+    def parse(self, **kwargs):
+        return from_path_ensure_pickle(self.path, connection=self.connection, cache=self.cache, **kwargs)
+
+    def test_hit(self):
+        self.assertIsNone(self.cache.get_from_path(self.path))
+
+        graph = self.parse()
+        self.assertFalse(os.path.exists(os.path.join(self.directory.name, 'test.gpickle')),
+                         msg='the graph should only be written to the cache')
+        self.assertEqual(1, len(os.listdir(self.cache.directory)))
+
+        cached = self.cache.get_from_path(self.path)
+        self.assertIsNotNone(cached)
+        self.assertEqual(set(graph.edges()), set(cached.edges()))
+
+        self.assertIsNotNone(self.cache.get_from_path(self.path, use_tqdm=True),
+                             msg='use_tqdm does not change the graph')
+
+    def test_stale(self):
+        """Tests changing the document or the options means it's parsed again"""
+        self.parse()
+        self.assertIsNone(self.cache.get_from_path(self.path, allow_nested=True))
+
+        self.write('MAPK1')
+        self.assertIsNone(self.cache.get_from_path(self.path))
+
+        graph = self.parse()
+        self.assertIn('MAPK1', {node[2] for node in graph})
+
+    def test_unreadable(self):
+        key = self.cache.get_key(self.path)
+
+        with open(os.path.join(self.cache.directory, key + '.gpickle'), 'wb') as file:
+            file.write(b'not a pickle')
+
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual([], os.listdir(self.cache.directory), msg='unreadable graphs should be removed')
+
+        self.parse()
+        self.assertIsNotNone(self.cache.get(key))
+
+    def test_evict(self):
+        self.parse()
+        old_key = self.cache.get_key(self.path)
+
+        self.cache.max_size = 1
+        self.write('MAPK1')
+        self.parse()
+
+        self.assertIsNone(self.cache.get(old_key))
+        self.assertIsNotNone(self.cache.get_from_path(self.path), msg='the newest graph should be kept')
+
+
+class TestEnsurePickle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = 'sqlite:///{}'.format(os.path.join(self.directory.name, 'cache.db'))
+        self.path = os.path.join(self.directory.name, 'test.bel')
+        self.gpickle_path = os.path.join(self.directory.name, 'test.gpickle')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, target, mtime=None):
+        with open(self.path, 'w') as file:
+            file.write(TEMPLATE.format(name='Test', source='AKT1', target=target))
+
+        if mtime is not None:
+            os.utime(self.path, (mtime, mtime))
+
+    def parse(self, **kwargs):
+        return from_path_ensure_pickle(self.path, connection=self.connection, **kwargs)
+
+    def test_unchanged(self):
+        """Tests the .gpickle next to an unchanged script is loaded instead of parsing it again"""
+        self.write('EGFR')
+        graph = self.parse()
+        self.assertTrue(os.path.exists(self.gpickle_path))
+
+        graph.name = 'Loaded'
+        to_pickle(graph, self.gpickle_path)
+        self.assertEqual('Loaded', self.parse().name)
+
+    def test_changed_contents(self):
+        """Tests a changed script is parsed again, even if it's older than its .gpickle"""
+        self.write('EGFR')
+        self.parse()
+
+        self.write('MAPK1', mtime=os.path.getmtime(self.gpickle_path) - 1000)
+        graph = self.parse()
+        self.assertIn('MAPK1', {node[2] for node in graph})
+
+    def test_changed_options(self):
+        """Tests a script is parsed again when it's parsed with different options"""
+        self.write('EGFR')
+        self.parse()
+
+        graph = self.parse(allow_nested=True)
+        graph.name = 'Loaded'
+        to_pickle(graph, self.gpickle_path)
+
+        self.assertEqual('Loaded', self.parse(allow_nested=True).name)
+        self.assertEqual('Test', self.parse().name, msg='the graph parsed with other options should not be loaded')
@@ -1,15 +1,25 @@
 # -*- coding: utf-8 -*-
 
+import json
 import logging
+import os
+import tempfile
 import unittest
 
 import pybel_tools.pipeline
 import pybel_tools.pipeline
+from pybel import from_pickle, to_pickle
 from pybel.examples import egf_example
 from pybel.utils import hash_node
+from pybel_tools.cache import GraphCache, hash_graph
+from pybel_tools.grouping import get_subgraphs_by_annotation, iter_subgraphs_by_annotation
 from pybel_tools.mutation import build_delete_node_by_hash, build_expand_node_neighborhood_by_hash, infer_central_dogma
-from pybel_tools.pipeline import MissingPipelineFunctionError, Pipeline, assert_is_mapped_to_pipeline, mapped
+from pybel_tools.pipeline import (
+    MissingPipelineFunctionError, Pipeline, assert_is_mapped_to_pipeline, build_plan, mapped, optimize_protocol,
+)
+from pybel_tools.profiling import PipelineProfiler
 from tests.mocks import MockQueryManager
+from tests.test_neurommsig import make_gene_graph
 
 log = logging.getLogger(__name__)
 log.setLevel(10)
@@ -94,6 +104,337 @@ class TestPipeline(TestEgfExample):
         self.check_original_unchanged()
 
 
+class TestPipelineCache(TestEgfExample):
+    def setUp(self):
+        super(TestPipelineCache, self).setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = GraphCache(self.directory.name)
+
+        self.pipeline = Pipeline()
+        self.pipeline.append('infer_central_dogma')
+        self.pipeline.append('prune_central_dogma')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_fingerprint_order_independent(self):
+        self.assertEqual(hash_graph(self.graph), hash_graph(self.graph.copy()))
+
+    def test_resume(self):
+        expected = self.pipeline.run(self.graph, in_place=False)
+
+        result = self.pipeline.run(self.graph, in_place=False, cache=self.cache)
+        self.assertEqual(2, len(os.listdir(self.directory.name)), msg='should store each prefix')
+        self.assertEqual(set(expected), set(result))
+
+        cached_result = self.pipeline.run(self.graph, in_place=False, cache=self.cache)
+        self.assertEqual(set(expected), set(cached_result))
+        self.assertEqual(2, len(os.listdir(self.directory.name)))
+
+        self.check_original_unchanged()
+
+    def test_invalidate(self):
+        """Tests that changing the graph changes the keys"""
+        self.pipeline.run(self.graph, in_place=False, cache=self.cache)
+
+        self.graph.remove_node(egf_example.rela.as_tuple())
+        self.pipeline.run(self.graph, in_place=False, cache=self.cache)
+
+        self.assertEqual(4, len(os.listdir(self.directory.name)))
+
+    def test_fingerprint(self):
+        """Tests a fingerprint from the caller keys the cache instead of the contents of the graph"""
+        expected = self.pipeline.run(self.graph, in_place=False)
+        self.pipeline.run(self.graph, in_place=False, cache=self.cache, fingerprint='egf-1')
+
+        # the graph isn't hashed, so the fingerprint has to change when the graph does
+        changed_graph = self.graph.copy()
+        changed_graph.remove_node(egf_example.rela.as_tuple())
+        result = self.pipeline.run(changed_graph, in_place=False, cache=self.cache, fingerprint='egf-1')
+
+        self.assertEqual(2, len(os.listdir(self.directory.name)))
+        self.assertEqual(set(expected), set(result))
+
+        self.pipeline.run(changed_graph, in_place=False, cache=self.cache, fingerprint='egf-2')
+        self.assertEqual(4, len(os.listdir(self.directory.name)))
+
+    def test_evict(self):
+        self.pipeline.run(self.graph, in_place=False, cache=self.cache)
+
+        self.cache.max_size = self.cache.get_size() - 1
+        self.assertEqual(1, self.cache.evict())
+
+
+class TestMetaPipeline(TestEgfExample):
+    def setUp(self):
+        super(TestMetaPipeline, self).setUp()
+
+        self.pipeline_a = Pipeline()
+        self.pipeline_a.append('infer_central_dogma')
+
+        self.pipeline_b = Pipeline()
+        self.pipeline_b.append('infer_central_dogma')
+        self.pipeline_b.append('prune_central_dogma')
+
+    def test_plan_shares_prefix(self):
+        plan = build_plan([self.pipeline_a.protocol, self.pipeline_b.protocol])
+
+        self.assertEqual(1, len(plan.children))
+        self.assertEqual(2, len(list(plan.iter_steps())), msg='shared prefix should only be counted once')
+
+        infer_node = next(iter(plan.children.values()))
+        self.assertEqual([0], infer_node.branches)
+        self.assertEqual(1, len(infer_node.children))
+
+    def test_union_from_json(self):
+        pipeline = Pipeline.union([self.pipeline_a, self.pipeline_b])
+        reloaded = Pipeline.from_json(json.loads(pipeline.to_jsons()))
+        self.assertEqual(pipeline.protocol, reloaded.protocol)
+
+    def test_union_shared_prefix(self):
+        """Tests the branch that ends at the divergence point isn't affected by the in-place branch after it"""
+        pipeline = Pipeline.union([self.pipeline_a, self.pipeline_b])
+        result = pipeline.run(self.graph, in_place=False)
+
+        self.assertEqual(32, result.number_of_nodes())
+        self.check_original_unchanged()
+
+    def test_profile(self):
+        pipeline = Pipeline.union([self.pipeline_a, self.pipeline_b])
+        profiler = PipelineProfiler()
+        pipeline.run(self.graph, in_place=False, profiler=profiler)
+
+        self.assertEqual(['union', 'infer_central_dogma', 'prune_central_dogma'], [
+            step['name']
+            for step in profiler.to_json()
+        ])
+        self.assertEqual([None, 0, 0], [step['parent'] for step in profiler.to_json()])
+
+        union_step = profiler.steps[0]
+        self.assertEqual(self.original_number_nodes, union_step.nodes_before)
+        self.assertEqual(32, union_step.nodes_after)
+        self.assertIsNotNone(union_step.memory_peak)
+
+        trace = profiler.to_chrome_trace()
+        self.assertEqual(3, len(trace['traceEvents']))
+        json.dumps(trace)
+
+    def test_profile_memory_peak(self):
+        """Tests a step's memory peak doesn't include the memory allocated by the steps before it"""
+        profiler = PipelineProfiler()
+        profiler.start()
+
+        try:
+            outer = profiler.begin_step({'meta': 'union'}, None)
+
+            large = profiler.begin_step({'function': 'large'}, None)
+            data = bytearray(10 ** 7)
+            del data
+            profiler.end_step(large, None)
+
+            small = profiler.begin_step({'function': 'small'}, None)
+            profiler.end_step(small, None)
+
+            profiler.end_step(outer, None)
+        finally:
+            profiler.stop()
+
+        self.assertGreaterEqual(large.memory_peak, 10 ** 7)
+        self.assertLess(small.memory_peak, 10 ** 6)
+        self.assertGreaterEqual(outer.memory_peak, 10 ** 7)
+
+    def test_union_parallel(self):
+        pipeline_c = Pipeline()
+        pipeline_c.append('prune_central_dogma')
+
+        pipeline = Pipeline.union([self.pipeline_a, pipeline_c])
+
+        expected = pipeline.run(self.graph, in_place=False)
+        result = pipeline.run(self.graph, in_place=False, processes=2)
+
+        self.assertEqual(set(expected), set(result))
+        self.assertEqual(expected.number_of_edges(), result.number_of_edges())
+        self.check_original_unchanged()
+
+    def test_intersection_shared_prefix(self):
+        pipeline = Pipeline.intersection([self.pipeline_a, self.pipeline_b])
+        result = pipeline.run(self.graph, in_place=False)
+
+        self.assertGreater(32, result.number_of_nodes())
+        self.check_original_unchanged()
+
+
+class TestPipelineMap(TestEgfExample):
+    def setUp(self):
+        super(TestPipelineMap, self).setUp()
+
+        self.pipeline = Pipeline()
+        self.pipeline.append('infer_central_dogma')
+
+        self.expected = self.pipeline.run(self.graph, in_place=False)
+
+    def test_map_graphs(self):
+        results = dict(self.pipeline.map([self.graph, self.graph], n_jobs=2))
+
+        self.assertEqual({0, 1}, set(results))
+
+        for result in results.values():
+            self.assertEqual(set(self.expected), set(result))
+
+        self.check_original_unchanged()
+
+    def test_map_summarize(self):
+        results = list(self.pipeline.map([self.graph], n_jobs=1, summarize=len))
+        self.assertEqual([(0, self.expected.number_of_nodes())], results)
+
+    def test_map_serial_unchanged(self):
+        results = dict(self.pipeline.map([self.graph], n_jobs=1))
+
+        self.assertEqual(set(self.expected), set(results[0]))
+        self.check_original_unchanged()
+
+    def test_map_same_names(self):
+        """Tests pickles with the same name in different directories aren't written to the same path, even when the
+        name a result is renamed to is taken by another pickle"""
+        for names in (['graph', 'graph', 'graph'], ['x_2', 'x', 'x']):
+            with tempfile.TemporaryDirectory() as directory:
+                paths = []
+
+                for directory_name, name in zip('abc', names):
+                    os.makedirs(os.path.join(directory, directory_name))
+                    path = os.path.join(directory, directory_name, '{}.gpickle'.format(name))
+                    to_pickle(self.graph, path)
+                    paths.append(path)
+
+                output_directory = os.path.join(directory, 'results')
+                results = dict(self.pipeline.map(paths, n_jobs=2, output_directory=output_directory))
+
+                self.assertEqual(set(paths), set(results))
+                self.assertEqual(3, len(set(results.values())))
+                self.assertEqual(os.path.join(output_directory, '{}.gpickle'.format(names[0])), results[paths[0]])
+                self.assertEqual(3, len(os.listdir(output_directory)))
+
+    def test_map_paths_to_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+
+            for name in ('a', 'b', 'c'):
+                path = os.path.join(directory, '{}.gpickle'.format(name))
+                to_pickle(self.graph, path)
+                paths.append(path)
+
+            output_directory = os.path.join(directory, 'results')
+            results = dict(self.pipeline.map(paths, n_jobs=2, output_directory=output_directory))
+
+            self.assertEqual(set(paths), set(results))
+
+            for path, output_path in results.items():
+                self.assertEqual(os.path.join(output_directory, os.path.basename(path)), output_path)
+                self.assertEqual(set(self.expected), set(from_pickle(output_path)))
+
+
+class TestPipelineOptimizer(TestEgfExample):
+    def setUp(self):
+        super(TestPipelineOptimizer, self).setUp()
+
+        self.pipeline = Pipeline()
+        self.pipeline.append('infer_central_dogma')
+        self.pipeline.append('remove_biological_processes')
+        self.pipeline.append('remove_nodes_by_function', 'Complex')
+        self.pipeline.append('remove_associations')
+
+    def test_rewrite(self):
+        """Tests deletions are moved ahead of the steps they commute with and fused when they're next to each other"""
+        protocol = optimize_protocol(self.pipeline.protocol)
+
+        self.assertEqual(3, len(protocol))
+        self.assertEqual('remove_biological_processes', protocol[0]['function'])
+        self.assertEqual('infer_central_dogma', protocol[1]['function'])
+        self.assertEqual('remove_fused_filters', protocol[2]['function'])
+        self.assertEqual(['remove_nodes_by_function', 'remove_associations'], [
+            entry['function']
+            for entry in protocol[2]['args'][0]
+        ])
+
+        self.assertEqual(protocol, optimize_protocol(protocol), msg='optimizing should be idempotent')
+
+    def test_same_result(self):
+        expected = self.pipeline.run(self.graph, in_place=False)
+        result = self.pipeline.optimize().run(self.graph, in_place=False)
+
+        self.assertEqual(set(expected), set(result))
+        self.assertEqual(set(expected.edges(keys=True)), set(result.edges(keys=True)))
+        self.check_original_unchanged()
+
+    def test_explain(self):
+        self.assertEqual(
+            '1. remove_biological_processes()\n'
+            '2. infer_central_dogma()\n'
+            '3. in a single pass:\n'
+            "    - remove_nodes_by_function('Complex')\n"
+            '    - remove_associations()',
+            self.pipeline.explain()
+        )
+
+
+class TestSplitPipeline(unittest.TestCase):
+    def setUp(self):
+        self.graph = make_gene_graph()
+
+        self.stratum_pipeline = Pipeline()
+        self.stratum_pipeline.append('infer_central_dogma')
+
+    def test_lazy_strata(self):
+        """Tests the lazy splitter makes the same strata as the eager one, in the same order"""
+        lazy = list(iter_subgraphs_by_annotation(self.graph, 'Subgraph'))
+        eager = list(get_subgraphs_by_annotation(self.graph, 'Subgraph').items())
+
+        self.assertEqual([key for key, _ in eager], [key for key, _ in lazy])
+
+        for (_, lazy_graph), (_, eager_graph) in zip(lazy, eager):
+            self.assertEqual(set(eager_graph), set(lazy_graph))
+            self.assertEqual(set(eager_graph.edges(keys=True)), set(lazy_graph.edges(keys=True)))
+
+    def test_split_union(self):
+        expected = self.stratum_pipeline.run(self.graph, in_place=False)
+
+        for name in ('get_subgraphs_by_annotation', 'iter_subgraphs_by_annotation'):
+            pipeline = Pipeline()
+            pipeline.split(name, self.stratum_pipeline, 'Subgraph')
+
+            for processes in (None, 2):
+                result = pipeline.run(self.graph, in_place=False, processes=processes)
+                self.assertEqual(set(expected), set(result), msg='{} with {} processes'.format(name, processes))
+
+    def test_split_intersection(self):
+        pipeline = Pipeline()
+        pipeline.split(iter_subgraphs_by_annotation, self.stratum_pipeline, 'Subgraph', reduce='intersection')
+
+        result = pipeline.run(self.graph, in_place=False)
+        self.assertEqual(0, result.number_of_nodes(), msg='the subgraphs have no genes in common')
+
+    def test_split_no_strata(self):
+        pipeline = Pipeline()
+        pipeline.split('iter_subgraphs_by_annotation', self.stratum_pipeline, 'Missing', keep_undefined=False)
+
+        result = pipeline.run(self.graph, in_place=False)
+        self.assertEqual(0, result.number_of_nodes())
+
+    def test_split_json(self):
+        pipeline = Pipeline()
+        pipeline.split('iter_subgraphs_by_annotation', self.stratum_pipeline, 'Subgraph')
+
+        rebuilt = Pipeline.from_json(json.loads(pipeline.to_jsons()))
+        self.assertEqual(pipeline.to_jsons(), rebuilt.to_jsons())
+
+    def test_split_failures(self):
+        with self.assertRaises(MissingPipelineFunctionError):
+            Pipeline().split('infer_central_dogma', self.stratum_pipeline)
+
+        with self.assertRaises(ValueError):
+            Pipeline().split('iter_subgraphs_by_annotation', self.stratum_pipeline, 'Subgraph', reduce='missing')
+
+
 class TestBoundMutation(TestEgfExample):
     """Random test for mutation functions"""
 
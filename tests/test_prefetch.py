@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from pybel import to_pickle
+from pybel.examples import egf_graph, homology_graph, sialic_acid_graph
+from pybel.manager import Manager
+from pybel.resources.definitions import write_namespace
+from pybel_tools.dict_manager import DictManager
+from pybel_tools.io import iter_from_directory, iter_from_pickles, iter_prefetched
+from pybel_tools.ioutils import upload_recursive
+from tests.test_ioutils import TEMPLATE
+
+
+class _Recorder(object):
+    """Loads paths slowly while recording how many load at once"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loading = 0
+        self.most_loading = 0
+
+    def __call__(self, path):
+        with self.lock:
+            self.loading += 1
+            self.most_loading = max(self.most_loading, self.loading)
+
+        time.sleep(0.01)
+
+        with self.lock:
+            self.loading -= 1
+
+        if path.endswith('fail'):
+            raise ValueError(path)
+
+        return path
+
+
+class TestPrefetch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.graphs = [sialic_acid_graph, egf_graph, homology_graph]
+        self.paths = []
+
+        for i, graph in enumerate(self.graphs):
+            path = os.path.join(self.directory.name, '{}.gpickle'.format(i))
+            to_pickle(graph, path)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_ordered(self):
+        paths = [str(i) for i in range(20)]
+        self.assertEqual(paths, list(iter_prefetched(paths, load=_Recorder(), ahead=4)))
+
+    def test_unordered(self):
+        paths = [str(i) for i in range(20)]
+        self.assertEqual(set(paths), set(iter_prefetched(paths, load=_Recorder(), ahead=4, ordered=False)))
+
+    def test_ahead(self):
+        recorder = _Recorder()
+        list(iter_prefetched([str(i) for i in range(20)], load=recorder, ahead=3))
+        self.assertLessEqual(recorder.most_loading, 3)
+        self.assertLess(1, recorder.most_loading)
+
+    def test_max_bytes(self):
+        """Tests only one file is loaded at a time when each one is over the limit"""
+        recorder = _Recorder()
+        results = list(iter_prefetched(self.paths, load=recorder, ahead=3, max_bytes=1))
+
+        self.assertEqual(self.paths, results)
+        self.assertEqual(1, recorder.most_loading)
+
+    def test_error(self):
+        with self.assertRaises(ValueError):
+            list(iter_prefetched(['a', 'fail', 'b'], load=_Recorder(), ahead=2))
+
+    def test_pickles(self):
+        for kwargs in ({}, {'ahead': 2}, {'ahead': 2, 'processes': 2}):
+            graphs = list(iter_from_pickles(self.paths, **kwargs))
+            self.assertEqual([graph.number_of_edges() for graph in self.graphs],
+                             [graph.number_of_edges() for graph in graphs])
+
+    def test_upload(self):
+        manager = DictManager(connection='sqlite://')
+        upload_recursive(self.directory.name, connection=manager, ahead=2)
+        self.assertEqual(3, manager.count_networks())
+
+    def test_parse_directory(self):
+        """Tests BEL scripts whose namespaces are looked up with the manager can be parsed with ``ahead``, then loaded
+        from their pickles"""
+        names = ['AKT1'] + ['Test{}'.format(i) for i in range(6)]
+
+        namespace_path = os.path.join(self.directory.name, 'hgnc.belns')
+        with open(namespace_path, 'w') as file:
+            write_namespace('Test', 'HGNC', 'Gene and Gene Products', 'PyBEL Tools', 'PyBEL Tools',
+                            {name: 'GRP' for name in names}, file=file)
+
+        template = TEMPLATE.replace('AS PATTERN ".*"', 'AS URL "file://{}"'.format(namespace_path))
+        for name in names[1:]:
+            with open(os.path.join(self.directory.name, '{}.bel'.format(name)), 'w') as file:
+                file.write(template.format(name=name, source='AKT1', target=name))
+
+        manager = Manager(connection='sqlite:///{}'.format(os.path.join(self.directory.name, 'cache.db')))
+        manager.create_all()
+
+        for _ in range(2):
+            graphs = list(iter_from_directory(self.directory.name, connection=manager, ahead=3))
+
+            self.assertEqual(names[1:], sorted(graph.name for graph in graphs))
+            for graph in graphs:
+                self.assertEqual(0, len(graph.warnings))
+                self.assertEqual(1, graph.number_of_edges())
@@ -8,16 +8,30 @@ Reference for testing Flask
 """
 
 import logging
+import time
 import unittest
 
 from pybel import BELGraph
+from pybel.constants import (
+    ANNOTATIONS, CITATION, CITATION_AUTHORS, CITATION_REFERENCE, CITATION_TYPE, CITATION_TYPE_PUBMED, EVIDENCE,
+    FUNCTION, INCREASES, NAME, NAMESPACE, RELATION,
+)
+from pybel.dsl import protein
 from pybel.examples import egf_graph
 from pybel.examples.homology_example import (
     homology_graph, mouse_csf1_protein, mouse_csf1_rna,
     mouse_mapk1_protein, mouse_mapk1_rna,
 )
 from pybel.examples.sialic_acid_example import dap12, shp1, shp2, sialic_acid_graph, syk, trem2
-from pybel_tools.mutation import collapse_by_central_dogma_to_genes, expand_internal, infer_central_dogma
+from pybel.manager import Manager, models
+from pybel.utils import hash_node
+from pybel_tools.budget import Budget, BudgetExceededError
+from pybel_tools.cache import UniverseCache
+from pybel_tools.integration import overlay_data
+from pybel_tools.mutation import (
+    collapse_by_central_dogma_to_genes, expand_all_node_neighborhoods, expand_internal, infer_central_dogma,
+    remove_pathologies,
+)
 from pybel_tools.pipeline import Pipeline
 from pybel_tools.query import Query
 from pybel_tools.selection import get_subgraph_by_annotation_value
@@ -180,3 +194,280 @@ class QueryTest(ExampleNetworkMixin):
         self.assertIn(mouse_csf1_protein.as_tuple(), result)
 
         self.assertEqual(1, result.number_of_edges())
+
+
+class CountingQueryManager(MockQueryManager):
+    """A mock manager that records which networks each universe is built from"""
+
+    def __init__(self, graphs=None):
+        super(CountingQueryManager, self).__init__(graphs=graphs)
+        self.calls = []
+
+    def get_graph_by_ids(self, network_ids):
+        network_ids = list(network_ids)
+        self.calls.append(sorted(network_ids))
+        return super(CountingQueryManager, self).get_graph_by_ids(network_ids)
+
+
+class TestUniverseCache(unittest.TestCase):
+    def setUp(self):
+        self.manager = CountingQueryManager()
+        self.sialic_acid_id = self.manager.insert_graph(sialic_acid_graph.copy()).id
+        self.egf_id = self.manager.insert_graph(egf_graph.copy()).id
+        self.homology_id = self.manager.insert_graph(homology_graph.copy()).id
+
+    def test_reuse(self):
+        """Tests a cached universe is re-used and extended with only the missing networks"""
+        cache = UniverseCache()
+
+        query = Query(network_ids=[self.sialic_acid_id])
+        query.append_seeding_neighbors([syk.as_tuple()])
+        query.append_pipeline(infer_central_dogma)
+
+        first = query.run(self.manager, universe_cache=cache)
+        second = query.run(self.manager, universe_cache=cache)
+        self.assertEqual(set(first), set(second))
+        self.assertEqual([[self.sialic_acid_id]], self.manager.calls)
+
+        query.append_network(self.egf_id)
+        result = query.run(self.manager, universe_cache=cache)
+
+        self.assertEqual([[self.sialic_acid_id], [self.egf_id]], self.manager.calls)
+        self.assertEqual(set(Query.from_json(query.to_json()).run(self.manager)), set(result))
+
+    def test_universe_unchanged(self):
+        """Tests running a pipeline without seeding in place doesn't modify the cached universe"""
+        cache = UniverseCache()
+        universe = cache.get(self.manager, [self.sialic_acid_id])
+        number_nodes = universe.number_of_nodes()
+
+        query = Query(network_ids=[self.sialic_acid_id])
+        query.append_pipeline(infer_central_dogma)
+        result = query.run(self.manager, in_place=True, universe_cache=cache)
+
+        self.assertLess(number_nodes, result.number_of_nodes())
+        self.assertEqual(number_nodes, universe.number_of_nodes())
+
+    def test_seeded_universe_unchanged(self):
+        """Tests running a seeded pipeline that modifies node data twice doesn't modify the cached universe"""
+        cache = UniverseCache()
+        universe = cache.get(self.manager, [self.sialic_acid_id])
+        syk_tuple = syk.as_tuple()
+
+        query = Query(network_ids=[self.sialic_acid_id])
+        query.append_seeding_induction([syk_tuple, trem2.as_tuple(), dap12.as_tuple()])
+        query.append_pipeline(overlay_data, {syk_tuple: 5}, 'weight')
+
+        for _ in range(2):
+            result = query.run(self.manager, in_place=True, universe_cache=cache)
+            self.assertEqual(5, result.node[syk_tuple]['weight'])
+            self.assertNotIn('weight', universe.node[syk_tuple])
+
+    def test_evict(self):
+        cache = UniverseCache(max_entries=2)
+
+        for network_id in (self.sialic_acid_id, self.egf_id, self.homology_id):
+            cache.get(self.manager, [network_id])
+
+        self.assertEqual(2, len(cache))
+        self.assertNotIn([self.sialic_acid_id], cache)
+        self.assertIn([self.homology_id], cache)
+
+    def test_evict_by_size(self):
+        cache = UniverseCache(max_entries=None, max_edges=1)
+
+        cache.get(self.manager, [self.sialic_acid_id])
+        cache.get(self.manager, [self.egf_id])
+
+        self.assertEqual(1, len(cache), msg='only the most recently used universe should be kept')
+        self.assertIn([self.egf_id], cache)
+
+
+def make_edge_store(manager, graph, network):
+    """Stores the qualified edges of a graph made of named proteins in the edge store, without looking up namespaces
+
+    :param pybel.manager.Manager manager: A cache manager
+    :param pybel.BELGraph graph: A BEL graph
+    :param pybel.manager.models.Network network: The network to add the nodes and edges to
+    """
+    session = manager.session
+
+    def get_or_create(model, **kwargs):
+        instance = session.query(model).filter_by(**kwargs).one_or_none()
+        if instance is None:
+            instance = model(**kwargs)
+            session.add(instance)
+            session.flush()
+        return instance
+
+    nodes = {}
+
+    for node, data in graph.nodes_iter(data=True):
+        namespace = get_or_create(models.Namespace, keyword=data[NAMESPACE], url=data[NAMESPACE])
+        entry = get_or_create(models.NamespaceEntry, name=data[NAME], namespace=namespace)
+        nodes[node] = get_or_create(models.Node, type=data[FUNCTION], bel=str(node), sha512=hash_node(node),
+                                    namespace_entry=entry)
+        network.nodes.append(nodes[node])
+
+    for u, v, data in graph.edges_iter(data=True):
+        citation = get_or_create(models.Citation, type=data[CITATION][CITATION_TYPE],
+                                 reference=data[CITATION][CITATION_REFERENCE])
+        for name in data[CITATION].get(CITATION_AUTHORS, '').split('|'):
+            author = get_or_create(models.Author, name=name)
+            if author not in citation.authors:
+                citation.authors.append(author)
+
+        edge = models.Edge(bel='{} {} {}'.format(u, data[RELATION], v), relation=data[RELATION], source=nodes[u],
+                           target=nodes[v], evidence=get_or_create(models.Evidence, text=data[EVIDENCE],
+                                                                   citation=citation))
+        session.add(edge)
+
+        for annotation, values in data.get(ANNOTATIONS, {}).items():
+            annotation_model = get_or_create(models.Annotation, keyword=annotation, url=annotation)
+            for value in values:
+                edge.annotations.append(get_or_create(models.AnnotationEntry, name=value, annotation=annotation_model))
+
+        network.edges.append(edge)
+
+    session.commit()
+
+
+class TestPushdown(unittest.TestCase):
+    """Tests seeding against an edge store in SQLite gives the same result as seeding in memory"""
+
+    def setUp(self):
+        self.manager = Manager(connection='sqlite://')
+        self.manager.create_all()
+
+        self.network_ids = []
+
+        for name, edges in (('A', 'ab bc cd'), ('B', 'de ef')):
+            graph = BELGraph(name=name, version='1.0.0')
+
+            for i, (u, v) in enumerate(edges.split()):
+                graph.add_qualified_edge(
+                    protein(namespace='HGNC', name=u), protein(namespace='HGNC', name=v), relation=INCREASES,
+                    evidence='Evidence {}'.format(i), annotations={'Subgraph': {name + str(i % 2)}},
+                    citation={
+                        CITATION_TYPE: CITATION_TYPE_PUBMED,
+                        CITATION_REFERENCE: name + str(i),
+                        CITATION_AUTHORS: 'Author {}'.format(u),
+                    },
+                )
+
+            network = models.Network(name=name, version='1.0.0')
+            network.store_bel(graph)
+            self.manager.session.add(network)
+            make_edge_store(self.manager, graph, network)
+            self.network_ids.append(network.id)
+
+    def check_same_result(self, seed_method, seed_data):
+        query = Query(network_ids=self.network_ids)
+        query._append_seed(seed_method, seed_data)
+        self.assertTrue(query.can_push_down(self.manager))
+
+        expected = query.run(self.manager, pushdown=False)
+        result = query.run(self.manager, pushdown=True)
+
+        self.assertIsNotNone(result)
+        self.assertEqual(set(expected), set(result))
+        self.assertEqual(set(expected.edges()), set(result.edges()))
+
+        return result
+
+    def test_neighbors(self):
+        result = self.check_same_result('neighbors', [protein(namespace='HGNC', name='d').as_tuple()])
+        self.assertEqual(2, result.number_of_edges(), msg='the neighborhood should cross networks')
+
+    def test_induction(self):
+        nodes = [protein(namespace='HGNC', name=name).as_tuple() for name in 'abd']
+        result = self.check_same_result('induction', nodes)
+        self.assertEqual(3, result.number_of_nodes())
+        self.assertEqual(1, result.number_of_edges())
+
+    def test_pubmed(self):
+        result = self.check_same_result('pubmed', ['A1', 'B0'])
+        self.assertEqual(2, result.number_of_edges())
+
+    def test_authors(self):
+        result = self.check_same_result('authors', ['Author a', 'Author e'])
+        self.assertEqual(2, result.number_of_edges())
+
+    def test_annotation(self):
+        result = self.check_same_result('annotation', {'annotations': {'Subgraph': {'A0', 'B1'}}})
+        self.assertEqual(3, result.number_of_edges())
+
+    def test_missing_nodes(self):
+        query = Query(network_ids=self.network_ids)
+        query.append_seeding_neighbors([protein(namespace='HGNC', name='z')])
+        self.assertIsNone(query.run(self.manager, pushdown=True))
+
+    def test_fallback(self):
+        """Tests pipelines that need the universe can't be pushed down"""
+        query = Query(network_ids=self.network_ids)
+        query.append_seeding_neighbors([protein(namespace='HGNC', name='d')])
+        self.assertTrue(query.can_push_down(self.manager))
+
+        query.append_pipeline('expand_periphery')
+        self.assertFalse(query.can_push_down(self.manager))
+        self.assertFalse(query.can_push_down(MockQueryManager()))
+
+    def test_explain(self):
+        """Tests estimating with counts from the edge store gives the same estimates as with the universe in memory"""
+        query = Query(network_ids=self.network_ids)
+        query.append_seeding_neighbors([protein(namespace='HGNC', name='d')])
+        query._append_seed('pubmed', ['A1'])
+        query.append_pipeline('expand_all_node_neighborhoods')
+
+        memory_manager = MockQueryManager(graphs=[self.manager.get_graph_by_ids(self.network_ids)])
+        expected = Query(network_ids=[0], seeding=query.seeding, pipeline=query.pipeline).explain(memory_manager)
+
+        estimate = query.explain(self.manager)
+
+        self.assertEqual((6, 5), (estimate.universe_nodes, estimate.universe_edges))
+        self.assertEqual(str(expected), str(estimate))
+
+
+class TestExplain(unittest.TestCase):
+    def setUp(self):
+        self.manager = MockQueryManager(graphs=[sialic_acid_graph])
+
+        self.query = Query(network_ids=[0])
+        self.query.append_seeding_neighbors([trem2])
+        self.query.append_pipeline(expand_all_node_neighborhoods)
+        self.query.append_pipeline(remove_pathologies)
+
+    def test_explain(self):
+        estimate = self.query.explain(self.manager)
+
+        self.assertEqual(sialic_acid_graph.number_of_nodes(), estimate.universe_nodes)
+        self.assertEqual(sialic_acid_graph.number_of_edges(), estimate.universe_edges)
+        self.assertEqual(3, len(estimate.steps))
+
+        seeded, expanded, removed = estimate.steps
+        self.assertEqual(1 + sialic_acid_graph.degree(trem2.as_tuple()), seeded.number_nodes)
+        self.assertLess(seeded.number_nodes, expanded.number_nodes)
+        self.assertLessEqual(expanded.number_nodes, estimate.universe_nodes)
+        self.assertEqual(expanded.number_nodes, removed.number_nodes, msg='deletions should not grow the graph')
+        self.assertTrue(removed.known)
+        self.assertEqual(expanded.number_nodes, estimate.max_nodes)
+
+    def test_explain_over_budget(self):
+        with self.assertRaises(BudgetExceededError):
+            self.query.explain(self.manager, budget=Budget(max_nodes=3))
+
+        self.query.explain(self.manager, budget=Budget(max_nodes=sialic_acid_graph.number_of_nodes()))
+
+    def test_run_over_budget(self):
+        with self.assertRaises(BudgetExceededError):
+            self.query.run(self.manager, in_place=False, budget=Budget(max_edges=3))
+
+        result = self.query.run(self.manager, in_place=False, budget=Budget(max_seconds=60))
+        self.assertIsNotNone(result)
+
+    def test_pipeline_over_time(self):
+        pipeline = Pipeline()
+        pipeline.append(remove_pathologies)
+
+        with self.assertRaises(BudgetExceededError):
+            pipeline.run(sialic_acid_graph.copy(), budget=Budget(max_seconds=1), started=time.time() - 10)